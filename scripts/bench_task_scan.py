@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from trikernel.state_kernel.file_store import JsonFileTaskStore  # noqa: E402
+from trikernel.state_kernel.models import Task  # noqa: E402
+
+
+def _best_of(repeat: int, func: Callable[[], object]) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def _retained_bytes(func: Callable[[], object]) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure task scan cost.")
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JsonFileTaskStore(Path(tmp))
+        store.create_many(
+            [
+                ("work", {"message": f"task {n}", "meta": {"n": n}})
+                for n in range(args.tasks)
+            ]
+        )
+        records = [task.to_dict() for task in store.list()]
+        tasks = [Task.from_dict(record) for record in records]
+
+        rows = [
+            ("Task.from_dict", _best_of(args.repeat, lambda: [
+                Task.from_dict(record) for record in records
+            ])),
+            ("Task.to_dict", _best_of(args.repeat, lambda: [
+                task.to_dict() for task in tasks
+            ])),
+            ("store.list()", _best_of(args.repeat, store.list)),
+            ("store.list(state=queued)", _best_of(
+                args.repeat, lambda: store.list(state="queued")
+            )),
+        ]
+        retained = _retained_bytes(lambda: [
+            Task.from_dict(record) for record in records
+        ])
+        store.close()
+
+    per = 10_000 / args.tasks
+    print(f"tasks: {args.tasks}  (times are best of {args.repeat}, per 10k tasks)")
+    for name, seconds in rows:
+        print(f"  {name:<26} {seconds * per * 1000:8.2f} ms")
+    print(f"  {'Task objects retained':<26} {retained * per / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,18 @@ from __future__ import annotations
 import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from trikernel.utils.logging import get_logger
 
-from ..state_kernel.models import Task, parse_time
-from ..state_kernel.protocols import StateKernelAPI
+from ..state_kernel.models import (
+    Task,
+    complete_patch,
+    fail_patch,
+    parse_time,
+)
+from ..state_kernel.async_kernel import AsyncStateKernel, ensure_async_state_api
+from ..state_kernel.protocols import AsyncStateKernelAPI, StateKernelAPI
 from .transports import ResultReceiver, WorkSender, ZmqResultReceiver, ZmqWorkSender
 
 logger = get_logger(__name__)
@@ -24,6 +30,8 @@ class DispatchConfig:
     worker_timeout_seconds: float = 60 * 10
     work_queue_timeout_seconds: float = 60 * 30
     queued_timeout_seconds: float = 60 * 60 * 24
+    rescan_interval_seconds: float = 30.0
+    serializer: Optional[str] = None
 
 
 @dataclass
@@ -36,33 +44,45 @@ class PendingWork:
 class WorkDispatcher:
     def __init__(
         self,
-        state_api: StateKernelAPI,
+        state_api: Union[StateKernelAPI, AsyncStateKernelAPI],
         config: Optional[DispatchConfig] = None,
         work_sender: Optional[WorkSender] = None,
         result_receiver: Optional[ResultReceiver] = None,
     ) -> None:
         self.state_api = state_api
+        self._state = ensure_async_state_api(state_api)
         self.config = config or DispatchConfig()
-        self._work_sender = work_sender or ZmqWorkSender(self.config.zmq_endpoint)
+        self._work_sender = work_sender or ZmqWorkSender(
+            self.config.zmq_endpoint, self.config.serializer
+        )
         self._result_receiver = result_receiver or ZmqResultReceiver(
             self.config.zmq_result_endpoint
         )
         self._pending: List[PendingWork] = []
         self._inflight: Dict[str, float] = {}
+        self._queued: Dict[str, Task] = {}
+        self._event_seq: Optional[int] = None
+        self._next_rescan = 0.0
+
+    def close(self) -> None:
+        if self._state is not self.state_api and isinstance(
+            self._state, AsyncStateKernel
+        ):
+            self._state.close()
 
     async def run_once(self) -> None:
         await self._dispatch_work_tasks()
         await self._send_pending_tasks()
         await self._receive_worker_results()
-        self._fail_timed_out_pending()
-        self._fail_timed_out_tasks()
-        self._fail_expired_queued_tasks()
+        await self._fail_timed_out_pending()
+        await self._fail_timed_out_tasks()
+        await self._fail_expired_queued_tasks()
 
     async def _dispatch_work_tasks(self) -> None:
-        tasks = self.state_api.task_list(task_type="work", state="queued")
+        await self._sync_queued_tasks()
         now = datetime.now(timezone.utc)
-        for task in tasks:
-            if task.state != "queued":
+        for task in list(self._queued.values()):
+            if task.task_type != "work" or task.state != "queued":
                 continue
             if self._is_already_tracked(task.task_id):
                 continue
@@ -71,7 +91,9 @@ class WorkDispatcher:
                 continue
             if run_at > now:
                 continue
-            claimed = self.state_api.task_claim({"task_id": task.task_id}, "main", 30)
+            claimed = await self._state.task_claim(
+                {"task_id": task.task_id}, "main", 30
+            )
             if not claimed:
                 continue
             self._pending.append(
@@ -97,6 +119,7 @@ class WorkDispatcher:
             available -= 1
 
     async def _receive_worker_results(self) -> None:
+        results: List[dict] = []
         while True:
             try:
                 payload = await self._result_receiver.try_recv_json()
@@ -109,39 +132,34 @@ class WorkDispatcher:
             if not task_id:
                 continue
             self._inflight.pop(task_id, None)
-            task = self.state_api.task_get(task_id)
+            results.append(payload)
+        if not results:
+            return
+        task_ids = [payload["task_id"] for payload in results]
+        tasks = await self._state.task_get_many(task_ids)
+        notifications: List[Dict[str, Any]] = []
+        updates: List[Tuple[str, Dict[str, Any]]] = []
+        for task, payload in zip(tasks, results):
             if not task:
                 continue
             user_output = payload.get("user_output")
             if user_output:
-                self.state_api.task_create(
-                    "notification",
+                notifications.append(
                     {
                         "message": user_output,
                         "severity": "info",
                         "related_task_id": task.task_id,
                         "artifact_refs": payload.get("artifact_refs") or [],
                         "meta": payload.get("meta"),
-                    },
+                    }
                 )
-            self._finalize_task(task, payload)
-
-    def _finalize_task(self, task: Task, payload: dict) -> None:
-        task_state = payload.get("task_state") or "failed"
-        if task_state == "done":
-            if _is_recurring(task.payload or {}):
-                self._reschedule_task(task)
-            else:
-                self.state_api.task_complete(task.task_id)
-            return
-        self.state_api.task_fail(
-            task.task_id, payload.get("error") or {"message": "failed"}
-        )
+            updates.append((task.task_id, _finalize_patch(task, payload)))
+        if notifications:
+            await self._state.notification_publish_many(notifications)
+        if updates:
+            await self._state.task_update_many(updates)
 
-    def _reschedule_task(self, task: Task) -> None:
-        self.state_api.task_update(task.task_id, _reschedule_patch(task.payload or {}))
-
-    def _fail_timed_out_tasks(self) -> None:
+    async def _fail_timed_out_tasks(self) -> None:
         if self.config.worker_timeout_seconds <= 0:
             return
         now = time.monotonic()
@@ -150,62 +168,91 @@ class WorkDispatcher:
             for task_id, started_at in self._inflight.items()
             if now - started_at > self.config.worker_timeout_seconds
         ]
+        if not timed_out:
+            return
         for task_id in timed_out:
             self._inflight.pop(task_id, None)
-            task = self.state_api.task_get(task_id)
-            if not task:
-                continue
-            self.state_api.task_fail(
-                task.task_id,
-                {"code": "WORKER_TIMEOUT", "message": "Worker timeout exceeded."},
-            )
-            logger.error("worker timeout exceeded: %s", task_id)
-            self._pending = [
-                entry for entry in self._pending if entry.task_id != task_id
-            ]
+        error = {"code": "WORKER_TIMEOUT", "message": "Worker timeout exceeded."}
+        failed = await self._state.task_update_many(
+            [(task_id, fail_patch(error)) for task_id in timed_out]
+        )
+        for task in failed:
+            if task:
+                logger.error("worker timeout exceeded: %s", task.task_id)
+        self._pending = [
+            entry for entry in self._pending if entry.task_id not in timed_out
+        ]
 
-    def _fail_timed_out_pending(self) -> None:
+    async def _fail_timed_out_pending(self) -> None:
         if self.config.work_queue_timeout_seconds <= 0:
             return
         now = time.monotonic()
         still_pending: List[PendingWork] = []
+        expired: List[str] = []
         for entry in self._pending:
             if now - entry.enqueued_at > entry.timeout_seconds:
-                task = self.state_api.task_get(entry.task_id)
-                if task:
-                    self.state_api.task_fail(
-                        task.task_id,
-                        {
-                            "code": "WORK_QUEUE_TIMEOUT",
-                            "message": "Work queue timeout exceeded.",
-                        },
-                    )
-                    logger.error("work queue timeout exceeded: %s", entry.task_id)
+                expired.append(entry.task_id)
                 continue
             still_pending.append(entry)
         self._pending = still_pending
+        if not expired:
+            return
+        error = {
+            "code": "WORK_QUEUE_TIMEOUT",
+            "message": "Work queue timeout exceeded.",
+        }
+        failed = await self._state.task_update_many(
+            [(task_id, fail_patch(error)) for task_id in expired]
+        )
+        for task in failed:
+            if task:
+                logger.error("work queue timeout exceeded: %s", task.task_id)
+
+    async def _sync_queued_tasks(self) -> None:
+        if self._event_seq is not None and time.monotonic() < self._next_rescan:
+            self._event_seq, events = await self._state.task_events(
+                self._event_seq
+            )
+            if all(event.task is not None for event in events):
+                for event in events:
+                    task = event.task
+                    if task.state == "queued":
+                        self._queued[task.task_id] = task
+                    else:
+                        self._queued.pop(task.task_id, None)
+                return
+        self._event_seq, _ = await self._state.task_events()
+        queued = await self._state.task_list(state="queued")
+        self._queued = {task.task_id: task for task in queued}
+        self._next_rescan = time.monotonic() + self.config.rescan_interval_seconds
 
     def _is_already_tracked(self, task_id: str) -> bool:
         if task_id in self._inflight:
             return True
         return any(entry.task_id == task_id for entry in self._pending)
 
-    def _fail_expired_queued_tasks(self) -> None:
+    async def _fail_expired_queued_tasks(self) -> None:
         timeout_seconds = _clamp_queued_timeout(self.config.queued_timeout_seconds)
         if timeout_seconds <= 0:
             return
+        await self._sync_queued_tasks()
         now = datetime.now(timezone.utc)
-        for task in self.state_api.task_list(state="queued"):
+        expired: List[str] = []
+        for task in list(self._queued.values()):
             created_at = parse_time(task.created_at)
             if not created_at:
                 continue
             if (now - created_at).total_seconds() <= timeout_seconds:
                 continue
-            self.state_api.task_fail(
-                task.task_id,
-                {"code": "QUEUED_TIMEOUT", "message": "Queued task expired."},
-            )
-            logger.error("queued task expired: %s", task.task_id)
+            expired.append(task.task_id)
+        if not expired:
+            return
+        error = {"code": "QUEUED_TIMEOUT", "message": "Queued task expired."}
+        await self._state.task_update_many(
+            [(task_id, fail_patch(error)) for task_id in expired]
+        )
+        for task_id in expired:
+            logger.error("queued task expired: %s", task_id)
 
 
 def _parse_run_at(payload: dict) -> Optional[datetime]:
@@ -237,6 +284,15 @@ def _clamp_queued_timeout(seconds: float) -> float:
     return min(60 * 60 * 24, max(0, seconds))
 
 
+def _finalize_patch(task: Task, payload: dict) -> dict:
+    task_state = payload.get("task_state") or "failed"
+    if task_state != "done":
+        return fail_patch(payload.get("error") or {"message": "failed"})
+    if _is_recurring(task.payload or {}):
+        return _reschedule_patch(task.payload or {})
+    return complete_patch()
+
+
 def _reschedule_patch(payload: dict) -> dict:
     interval = _clamp_repeat_interval(int(payload.get("repeat_interval_seconds") or 0))
     next_payload = dict(payload)
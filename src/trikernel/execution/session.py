@@ -5,6 +5,7 @@ import asyncio
 import concurrent.futures
 from datetime import datetime, timedelta, timezone
 import threading
+import time
 from typing import Any, Dict, List, Optional, Union
 
 from trikernel.utils.logging import get_logger
@@ -21,6 +22,9 @@ from .payloads import UserRequestPayload, WorkPayload
 
 logger = get_logger(__name__)
 
+_NOTIFICATION_BATCH = 100
+_NOTIFICATION_RESCAN_SECONDS = 30.0
+
 
 @dataclass
 class MessageResult:
@@ -43,6 +47,7 @@ class TrikernelSession:
         runner_id: str = "main",
         claim_ttl_seconds: int = 30,
         main_runner_timeout_seconds: int = 60 * 10,
+        notification_subscriber: str = "main",
     ) -> None:
         self._state_api = state_api
         self._tool_api = tool_api
@@ -53,12 +58,15 @@ class TrikernelSession:
         self._runner_id = runner_id
         self._claim_ttl_seconds = claim_ttl_seconds
         self._main_runner_timeout_seconds = main_runner_timeout_seconds
+        self._notification_subscriber = notification_subscriber
         self._runtime_loop: Optional[asyncio.AbstractEventLoop] = None
         self._runtime_thread: Optional[threading.Thread] = None
         self._dispatcher: Optional[WorkDispatcher] = None
         self._worker: Optional[WorkWorker] = None
         self._loop: Optional[ExecutionLoop] = None
         self._loop_task: Optional[asyncio.Task] = None
+        self._notification_seq: Optional[int] = None
+        self._next_notification_rescan = 0.0
 
     def send_message(self, message: str, stream: bool = False) -> MessageResult:
         task_id = self._state_api.task_create(
@@ -118,6 +126,19 @@ class TrikernelSession:
 
     def drain_notifications(self) -> List[str]:
         messages: List[str] = []
+        while True:
+            batch = self._state_api.notification_fetch(
+                self._notification_subscriber, limit=_NOTIFICATION_BATCH
+            )
+            messages.extend(item.message for item in batch if item.message)
+            if batch:
+                self._state_api.notification_ack(
+                    self._notification_subscriber, batch[-1].cursor
+                )
+            if len(batch) < _NOTIFICATION_BATCH:
+                break
+        if not self._has_new_notifications():
+            return messages
         while True:
             notification_id = self._state_api.task_claim(
                 {"task_type": "notification"}, self._runner_id, self._claim_ttl_seconds
@@ -197,11 +218,26 @@ class TrikernelSession:
         self._runtime_thread = None
         if self._loop:
             self._loop.stop()
+        if self._dispatcher:
+            self._dispatcher.close()
+        if self._worker:
+            self._worker.close()
         self._dispatcher = None
         self._worker = None
         self._loop = None
         self._loop_task = None
 
+    def _has_new_notifications(self) -> bool:
+        now = time.monotonic()
+        if self._notification_seq is None or now >= self._next_notification_rescan:
+            self._notification_seq, _ = self._state_api.task_events()
+            self._next_notification_rescan = now + _NOTIFICATION_RESCAN_SECONDS
+            return True
+        self._notification_seq, events = self._state_api.task_events(
+            self._notification_seq, {"task_type": "notification", "state": "queued"}
+        )
+        return bool(events)
+
     def _run_task(self, task: Task, stream: bool) -> RunResult:
         context = RunnerContext(
             runner_id=self._runner_id,
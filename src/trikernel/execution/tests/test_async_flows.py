@@ -192,7 +192,7 @@ def test_worker_timeout_flow(tmp_path):
     )
     task_id = state.task_create("work", {"message": "do"})
     dispatcher._inflight[task_id] = time.monotonic() - 5
-    dispatcher._fail_timed_out_tasks()
+    _run_async(dispatcher._fail_timed_out_tasks())
     task = state.task_get(task_id)
     assert task is not None
     assert task.state == "failed"
@@ -210,7 +210,7 @@ def test_queue_timeout_flow(tmp_path):
     dispatcher._pending.append(
         PendingWork(task_id=task_id, enqueued_at=time.monotonic() - 5, timeout_seconds=1)
     )
-    dispatcher._fail_timed_out_pending()
+    _run_async(dispatcher._fail_timed_out_pending())
     task = state.task_get(task_id)
     assert task is not None
     assert task.state == "failed"
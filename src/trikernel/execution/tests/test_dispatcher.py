@@ -2,8 +2,11 @@ import asyncio
 import time
 from datetime import datetime, timedelta, timezone
 
+import pytest
+
 from trikernel.execution.dispatcher import DispatchConfig, PendingWork, WorkDispatcher
 from trikernel.execution.transports import ResultReceiver, WorkSender
+from trikernel.execution.worker import WorkWorker
 from trikernel.state_kernel.kernel import StateKernel
 
 
@@ -90,8 +93,10 @@ def test_receive_results_finalize_task(tmp_path):
     task = state.task_get(task_id)
     assert task is not None
     assert task.state == "done"
-    notifications = state.task_list(task_type="notification", state=None)
-    assert any(item.payload.get("message") == "ok" for item in notifications)
+    notifications = state.notification_fetch("main")
+    assert [item.message for item in notifications] == ["ok"]
+    assert notifications[0].related_task_id == task_id
+    assert state.task_list(task_type="notification", state=None) == []
 
 
 def test_fail_timed_out_pending(tmp_path):
@@ -110,7 +115,7 @@ def test_fail_timed_out_pending(tmp_path):
             timeout_seconds=1,
         )
     )
-    dispatcher._fail_timed_out_pending()
+    asyncio.run(dispatcher._fail_timed_out_pending())
     task = state.task_get(task_id)
     assert task is not None
     assert task.state == "failed"
@@ -127,7 +132,7 @@ def test_fail_worker_timeout(tmp_path):
     task_id = state.task_create("work", {"message": "do"})
     dispatcher._inflight[task_id] = time.monotonic() - 5
 
-    dispatcher._fail_timed_out_tasks()
+    asyncio.run(dispatcher._fail_timed_out_tasks())
 
     task = state.task_get(task_id)
     assert task is not None
@@ -148,7 +153,7 @@ def test_fail_expired_queued_tasks(tmp_path):
     state.task_update(user_task, {"created_at": old_time})
     state.task_update(notification_task, {"created_at": old_time})
 
-    dispatcher._fail_expired_queued_tasks()
+    asyncio.run(dispatcher._fail_expired_queued_tasks())
 
     user_task_obj = state.task_get(user_task)
     notification_obj = state.task_get(notification_task)
@@ -156,3 +161,91 @@ def test_fail_expired_queued_tasks(tmp_path):
     assert notification_obj is not None
     assert user_task_obj.state == "failed"
     assert notification_obj.state == "failed"
+
+
+def test_dispatcher_follows_change_feed_instead_of_listing(tmp_path):
+    state = StateKernel(data_dir=tmp_path)
+    sender = FakeSender()
+    dispatcher = WorkDispatcher(
+        state_api=state,
+        work_sender=sender,
+        result_receiver=FakeReceiver([]),
+        config=DispatchConfig(),
+    )
+    asyncio.run(dispatcher.run_once())
+
+    list_calls = []
+    original_list = state.task_list
+
+    def counting_list(*args, **kwargs):
+        list_calls.append((args, kwargs))
+        return original_list(*args, **kwargs)
+
+    state.task_list = counting_list
+    task_id = state.task_create("work", {"message": "hello"})
+    asyncio.run(dispatcher.run_once())
+
+    assert list_calls == []
+    assert sender.sent == [{"task_id": task_id}]
+    assert task_id not in dispatcher._queued
+
+
+@pytest.mark.parametrize("process_lock", [True, False])
+def test_dispatcher_sees_tasks_created_by_another_process(tmp_path, process_lock):
+    state = StateKernel(data_dir=tmp_path, process_lock=process_lock)
+    other = StateKernel(data_dir=tmp_path, process_lock=process_lock)
+    sender = FakeSender()
+    dispatcher = WorkDispatcher(
+        state_api=state,
+        work_sender=sender,
+        result_receiver=FakeReceiver([]),
+        config=DispatchConfig(),
+    )
+    asyncio.run(dispatcher.run_once())
+
+    task_id = other.task_create("work", {"message": "from elsewhere"})
+    asyncio.run(dispatcher.run_once())
+
+    assert sender.sent == [{"task_id": task_id}]
+
+
+def test_dispatcher_rescans_periodically(tmp_path):
+    state = StateKernel(data_dir=tmp_path)
+    sender = FakeSender()
+    dispatcher = WorkDispatcher(
+        state_api=state,
+        work_sender=sender,
+        result_receiver=FakeReceiver([]),
+        config=DispatchConfig(rescan_interval_seconds=0),
+    )
+    asyncio.run(dispatcher.run_once())
+
+    task_id = state._task_store.create("work", {"message": "bypassed"}).task_id
+    asyncio.run(dispatcher.run_once())
+
+    assert sender.sent == [{"task_id": task_id}]
+
+
+def test_dispatcher_and_worker_share_one_async_state(tmp_path):
+    state = StateKernel(data_dir=tmp_path)
+    dispatcher = WorkDispatcher(
+        state_api=state,
+        work_sender=FakeSender(),
+        result_receiver=FakeReceiver([]),
+        config=DispatchConfig(),
+    )
+    worker = WorkWorker(
+        state_api=state,
+        tool_api=None,
+        runner=None,
+        llm_api=None,
+        tool_llm_api=None,
+        work_receiver=FakeReceiver([]),
+        result_sender=FakeSender(),
+    )
+    assert dispatcher._state is worker._state
+
+    dispatcher.close()
+    assert asyncio.run(worker._state.task_get("missing")) is None
+    worker.close()
+    assert worker._state._executor._shutdown
@@ -93,9 +93,9 @@ def test_work_task_end_to_end(tmp_path):
     task = state.task_get(task_id)
     assert task is not None
     assert task.state == "done"
-    notifications = state.task_list(task_type="notification", state=None)
+    notifications = state.notification_fetch("main")
     assert notifications
-    assert notifications[0].payload.get("meta", {}).get("channel_id") == 1
+    assert notifications[0].meta.get("channel_id") == 1
 
 
 def test_work_task_failure_marks_failed(tmp_path):
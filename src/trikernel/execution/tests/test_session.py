@@ -109,6 +109,31 @@ def test_notification_drain_marks_done(tmp_path):
     assert tasks[0].state == "done"
 
 
+def test_notification_log_is_drained_per_subscriber(tmp_path):
+    state = StateKernel(data_dir=tmp_path)
+    sessions = [
+        TrikernelSession(
+            state_api=state,
+            tool_api=DummyToolAPI(),
+            runner=SleepRunner(0),
+            llm_api=DummyLLM(),
+            tool_llm_api=None,
+            notification_subscriber=name,
+        )
+        for name in ("terminal", "discord")
+    ]
+    state.notification_publish_many([{"message": "a"}, {"message": "b"}])
+
+    assert [session.drain_notifications() for session in sessions] == [
+        ["a", "b"],
+        ["a", "b"],
+    ]
+    state.notification_publish("c")
+    assert sessions[0].drain_notifications() == ["c"]
+    assert sessions[0].drain_notifications() == []
+    assert state.notification_fetch("discord")[0].message == "c"
+
+
 def test_main_runner_exception_marks_failed(tmp_path):
     state = StateKernel(data_dir=tmp_path)
     session = TrikernelSession(
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Protocol, runtime_checkable
+from typing import Any, Optional, Protocol, runtime_checkable
+
+from ..utils.serialization import Serializer, decode, resolve_serializer
 
 
 @runtime_checkable
@@ -26,11 +28,12 @@ class ResultReceiver(Protocol):
 
 
 class ZmqWorkSender(WorkSender):
-    def __init__(self, endpoint: str) -> None:
+    def __init__(self, endpoint: str, serializer: Optional[Serializer] = None) -> None:
         self._socket = _create_socket(endpoint, bind=True, socket_type="PUSH")
+        self._serializer = resolve_serializer(serializer)
 
     async def send_json(self, payload: dict[str, Any]) -> None:
-        await self._socket.send_json(payload)
+        await self._socket.send(self._serializer.dumps(payload))
 
 
 class ZmqWorkReceiver(WorkReceiver):
@@ -38,25 +41,19 @@ class ZmqWorkReceiver(WorkReceiver):
         self._socket = _create_socket(endpoint, bind=False, socket_type="PULL")
 
     async def recv_json(self) -> dict[str, Any]:
-        return await self._socket.recv_json()
+        return decode(await self._socket.recv())
 
     async def try_recv_json(self) -> dict[str, Any] | None:
-        try:
-            import zmq  # type: ignore
-        except ImportError as exc:
-            raise RuntimeError("pyzmq is required for the execution layer") from exc
-        try:
-            return await self._socket.recv_json(flags=zmq.NOBLOCK)
-        except Exception:
-            return None
+        return await _try_recv(self._socket)
 
 
 class ZmqResultSender(ResultSender):
-    def __init__(self, endpoint: str) -> None:
+    def __init__(self, endpoint: str, serializer: Optional[Serializer] = None) -> None:
         self._socket = _create_socket(endpoint, bind=False, socket_type="PUSH")
+        self._serializer = resolve_serializer(serializer)
 
     async def send_json(self, payload: dict[str, Any]) -> None:
-        await self._socket.send_json(payload)
+        await self._socket.send(self._serializer.dumps(payload))
 
 
 class ZmqResultReceiver(ResultReceiver):
@@ -64,17 +61,21 @@ class ZmqResultReceiver(ResultReceiver):
         self._socket = _create_socket(endpoint, bind=True, socket_type="PULL")
 
     async def recv_json(self) -> dict[str, Any]:
-        return await self._socket.recv_json()
+        return decode(await self._socket.recv())
 
     async def try_recv_json(self) -> dict[str, Any] | None:
-        try:
-            import zmq  # type: ignore
-        except ImportError as exc:
-            raise RuntimeError("pyzmq is required for the execution layer") from exc
-        try:
-            return await self._socket.recv_json(flags=zmq.NOBLOCK)
-        except Exception:
-            return None
+        return await _try_recv(self._socket)
+
+
+async def _try_recv(socket) -> dict[str, Any] | None:
+    try:
+        import zmq  # type: ignore
+    except ImportError as exc:
+        raise RuntimeError("pyzmq is required for the execution layer") from exc
+    try:
+        return decode(await socket.recv(flags=zmq.NOBLOCK))
+    except Exception:
+        return None
 
 
 def _create_socket(endpoint: str, *, bind: bool, socket_type: str):
@@ -7,6 +7,7 @@ from trikernel.utils.logging import get_logger
 from ..orchestration_kernel.models import RunResult, RunnerContext
 from ..orchestration_kernel.protocols import LLMAPI, Runner
 from ..state_kernel.models import Task
+from ..state_kernel.async_kernel import AsyncStateKernel, ensure_async_state_api
 from ..state_kernel.protocols import StateKernelAPI
 from ..tool_kernel.protocols import ToolAPI, ToolLLMAPI
 from .transports import ResultSender, WorkReceiver, ZmqResultSender, ZmqWorkReceiver
@@ -26,21 +27,31 @@ class WorkWorker:
         result_sender: Optional[ResultSender] = None,
         work_endpoint: str = "inproc://trikernel-work",
         result_endpoint: str = "inproc://trikernel-work-results",
+        serializer: Optional[str] = None,
     ) -> None:
         self.state_api = state_api
+        self._state = ensure_async_state_api(state_api)
         self.tool_api = tool_api
         self.runner = runner
         self.llm_api = llm_api
         self.tool_llm_api = tool_llm_api
         self._work_receiver = work_receiver or ZmqWorkReceiver(work_endpoint)
-        self._result_sender = result_sender or ZmqResultSender(result_endpoint)
+        self._result_sender = result_sender or ZmqResultSender(
+            result_endpoint, serializer
+        )
+
+    def close(self) -> None:
+        if self._state is not self.state_api and isinstance(
+            self._state, AsyncStateKernel
+        ):
+            self._state.close()
 
     async def run_once(self) -> None:
         payload = await self._work_receiver.try_recv_json()
         if payload is None:
             return
         task_id = payload.get("task_id")
-        task = self.state_api.task_get(task_id) if task_id else None
+        task = await self._state.task_get(task_id) if task_id else None
         if not task:
             return
         task_meta = (task.payload or {}).get("meta")
@@ -58,7 +69,7 @@ class WorkWorker:
             )
         except Exception:
             logger.error("worker result send failed: %s", task.task_id, exc_info=True)
-            self.state_api.task_fail(
+            await self._state.task_fail(
                 task.task_id,
                 {"code": "WORKER_SEND_FAILED", "message": "Failed to send result."},
             )
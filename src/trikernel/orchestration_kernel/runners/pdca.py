@@ -93,13 +93,8 @@ class PDCARunner(Runner):
             if achieved:
                 final_message = do_response.user_output or evaluation
                 if runner_context.runner_id == "worker":
-                    runner_context.state_api.task_create(
-                        "notification",
-                        {
-                            "message": final_message,
-                            "severity": "info",
-                            "related_task_id": task.task_id,
-                        },
+                    runner_context.state_api.notification_publish(
+                        final_message, related_task_id=task.task_id
                     )
                     final_message = None
                 return RunResult(
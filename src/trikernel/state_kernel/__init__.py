@@ -1,14 +1,36 @@
+from .async_kernel import AsyncStateKernel, ensure_async_state_api
+from .change_feed import TaskEvent
 from .kernel import StateKernel
-from .models import Artifact, Task, Turn
-from .protocols import ArtifactStore, StateKernelAPI, TaskStore, TurnStore
+from .models import Artifact, Notification, Task, Turn
+from .notification_log import NotificationLog
+from .protocols import (
+    ArtifactStore,
+    AsyncStateKernelAPI,
+    StateKernelAPI,
+    TaskStore,
+    TurnStore,
+)
+from .remote import RemoteStateKernel, StateKernelServer
+from .sqlite_store import SqliteTaskStore
+from .turn_log import TurnLogStore
 
 __all__ = [
     "StateKernel",
+    "AsyncStateKernel",
+    "ensure_async_state_api",
     "Artifact",
     "Task",
     "Turn",
+    "Notification",
+    "NotificationLog",
+    "TaskEvent",
     "ArtifactStore",
     "StateKernelAPI",
+    "AsyncStateKernelAPI",
     "TaskStore",
     "TurnStore",
+    "RemoteStateKernel",
+    "StateKernelServer",
+    "SqliteTaskStore",
+    "TurnLogStore",
 ]
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .models import Artifact
+
+
+class ArtifactCache:
+    def __init__(
+        self, max_items: int = 256, max_bytes: int = 32 * 1024 * 1024
+    ) -> None:
+        self._max_items = max_items
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Artifact, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, artifact_id: str) -> Optional[Artifact]:
+        with self._lock:
+            entry = self._entries.get(artifact_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(artifact_id)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, artifact_id: str) -> Optional[Artifact]:
+        with self._lock:
+            entry = self._entries.get(artifact_id)
+            return entry[0] if entry else None
+
+    def put(self, artifact: Artifact) -> None:
+        size = len(artifact.body.encode("utf-8"))
+        with self._lock:
+            self._discard(artifact.artifact_id)
+            if size > self._max_bytes or self._max_items <= 0:
+                return
+            self._entries[artifact.artifact_id] = (artifact, size)
+            self._bytes += size
+            while len(self._entries) > self._max_items or self._bytes > self._max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, artifact_id: str) -> None:
+        with self._lock:
+            self._discard(artifact_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "items": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _discard(self, artifact_id: str) -> None:
+        entry = self._entries.pop(artifact_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .change_feed import TaskEvent
+from .models import Artifact, Notification, Task, TaskType, Turn
+from .protocols import AsyncStateKernelAPI, StateKernelAPI
+
+
+class AsyncStateKernel(AsyncStateKernelAPI):
+    def __init__(self, state_api: Optional[StateKernelAPI] = None) -> None:
+        if state_api is None:
+            from .kernel import StateKernel
+
+            state_api = StateKernel()
+        self.state_api = state_api
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="state-kernel-io"
+        )
+        self._users = 1
+        weakref.finalize(self, self._executor.shutdown, wait=False)
+
+    async def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._run(getattr(self.state_api, method), *args, **kwargs)
+
+    def close(self) -> None:
+        with _shared_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            if _shared_for(self.state_api) is self:
+                del _shared[self.state_api]
+        self._executor.shutdown(wait=True)
+
+    async def task_create(self, task_type: TaskType, payload: Dict[str, Any]) -> str:
+        return await self.call("task_create", task_type, payload)
+
+    async def task_create_many(
+        self, tasks: Sequence[Tuple[TaskType, Dict[str, Any]]]
+    ) -> List[str]:
+        return await self.call("task_create_many", tasks)
+
+    async def task_get(self, task_id: str) -> Optional[Task]:
+        return await self.call("task_get", task_id)
+
+    async def task_get_many(self, task_ids: Sequence[str]) -> List[Optional[Task]]:
+        return await self.call("task_get_many", task_ids)
+
+    async def task_update(
+        self, task_id: str, patch: Dict[str, Any]
+    ) -> Optional[Task]:
+        return await self.call("task_update", task_id, patch)
+
+    async def task_update_many(
+        self, updates: Sequence[Tuple[str, Dict[str, Any]]]
+    ) -> List[Optional[Task]]:
+        return await self.call("task_update_many", updates)
+
+    async def task_list(
+        self,
+        task_type: Optional[str] = None,
+        state: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> Union[List[Task], List[Dict[str, Any]]]:
+        return await self.call(
+            "task_list",
+            task_type,
+            state,
+            fields=fields,
+            preview_chars=preview_chars,
+            include_archived=include_archived,
+        )
+
+    async def task_claim(
+        self,
+        filter_by: Dict[str, Any],
+        claimer_id: str,
+        ttl_seconds: int,
+    ) -> Optional[str]:
+        return await self.call("task_claim", filter_by, claimer_id, ttl_seconds)
+
+    async def task_complete(self, task_id: str) -> Optional[Task]:
+        return await self.call("task_complete", task_id)
+
+    async def task_fail(
+        self, task_id: str, error_info: Dict[str, Any]
+    ) -> Optional[Task]:
+        return await self.call("task_fail", task_id, error_info)
+
+    async def task_events(
+        self,
+        since_seq: Optional[int] = None,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, List[TaskEvent]]:
+        return await self.call("task_events", since_seq, filter_by)
+
+    def subscribe(
+        self,
+        filter_by: Optional[Dict[str, Any]] = None,
+        since_seq: Optional[int] = None,
+    ) -> AsyncIterator[TaskEvent]:
+        return self.state_api.subscribe(filter_by, since_seq)
+
+    async def notification_publish(
+        self,
+        message: str,
+        severity: str = "info",
+        related_task_id: Optional[str] = None,
+        artifact_refs: Optional[List[str]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        return await self.call(
+            "notification_publish",
+            message,
+            severity,
+            related_task_id,
+            artifact_refs,
+            meta,
+        )
+
+    async def notification_publish_many(
+        self, notifications: Sequence[Dict[str, Any]]
+    ) -> List[int]:
+        return await self.call("notification_publish_many", notifications)
+
+    async def notification_fetch(
+        self, subscriber: str, since_cursor: Optional[int] = None, limit: int = 100
+    ) -> List[Notification]:
+        return await self.call("notification_fetch", subscriber, since_cursor, limit)
+
+    async def notification_ack(self, subscriber: str, cursor: int) -> int:
+        return await self.call("notification_ack", subscriber, cursor)
+
+    async def artifact_write(
+        self, media_type: str, body: str, metadata: Dict[str, Any]
+    ) -> str:
+        return await self.call("artifact_write", media_type, body, metadata)
+
+    async def artifact_read(self, artifact_id: str) -> Optional[Artifact]:
+        return await self.call("artifact_read", artifact_id)
+
+    async def artifact_read_many(
+        self, artifact_ids: Sequence[str]
+    ) -> List[Optional[Artifact]]:
+        return await self.call("artifact_read_many", artifact_ids)
+
+    async def artifact_read_range(
+        self, artifact_id: str, offset: int, length: int
+    ) -> Optional[str]:
+        return await self.call("artifact_read_range", artifact_id, offset, length)
+
+    async def artifact_open(
+        self, artifact_id: str, chunk_size: int = 64 * 1024
+    ) -> Optional[AsyncIterator[str]]:
+        chunks = await self.call("artifact_open", artifact_id, chunk_size)
+        if chunks is None:
+            return None
+        return self._iter_chunks(chunks)
+
+    async def artifact_write_named(
+        self, artifact_id: str, media_type: str, body: str, metadata: Dict[str, Any]
+    ) -> str:
+        return await self.call(
+            "artifact_write_named", artifact_id, media_type, body, metadata
+        )
+
+    async def artifact_list(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+    ) -> Union[List[Artifact], List[Dict[str, Any]]]:
+        return await self.call(
+            "artifact_list", fields=fields, preview_chars=preview_chars
+        )
+
+    async def artifact_search(self, query: Dict[str, Any]) -> List[Artifact]:
+        return await self.call("artifact_search", query)
+
+    async def turn_append_user(
+        self,
+        conversation_id: str,
+        user_message: str,
+        related_task_id: Optional[str],
+    ) -> str:
+        return await self.call(
+            "turn_append_user", conversation_id, user_message, related_task_id
+        )
+
+    async def turn_set_assistant(
+        self,
+        turn_id: str,
+        assistant_message: str,
+        artifacts: List[str],
+        metadata: Dict[str, Any],
+    ) -> Optional[Turn]:
+        return await self.call(
+            "turn_set_assistant", turn_id, assistant_message, artifacts, metadata
+        )
+
+    async def turn_list_recent(
+        self, conversation_id: str, limit: int
+    ) -> List[Turn]:
+        return await self.call("turn_list_recent", conversation_id, limit)
+
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def _iter_chunks(self, chunks: Iterator[str]) -> AsyncIterator[str]:
+        while True:
+            chunk = await self._run(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+def ensure_async_state_api(
+    state_api: Union[StateKernelAPI, AsyncStateKernelAPI],
+) -> AsyncStateKernelAPI:
+    if asyncio.iscoroutinefunction(getattr(state_api, "task_get", None)):
+        return state_api  # type: ignore[return-value]
+    with _shared_lock:
+        shared = _shared_for(state_api)
+        if shared is not None:
+            shared._users += 1
+            return shared
+        shared = AsyncStateKernel(state_api)  # type: ignore[arg-type]
+        try:
+            _shared[state_api] = weakref.ref(shared)
+        except TypeError:
+            pass
+        return shared
+
+
+def _shared_for(state_api: Any) -> Optional[AsyncStateKernel]:
+    try:
+        ref = _shared.get(state_api)
+    except TypeError:
+        return None
+    return ref() if ref is not None else None
+
+
+# Keyed weakly by the kernel object and holding the wrapper weakly too, since
+# the wrapper keeps a strong reference to its kernel.
+_shared_lock = threading.Lock()
+_shared: "weakref.WeakKeyDictionary[Any, weakref.ref[AsyncStateKernel]]" = (
+    weakref.WeakKeyDictionary()
+)
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import itertools
+import struct
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from .durability import atomic_write_bytes
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+CODECS = ("zst", "gz", "raw")
+FRAME_SIZE = 256 * 1024
+_MIN_SAVINGS = 0.1
+_FRAME_OFFSET = struct.Struct(">Q")
+
+
+class BlobStore:
+    def __init__(
+        self, root: Path, codec: Optional[str] = None, fsync: bool = False
+    ) -> None:
+        if codec is None:
+            codec = "zst" if zstandard is not None else "gz"
+        if codec not in CODECS:
+            raise ValueError(f"codec must be one of {CODECS}")
+        if codec == "zst" and zstandard is None:
+            raise ValueError("zstandard is not installed")
+        self._root = root
+        self._codec = codec
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._known: Dict[str, Tuple[Path, int]] = {}
+        self._frames: Dict[str, Optional[List[int]]] = {}
+        root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        digest = self.digest(data)
+        existing = self._locate(digest)
+        if existing is not None:
+            return digest, existing[1]
+        codec = self._codec
+        frames = [
+            _compress(codec, data[start : start + FRAME_SIZE])
+            for start in range(0, max(len(data), 1), FRAME_SIZE)
+        ]
+        compressed = b"".join(frames)
+        if len(compressed) > len(data) * (1 - _MIN_SAVINGS):
+            codec, compressed, frames = "raw", data, []
+        path = self._path(digest, codec)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if len(frames) > 1:
+            offsets = itertools.accumulate((len(frame) for frame in frames), initial=0)
+            atomic_write_bytes(
+                _frame_index_path(path),
+                b"".join(_FRAME_OFFSET.pack(offset) for offset in offsets),
+                fsync=self._fsync,
+            )
+        atomic_write_bytes(path, compressed, fsync=self._fsync)
+        with self._lock:
+            self._known[digest] = (path, len(compressed))
+        return digest, len(compressed)
+
+    def get(self, digest: str) -> bytes:
+        location = self._locate(digest)
+        if location is None:
+            raise FileNotFoundError(digest)
+        path = location[0]
+        return _decompress(path.suffix[1:], path.read_bytes())
+
+    def open(self, digest: str) -> BinaryIO:
+        location = self._locate(digest)
+        if location is None:
+            raise FileNotFoundError(digest)
+        path = location[0]
+        codec = path.suffix[1:]
+        if codec == "gz":
+            return gzip.open(path, "rb")
+        if codec == "zst":
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read .zst blobs")
+            return zstandard.ZstdDecompressor().stream_reader(
+                open(path, "rb"), read_across_frames=True
+            )
+        return open(path, "rb")
+
+    def read_range(self, digest: str, offset: int, length: int) -> bytes:
+        location = self._locate(digest)
+        if location is None:
+            raise FileNotFoundError(digest)
+        path = location[0]
+        codec = path.suffix[1:]
+        if codec == "raw":
+            with open(path, "rb") as handle:
+                handle.seek(offset)
+                return handle.read(length)
+        offsets = self._frame_offsets(digest, path)
+        if offsets is None:
+            with self.open(digest) as source:
+                source.seek(offset)
+                return source.read(length)
+        first = offset // FRAME_SIZE
+        last = min((offset + length - 1) // FRAME_SIZE, len(offsets) - 2)
+        if length <= 0 or first > last:
+            return b""
+        with open(path, "rb") as handle:
+            handle.seek(offsets[first])
+            raw = handle.read(offsets[last + 1] - offsets[first])
+        start = offset - first * FRAME_SIZE
+        return _decompress(codec, raw)[start : start + length]
+
+    def exists(self, digest: str) -> bool:
+        location = self._locate(digest)
+        if location is not None and not location[0].exists():
+            self._forget(digest)
+            location = self._locate(digest)
+        return location is not None
+
+    def delete(self, digest: str) -> None:
+        self._forget(digest)
+        for codec in CODECS:
+            path = self._path(digest, codec)
+            _frame_index_path(path).unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
+
+    def _forget(self, digest: str) -> None:
+        with self._lock:
+            self._known.pop(digest, None)
+            self._frames.pop(digest, None)
+
+    def _locate(self, digest: str) -> Optional[Tuple[Path, int]]:
+        with self._lock:
+            known = self._known.get(digest)
+        if known is not None:
+            return known
+        for codec in CODECS:
+            path = self._path(digest, codec)
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                self._known[digest] = (path, size)
+            return path, size
+        return None
+
+    def _frame_offsets(self, digest: str, path: Path) -> Optional[List[int]]:
+        with self._lock:
+            if digest in self._frames:
+                return self._frames[digest]
+        try:
+            raw = _frame_index_path(path).read_bytes()
+        except FileNotFoundError:
+            offsets = None
+        else:
+            offsets = [value for (value,) in _FRAME_OFFSET.iter_unpack(raw)]
+        with self._lock:
+            self._frames[digest] = offsets
+        return offsets
+
+    def _path(self, digest: str, codec: str) -> Path:
+        return self._root / digest[:2] / f"{digest}.{codec}"
+
+
+def _frame_index_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.idx")
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "raw":
+        return data
+    if codec == "zst":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "raw":
+        return data
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst blobs")
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            io.BytesIO(data), read_across_frames=True
+        )
+        return reader.read()
+    return gzip.decompress(data)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from .models import Task
+
+ChangeListener = Callable[[str, Iterable[Optional[Task]]], None]
+
+EVENT_KINDS = ("created", "updated", "claimed", "archived", "reset")
+
+
+@dataclass
+class TaskEvent:
+    seq: int
+    kind: str
+    task: Optional[Task] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "kind": self.kind,
+            "task": self.task.to_dict() if self.task else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaskEvent":
+        task = data.get("task")
+        return cls(
+            seq=data["seq"],
+            kind=data["kind"],
+            task=Task.from_dict(task) if task else None,
+        )
+
+
+def event_matches(event: TaskEvent, filter_by: Optional[Dict[str, Any]]) -> bool:
+    if event.task is None or not filter_by:
+        return True
+    record = event.task
+    for key in ("task_id", "task_type", "state"):
+        if key in filter_by and getattr(record, key) != filter_by[key]:
+            return False
+    return True
+
+
+class ChangeFeed:
+    def __init__(self, max_events: int = 10_000) -> None:
+        self._events: Deque[TaskEvent] = deque(maxlen=max_events)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    @property
+    def last_seq(self) -> int:
+        with self._cond:
+            return self._seq
+
+    def publish(self, kind: str, tasks: Iterable[Optional[Task]]) -> None:
+        with self._cond:
+            if kind == "reset":
+                self._seq += 1
+                self._events.append(TaskEvent(self._seq, kind))
+            for task in tasks:
+                if task is None:
+                    continue
+                self._seq += 1
+                self._events.append(TaskEvent(self._seq, kind, task))
+            self._cond.notify_all()
+            waiters = list(self._waiters)
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                continue
+
+    def since(
+        self, since_seq: Optional[int], filter_by: Optional[Dict[str, Any]] = None
+    ) -> Tuple[int, List[TaskEvent]]:
+        with self._cond:
+            if since_seq is None or since_seq == self._seq:
+                return self._seq, []
+            oldest = self._events[0].seq if self._events else self._seq + 1
+            if since_seq > self._seq or since_seq < oldest - 1:
+                return self._seq, [TaskEvent(self._seq, "reset")]
+            start = since_seq - oldest + 1
+            events = [
+                event
+                for event in itertools.islice(self._events, start, None)
+                if event_matches(event, filter_by)
+            ]
+            return self._seq, events
+
+    def wait(self, since_seq: int, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._seq != since_seq, timeout)
+
+    async def subscribe(
+        self,
+        filter_by: Optional[Dict[str, Any]] = None,
+        since_seq: Optional[int] = None,
+    ) -> AsyncIterator[TaskEvent]:
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            self._waiters.append(waiter)
+            seq = self._seq if since_seq is None else since_seq
+        try:
+            while True:
+                waiter[1].clear()
+                seq, events = self.since(seq, filter_by)
+                if not events:
+                    await waiter[1].wait()
+                    continue
+                for event in events:
+                    yield event
+        finally:
+            with self._cond:
+                self._waiters.remove(waiter)
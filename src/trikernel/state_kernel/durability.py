@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Dict, Optional, Protocol, Set
+
+from trikernel.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+DURABILITY_MODES = ("fsync", "flush-only", "async")
+
+
+class WriteJob(Protocol):
+    def render(self) -> Optional[bytes]: ...
+
+    def written(self) -> None: ...
+
+
+def atomic_write_text(path: Path, text: str, *, fsync: bool = False) -> None:
+    atomic_write_bytes(path, text.encode("utf-8"), fsync=fsync)
+
+
+def atomic_write_bytes(path: Path, data: bytes, *, fsync: bool = False) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as handle:
+            handle.write(data)
+            handle.flush()
+            if fsync:
+                os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        durability: str = "flush-only",
+        commit_window: float = 0.002,
+        idle_timeout: float = 1.0,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        self.durability = durability
+        self._commit_window = commit_window
+        self._idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._pending: Dict[Path, WriteJob] = {}
+        self._submitted = 0
+        self._committed = 0
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        self._submissions = 0
+        self._flushes = 0
+        self._files_written = 0
+        _live_writers.add(self)
+
+    def submit(self, path: Path, job: WriteJob) -> int:
+        with self._cond:
+            self._pending[path] = job
+            self._submitted += 1
+            self._submissions += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="trikernel-group-commit", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify_all()
+            return self._submitted
+
+    def wait(self, generation: Optional[int] = None) -> None:
+        if self.durability == "async":
+            return
+        self.flush(generation)
+
+    def flush(self, generation: Optional[int] = None) -> None:
+        with self._cond:
+            target = self._submitted if generation is None else generation
+            while self._committed < target:
+                self._cond.wait()
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "submissions": self._submissions,
+                "flushes": self._flushes,
+                "files_written": self._files_written,
+                "pending": len(self._pending),
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait(self._idle_timeout)
+                if not self._pending:
+                    self._thread = None
+                    return
+            if self._commit_window > 0:
+                time.sleep(self._commit_window)
+            with self._cond:
+                batch = self._pending
+                self._pending = {}
+                target = self._submitted
+            error = self._write_batch(batch)
+            with self._cond:
+                self._committed = target
+                self._flushes += 1
+                self._files_written += len(batch)
+                if error is not None:
+                    self._error = error
+                self._cond.notify_all()
+
+    def _write_batch(self, batch: Dict[Path, WriteJob]) -> Optional[BaseException]:
+        fsync = self.durability == "fsync"
+        directories: Set[Path] = set()
+        error: Optional[BaseException] = None
+        for path, job in batch.items():
+            try:
+                data = job.render()
+                if data is not None:
+                    atomic_write_bytes(path, data, fsync=fsync)
+                    directories.add(path.parent)
+                job.written()
+            except Exception as exc:
+                logger.error("state write failed: %s", path, exc_info=True)
+                error = exc
+        if fsync:
+            for directory in directories:
+                fsync_dir(directory)
+        return error
+
+
+_live_writers: "weakref.WeakSet[GroupCommitWriter]" = weakref.WeakSet()
+
+
+def _flush_live_writers() -> None:
+    for writer in list(_live_writers):
+        try:
+            writer.flush()
+        except Exception:
+            logger.error("state flush at exit failed", exc_info=True)
+
+
+atexit.register(_flush_live_writers)
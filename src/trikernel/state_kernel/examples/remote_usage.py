@@ -0,0 +1,11 @@
+from trikernel.state_kernel.remote import RemoteStateKernel, StateKernelServer
+
+
+if __name__ == "__main__":
+    server = StateKernelServer("ipc:///tmp/trikernel-state.sock")
+    server.start()
+    state = RemoteStateKernel(server.endpoint)
+    task_id = state.task_create("user_request", {"user_message": "hello"})
+    print(state.task_get(task_id))
+    state.close()
+    server.stop()
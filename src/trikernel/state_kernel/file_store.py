@@ -1,98 +1,209 @@
 from __future__ import annotations
 
+import codecs
+import hashlib
+import io
 import json
 import os
 import threading
-from dataclasses import replace
+import time
+from contextlib import contextmanager
 from datetime import timedelta
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from urllib.parse import quote
 from uuid import uuid4
 
 from dotenv import load_dotenv
 from langchain_ollama import OllamaEmbeddings
 from langchain_core.documents import Document
-
-from .models import Artifact, Task, TaskType, Turn, parse_time, utc_now
+from langchain_core.embeddings import Embeddings
+
+from .models import (
+    ARTIFACT_FIELDS,
+    TASK_FIELDS,
+    Artifact,
+    Task,
+    TaskType,
+    Turn,
+    clone_json,
+    complete_patch,
+    fail_patch,
+    field_path,
+    parse_time,
+    project_record,
+    utc_now,
+)
+from .artifact_cache import ArtifactCache
+from .blob_store import BlobStore
+from .change_feed import ChangeListener
+from .durability import GroupCommitWriter
+from .index_queue import IndexQueue
+from .process_lock import ProcessLock
+from .ready_queue import ReadyQueue
+from .record_files import Change, JournalFile, RecordFile, SnapshotFile
+from .task_archive import ARCHIVED_STATES, TaskArchive, archivable
+from ..utils.embedding_cache import MemoizedEmbeddings
 from ..utils.search import HybridSearchIndex
+from ..utils.serialization import Serializer, decode, resolve_serializer
 
-
-def _merge_patch(target: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
-    merged = dict(target)
-    for key, value in patch.items():
-        if isinstance(value, dict) and isinstance(merged.get(key), dict):
-            merged[key] = _merge_patch(merged[key], value)
-        else:
-            merged[key] = value
-    return merged
+_ARCHIVE_CHECK_SECONDS = 60.0
 
 
 class JsonFileTaskStore:
-    def __init__(self, data_dir: Path) -> None:
-        self._path = data_dir / "tasks.json"
+    def __init__(
+        self,
+        data_dir: Path,
+        journal: bool = False,
+        compact_bytes: int = 4 * 1024 * 1024,
+        durability: str = "flush-only",
+        writer: Optional[GroupCommitWriter] = None,
+        archive_after_seconds: Optional[float] = None,
+        process_lock: bool = False,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
         self._lock = threading.Lock()
-        data_dir.mkdir(parents=True, exist_ok=True)
-        if not self._path.exists():
-            self._path.write_text("{}", encoding="utf-8")
-
-    def _read_all(self) -> Dict[str, Dict[str, Any]]:
-        raw = self._path.read_text(encoding="utf-8")
-        if not raw.strip():
-            return {}
-        return json.loads(raw)
-
-    def _write_all(self, data: Dict[str, Dict[str, Any]]) -> None:
-        self._path.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
+        self._process_lock = ProcessLock(
+            data_dir / "tasks.lock" if process_lock else None
+        )
+        self._queue = ReadyQueue()
+        self._indexed: Optional[Dict[str, Dict[str, Any]]] = None
+        writer = writer or GroupCommitWriter(durability)
+        self._records = _open_records(
+            data_dir / "tasks.json",
+            self._lock,
+            journal=journal,
+            compact_bytes=compact_bytes,
+            writer=writer,
+            shared=process_lock,
+            serializer=serializer,
         )
+        self._archive = TaskArchive(
+            data_dir / "archive" / "tasks",
+            fsync=writer.durability == "fsync",
+            serializer=serializer,
+        )
+        self._archive_after = archive_after_seconds
+        self._next_archive_check = 0.0
+        self._listeners: List[ChangeListener] = []
+
+    def close(self) -> None:
+        self._records.close()
+        self._process_lock.close()
+
+    def add_change_listener(self, listener: ChangeListener) -> None:
+        self._listeners.append(listener)
+
+    def poll_changes(self) -> None:
+        with self._locked(exclusive=False):
+            self._load()
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {"hits": self._records.hits, "reloads": self._records.reloads}
 
     def create(self, task_type: TaskType, payload: Dict[str, Any]) -> Task:
-        with self._lock:
-            data = self._read_all()
-            task_id = str(uuid4())
-            task = Task(
-                task_id=task_id, task_type=task_type, payload=payload, state="queued"
+        return self.create_many([(task_type, payload)])[0]
+
+    def create_many(
+        self, tasks: Sequence[Tuple[TaskType, Dict[str, Any]]]
+    ) -> List[Task]:
+        created = [
+            Task(
+                task_id=str(uuid4()),
+                task_type=task_type,
+                payload=payload,
+                state="queued",
+            )
+            for task_type, payload in tasks
+        ]
+        with self._locked(exclusive=True):
+            data = self._load()
+            self._apply_many(
+                data, [("create", task.task_id, task.to_dict()) for task in created]
             )
-            data[task_id] = task.to_dict()
-            self._write_all(data)
-            return task
+        self._records.sync()
+        self._maybe_archive()
+        return created
 
     def get(self, task_id: str) -> Optional[Task]:
-        with self._lock:
-            data = self._read_all()
-            raw = data.get(task_id)
-            return Task.from_dict(raw) if raw else None
+        return self.get_many([task_id])[0]
+
+    def get_many(self, task_ids: Sequence[str]) -> List[Optional[Task]]:
+        with self._locked(exclusive=False):
+            data = self._load()
+            raws = [data.get(task_id) for task_id in task_ids]
+            missing = [task_id for task_id, raw in zip(task_ids, raws) if raw is None]
+            if missing:
+                archived = self._archive.get_many(missing)
+                raws = [
+                    raw or archived.get(task_id) for task_id, raw in zip(task_ids, raws)
+                ]
+        return [Task.from_dict(raw) if raw else None for raw in raws]
 
     def update(self, task_id: str, patch: Dict[str, Any]) -> Optional[Task]:
-        with self._lock:
-            data = self._read_all()
-            current = data.get(task_id)
-            if not current:
-                return None
-            updated = _merge_patch(current, patch)
-            updated["updated_at"] = utc_now()
-            data[task_id] = updated
-            self._write_all(data)
-            return Task.from_dict(updated)
+        return self.update_many([(task_id, patch)])[0]
+
+    def update_many(
+        self, updates: Sequence[Tuple[str, Dict[str, Any]]]
+    ) -> List[Optional[Task]]:
+        with self._locked(exclusive=True):
+            data = self._load()
+            changes = []
+            for task_id, patch in updates:
+                if task_id in data:
+                    change = clone_json(patch)
+                    change["updated_at"] = utc_now()
+                    changes.append(("patch", task_id, change))
+            values = iter(self._apply_many(data, changes))
+            updated = [
+                Task.from_dict(next(values)) if task_id in data else None
+                for task_id, _ in updates
+            ]
+        self._records.sync()
+        self._maybe_archive()
+        return updated
 
     def list(
         self,
         task_type: Optional[str] = None,
         state: Optional[str] = None,
-    ) -> List[Task]:
-        with self._lock:
-            data = self._read_all()
-        tasks = [Task.from_dict(value) for value in data.values()]
-        if task_type is None and state is None:
-            return tasks
-        result = []
-        for task in tasks:
-            if task_type is not None and task.task_type != task_type:
-                continue
-            if state is not None and task.state != state:
-                continue
-            result.append(task)
-        return result
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> Union[List[Task], List[Dict[str, Any]]]:
+        for name in fields or ():
+            field_path(name, TASK_FIELDS)
+        with self._locked(exclusive=False):
+            archived: List[Dict[str, Any]] = []
+            if include_archived:
+                archived = self._archive.scan(task_type, state)
+            data = self._load()
+            if task_type is None and state is None:
+                records = list(data.values())
+            else:
+                task_ids = self._queue.ids(task_type, state)
+                records = [data[task_id] for task_id in task_ids]
+            if archived:
+                records = [
+                    record for record in archived if record["task_id"] not in data
+                ] + records
+            if fields is None:
+                return [Task.from_dict(record) for record in records]
+            return [
+                project_record(record, fields, preview_chars, ("payload",))
+                for record in records
+            ]
 
     def claim(
         self,
@@ -100,124 +211,378 @@ class JsonFileTaskStore:
         claimer_id: str,
         ttl_seconds: int,
     ) -> Optional[Task]:
-        with self._lock:
-            data = self._read_all()
+        with self._locked(exclusive=True):
+            data = self._load()
             now = parse_time(utc_now())
-            for task_id, raw in data.items():
-                task = Task.from_dict(raw)
-                if task.state not in {"queued", "running"}:
-                    continue
-                matched = True
-                for key, value in filter_by.items():
-                    if getattr(task, key, None) != value:
-                        matched = False
-                        break
-                if not matched:
-                    continue
-                expires = parse_time(task.claim_expires_at)
-                if task.claimed_by and expires and now and expires > now:
-                    continue
-                claim_expires_at = (
-                    (now + timedelta(seconds=ttl_seconds)).isoformat() if now else None
-                )
-                updated = replace(
-                    task,
-                    claimed_by=claimer_id,
-                    claim_expires_at=claim_expires_at,
-                    state="running",
-                    updated_at=utc_now(),
-                )
-                data[task_id] = updated.to_dict()
-                self._write_all(data)
-                return updated
-        return None
+            if now is None:
+                return None
+            task_id = self._queue.next_claimable(data, filter_by, now.timestamp())
+            if task_id is None:
+                return None
+            change = {
+                "claimed_by": claimer_id,
+                "claim_expires_at": (now + timedelta(seconds=ttl_seconds)).isoformat(),
+                "state": "running",
+                "updated_at": utc_now(),
+            }
+            claimed = Task.from_dict(self._apply(data, "claim", task_id, change))
+        self._records.sync()
+        return claimed
 
     def complete(self, task_id: str) -> Optional[Task]:
-        return self.update(
-            task_id, {"state": "done", "claimed_by": None, "claim_expires_at": None}
-        )
+        return self.update(task_id, complete_patch())
 
     def fail(self, task_id: str, error_info: Dict[str, Any]) -> Optional[Task]:
-        return self.update(
-            task_id,
-            {
-                "state": "failed",
-                "payload": {"error": error_info},
-                "claimed_by": None,
-                "claim_expires_at": None,
-            },
-        )
+        return self.update(task_id, fail_patch(error_info))
+
+    def archive(self, older_than_seconds: Optional[float] = None) -> int:
+        older_than = older_than_seconds
+        if older_than is None:
+            older_than = self._archive_after
+        if older_than is None:
+            return 0
+        cutoff = time.time() - older_than
+        with self._locked(exclusive=True):
+            data = self._load()
+            records = [
+                data[task_id]
+                for state in ARCHIVED_STATES
+                for task_id in self._queue.ids(state=state)
+                if archivable(data[task_id], cutoff)
+            ]
+            if not records:
+                return 0
+            self._archive.add_many(records)
+            self._apply_many(
+                data, [("delete", record["task_id"], {}) for record in records]
+            )
+        self._records.sync()
+        self._notify("archived", [Task.from_dict(record) for record in records])
+        return len(records)
+
+    def _maybe_archive(self) -> None:
+        if self._archive_after is None:
+            return
+        now = time.monotonic()
+        if now < self._next_archive_check:
+            return
+        self._next_archive_check = now + _ARCHIVE_CHECK_SECONDS
+        self.archive()
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        external: Optional[List[Optional[Task]]] = []
+        try:
+            with self._lock, self._process_lock.hold(exclusive):
+                if self._process_lock.enabled:
+                    changed = self._records.refresh()
+                    data = self._load()
+                    if changed is None:
+                        external = None
+                    for task_id in changed or ():
+                        if task_id in data:
+                            self._queue.update(task_id, data[task_id])
+                            if external is not None:
+                                external.append(Task.from_dict(data[task_id]))
+                        else:
+                            self._queue.remove(task_id)
+                            external = None
+                    yield
+                else:
+                    # Without the process lock a signature-driven reload is the
+                    # only sign that another process replaced tasks.json.
+                    reloads = self._records.reloads
+                    loaded = self._indexed is not None
+                    yield
+                    if loaded and self._records.reloads != reloads:
+                        external = None
+        finally:
+            if external is None:
+                self._notify("reset", [])
+            elif external:
+                self._notify("updated", external)
+
+    def _notify(self, kind: str, tasks: List[Optional[Task]]) -> None:
+        for listener in self._listeners:
+            listener(kind, tasks)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        data = self._records.load()
+        if data is not self._indexed:
+            self._queue.rebuild(data)
+            self._indexed = data
+        return data
+
+    def _apply(
+        self, data: Dict[str, Dict[str, Any]], op: str, key: str, change: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return self._apply_many(data, [(op, key, change)])[0]
+
+    def _apply_many(
+        self, data: Dict[str, Dict[str, Any]], changes: Sequence[Change]
+    ) -> List[Dict[str, Any]]:
+        values = self._records.apply_many(data, changes)
+        for (op, key, _), value in zip(changes, values):
+            if op == "delete":
+                self._queue.remove(key)
+            else:
+                self._queue.update(key, value)
+        return values
 
 
 class JsonFileArtifactStore:
-    def __init__(self, data_dir: Path) -> None:
+    def __init__(
+        self,
+        data_dir: Path,
+        durability: str = "flush-only",
+        writer: Optional[GroupCommitWriter] = None,
+        cache: Optional[ArtifactCache] = None,
+        embeddings: Optional[Embeddings] = None,
+        compact_bytes: int = 4 * 1024 * 1024,
+        process_lock: bool = False,
+        serializer: Optional[Serializer] = None,
+        background_index: bool = True,
+    ) -> None:
         self._artifact_dir = data_dir / "artifacts"
+        self._serializer = resolve_serializer(serializer)
         self._lock = threading.Lock()
+        self._process_lock = ProcessLock(
+            self._artifact_dir / "manifest.lock" if process_lock else None
+        )
+        self._writer = writer or GroupCommitWriter(durability)
+        self._cache = cache or ArtifactCache()
+        self._unflushed: Dict[str, Artifact] = {}
+        self._blob_refs: Optional[Dict[str, int]] = None
+        self._generation = 0
         data_dir.mkdir(parents=True, exist_ok=True)
         self._artifact_dir.mkdir(parents=True, exist_ok=True)
-        self._search_index = _init_artifact_search(data_dir)
-        self._rebuild_index()
+        self._manifest = JournalFile(
+            self._artifact_dir / "manifest.json",
+            compact_bytes=compact_bytes,
+            durability=self._writer.durability,
+            shared=process_lock,
+            serializer=self._serializer,
+        )
+        self._blobs = BlobStore(
+            self._artifact_dir / "blobs", fsync=self._writer.durability == "fsync"
+        )
+        with self._locked(exclusive=True):
+            self._migrate_flat_layout()
+        self._search_index = _init_artifact_search(
+            data_dir, embeddings, self._serializer
+        )
+        self._reconcile_index()
+        self._indexer = IndexQueue(self._search_index) if background_index else None
 
     def write(self, media_type: str, body: str, metadata: Dict[str, Any]) -> Artifact:
-        with self._lock:
+        with self._locked(exclusive=True):
             artifact_id = str(uuid4())
             artifact = Artifact(
                 artifact_id=artifact_id,
                 media_type=media_type,
                 body=body,
-                metadata=metadata,
+                metadata=clone_json(metadata),
             )
             self._write_file(artifact)
             self._index_artifact(artifact)
-            return artifact
+        self._writer.wait(self._generation)
+        return _detached(artifact)
 
     def read(self, artifact_id: str) -> Optional[Artifact]:
-        with self._lock:
-            path = self._artifact_path(artifact_id)
-            if not path.exists():
-                return None
-            raw = json.loads(path.read_text(encoding="utf-8"))
-            return Artifact.from_dict(raw)
+        with self._locked(exclusive=False):
+            return self._read_by_id(artifact_id)
+
+    def read_many(self, artifact_ids: Sequence[str]) -> List[Optional[Artifact]]:
+        with self._locked(exclusive=False):
+            return self._read_batch(artifact_ids, populate=True)
 
     def write_named(
         self, artifact_id: str, media_type: str, body: str, metadata: Dict[str, Any]
     ) -> Artifact:
-        with self._lock:
+        with self._locked(exclusive=True):
             artifact = Artifact(
                 artifact_id=artifact_id,
                 media_type=media_type,
                 body=body,
-                metadata=metadata,
+                metadata=clone_json(metadata),
             )
             self._write_file(artifact)
             self._index_artifact(artifact)
-            return artifact
+        self._writer.wait(self._generation)
+        return _detached(artifact)
+
+    def read_range(self, artifact_id: str, offset: int, length: int) -> Optional[str]:
+        if offset < 0 or length < 0:
+            raise ValueError("offset and length must be non-negative")
+        try:
+            with self._locked(exclusive=False):
+                data = self._read_source_range(artifact_id, offset, length + 3)
+        except FileNotFoundError:
+            return None
+        return _utf8_slice(data, length, skip_leading=offset > 0)
+
+    def open(
+        self, artifact_id: str, chunk_size: int = 64 * 1024
+    ) -> Optional[Iterator[str]]:
+        try:
+            with self._locked(exclusive=False):
+                source = self._open_source(artifact_id)
+        except FileNotFoundError:
+            return None
+        return _iter_text(source, chunk_size)
 
     def search(self, query: Dict[str, Any]) -> Iterable[Artifact]:
-        with self._lock:
+        wait = query.get("wait_for_index", True)
+        if self._indexer is not None and wait is not False:
+            self._indexer.wait(None if wait is True else int(wait))
+        with self._locked(exclusive=False):
             return self._search_locked(query)
 
-    def list(self) -> List[Artifact]:
-        with self._lock:
-            return self._all_artifacts()
+    def list(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+    ) -> Union[List[Artifact], List[Dict[str, Any]]]:
+        if fields is None:
+            with self._locked(exclusive=False):
+                return self._all_artifacts()
+        heads = {field_path(name, ARTIFACT_FIELDS)[0] for name in fields}
+        with self._locked(exclusive=False):
+            entries = self._manifest_entries()
+            projected = []
+            for entry in entries:
+                record = entry
+                if "body" in heads:
+                    record = dict(entry, body=self._read_preview(entry, preview_chars))
+                projected.append(
+                    project_record(record, fields, preview_chars, ("body",))
+                )
+        return projected
 
     def _artifact_path(self, artifact_id: str) -> Path:
-        return self._artifact_dir / f"{artifact_id}.json"
+        digest = hashlib.sha1(artifact_id.encode("utf-8")).hexdigest()
+        return (
+            self._artifact_dir
+            / digest[:2]
+            / digest[2:4]
+            / f"{quote(artifact_id, safe='-_.')}.artifact"
+        )
+
+    def close(self) -> None:
+        self._writer.flush()
+        if self._indexer is not None:
+            self._indexer.flush()
+        self._search_index.flush()
+        self._manifest.close()
+        self._process_lock.close()
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        with self._lock, self._process_lock.hold(exclusive):
+            if self._process_lock.enabled:
+                changed = self._manifest.refresh()
+                if changed is None:
+                    self._cache.clear()
+                if changed != []:
+                    self._blob_refs = None
+                for artifact_id in changed or ():
+                    self._cache.invalidate(artifact_id)
+            yield
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+    @property
+    def index_generation(self) -> int:
+        return self._indexer.generation if self._indexer is not None else 0
+
+    def index_stats(self) -> Dict[str, Any]:
+        if self._indexer is None:
+            return {"depth": 0, "lag_seconds": 0.0}
+        return self._indexer.stats()
+
+    def storage_stats(self) -> Dict[str, Any]:
+        with self._locked(exclusive=False):
+            entries = list(self._manifest.load().values())
+        logical = sum(entry["size"] for entry in entries)
+        unique: Dict[str, Tuple[int, int]] = {}
+        for entry in entries:
+            key = entry.get("blob") or f"inline:{entry['artifact_id']}"
+            unique[key] = (entry["size"], entry.get("stored_size", entry["size"]))
+        unique_bytes = sum(size for size, _ in unique.values())
+        stored = sum(stored_size for _, stored_size in unique.values())
+        return {
+            "artifacts": len(entries),
+            "blobs": len(unique),
+            "logical_bytes": logical,
+            "unique_bytes": unique_bytes,
+            "stored_bytes": stored,
+            "bytes_saved": logical - stored,
+            "dedup_ratio": logical / unique_bytes if unique_bytes else 1.0,
+        }
 
     def _write_file(self, artifact: Artifact) -> None:
+        self._cache.invalidate(artifact.artifact_id)
+        self._unflushed[artifact.artifact_id] = artifact
+        # The path only keys the write so that rewrites of one artifact
+        # coalesce; the manifest entry is the sole record and no file is
+        # written there.
         path = self._artifact_path(artifact.artifact_id)
-        path.write_text(
-            json.dumps(artifact.to_dict(), ensure_ascii=False, indent=2),
-            encoding="utf-8",
+        self._generation = self._writer.submit(path, _ArtifactWrite(self, artifact))
+
+    def _mark_written(self, artifact: Artifact, entry: Dict[str, Any]) -> None:
+        with self._locked(exclusive=True):
+            data = self._manifest.load()
+            blob = entry["blob"]
+            if not self._blobs.exists(blob):
+                self._blobs.put(artifact.body.encode("utf-8"))
+            refs = self._blob_references(data)
+            previous = data.get(artifact.artifact_id) or {}
+            self._manifest.apply(data, "create", artifact.artifact_id, entry)
+            refs[blob] = refs.get(blob, 0) + 1
+            if self._unflushed.get(artifact.artifact_id) is artifact:
+                del self._unflushed[artifact.artifact_id]
+            stale = previous.get("blob")
+            if stale:
+                self._release_blob(refs, stale)
+
+    def _blob_references(self, data: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        if self._blob_refs is None:
+            refs: Dict[str, int] = {}
+            for entry in data.values():
+                if entry.get("blob"):
+                    refs[entry["blob"]] = refs.get(entry["blob"], 0) + 1
+            self._blob_refs = refs
+        return self._blob_refs
+
+    def _release_blob(self, refs: Dict[str, int], digest: str) -> None:
+        refs[digest] -= 1
+        if refs[digest] > 0:
+            return
+        del refs[digest]
+        pending = (
+            BlobStore.digest(artifact.body.encode("utf-8"))
+            for artifact in self._unflushed.values()
         )
+        if digest not in pending:
+            self._blobs.delete(digest)
 
     def _index_artifact(self, artifact: Artifact) -> None:
-        metadata = _normalize_metadata(artifact.metadata)
-        metadata["artifact_id"] = artifact.artifact_id
-        metadata["media_type"] = artifact.media_type
-        metadata["id"] = artifact.artifact_id
-        doc = Document(page_content=artifact.body, metadata=metadata)
-        self._search_index.upsert_document(doc, artifact.artifact_id, force=True)
+        digest = BlobStore.digest(artifact.body.encode("utf-8"))
+        fingerprint = _index_fingerprint(
+            digest, artifact.media_type, artifact.metadata
+        )
+        if self._indexer is not None:
+            self._indexer.submit(
+                artifact.artifact_id, _search_document(artifact), fingerprint
+            )
+            return
+        self._search_index.upsert_document(
+            _search_document(artifact),
+            artifact.artifact_id,
+            force=True,
+            fingerprint=fingerprint,
+        )
 
     def _search_locked(self, query: Dict[str, Any]) -> List[Artifact]:
         text_query = str(query.get("text") or query.get("query") or "").strip()
@@ -227,50 +592,265 @@ class JsonFileArtifactStore:
             docs = self._search_index.search(
                 text_query, k=limit, metadata_filter=metadata_filter
             )
+            artifact_ids = [str(doc.metadata.get("artifact_id") or "") for doc in docs]
             return [
                 artifact
-                for artifact in (
-                    self._read_by_id(doc.metadata.get("artifact_id")) for doc in docs
-                )
+                for artifact in self._read_batch(artifact_ids, populate=True)
                 if artifact
             ]
-        artifacts = self._all_artifacts()
         if not query:
-            return artifacts
-        result = []
-        for artifact in artifacts:
-            if _matches_query(artifact, query):
-                result.append(artifact)
-        return result
-
-    def _read_by_id(self, artifact_id: Optional[str]) -> Optional[Artifact]:
+            return self._all_artifacts()
+        if "body" in query:
+            return [
+                artifact
+                for artifact in self._all_artifacts()
+                if _matches_query(artifact, query)
+            ]
+        matched = [
+            entry["artifact_id"]
+            for entry in self._manifest_entries()
+            if _matches_query(_artifact_header(entry), query)
+        ]
+        return self._read_many(matched)
+
+    def _read_by_id(
+        self,
+        artifact_id: Optional[str],
+        *,
+        populate: bool = True,
+        bodies: Optional[Dict[str, str]] = None,
+    ) -> Optional[Artifact]:
         if not artifact_id:
             return None
-        path = self._artifact_path(str(artifact_id))
-        if not path.exists():
+        artifact_id = str(artifact_id)
+        unflushed = self._unflushed.get(artifact_id)
+        if unflushed:
+            return _detached(unflushed)
+        cached = self._cache.get(artifact_id) if populate else None
+        if cached:
+            return _detached(cached)
+        entry = self._manifest.load().get(artifact_id)
+        if entry is None:
+            return None
+        try:
+            body = self._read_body(entry, bodies)
+        except FileNotFoundError:
             return None
-        raw = json.loads(path.read_text(encoding="utf-8"))
-        return Artifact.from_dict(raw)
+        artifact = _artifact_header(entry)
+        artifact.body = body
+        if populate:
+            self._cache.put(artifact)
+            return _detached(artifact)
+        return artifact
+
+    def _read_body(
+        self, entry: Dict[str, Any], bodies: Optional[Dict[str, str]] = None
+    ) -> str:
+        blob = entry.get("blob")
+        if blob and bodies is not None and blob in bodies:
+            return bodies[blob]
+        if blob:
+            body = self._blobs.get(blob).decode("utf-8")
+            if bodies is not None:
+                bodies[blob] = body
+            return body
+        with open(self._artifact_path(entry["artifact_id"]), "rb") as handle:
+            handle.seek(entry["offset"])
+            return handle.read(entry["size"]).decode("utf-8")
+
+    def _read_preview(
+        self, entry: Dict[str, Any], preview_chars: Optional[int]
+    ) -> Optional[str]:
+        if preview_chars is None:
+            artifact = self._read_by_id(entry["artifact_id"], populate=False)
+            return artifact.body if artifact else None
+        try:
+            with self._open_source(entry["artifact_id"]) as source:
+                prefix = source.read(min(entry["size"], preview_chars * 4))
+        except FileNotFoundError:
+            return None
+        return prefix.decode("utf-8", errors="ignore")[:preview_chars]
+
+    def _open_source(self, artifact_id: str) -> BinaryIO:
+        artifact = self._unflushed.get(artifact_id) or self._cache.peek(artifact_id)
+        if artifact is not None:
+            return io.BytesIO(artifact.body.encode("utf-8"))
+        entry = self._manifest.load().get(artifact_id)
+        if entry is None:
+            raise FileNotFoundError(artifact_id)
+        if entry.get("blob"):
+            return self._blobs.open(entry["blob"])
+        return io.BytesIO(self._read_body(entry).encode("utf-8"))
+
+    def _read_source_range(self, artifact_id: str, offset: int, size: int) -> bytes:
+        artifact = self._unflushed.get(artifact_id) or self._cache.peek(artifact_id)
+        if artifact is not None:
+            return artifact.body.encode("utf-8")[offset : offset + size]
+        entry = self._manifest.load().get(artifact_id)
+        if entry is None:
+            raise FileNotFoundError(artifact_id)
+        if entry.get("blob"):
+            return self._blobs.read_range(entry["blob"], offset, size)
+        return self._read_body(entry).encode("utf-8")[offset : offset + size]
+
+    def _read_many(self, artifact_ids: Iterable[str]) -> List[Artifact]:
+        artifacts = self._read_batch(artifact_ids, populate=False)
+        return [artifact for artifact in artifacts if artifact]
+
+    def _read_batch(
+        self, artifact_ids: Iterable[str], *, populate: bool
+    ) -> List[Optional[Artifact]]:
+        bodies: Dict[str, str] = {}
+        return [
+            self._read_by_id(artifact_id, populate=populate, bodies=bodies)
+            for artifact_id in artifact_ids
+        ]
+
+    def _manifest_entries(self) -> List[Dict[str, Any]]:
+        entries = dict(self._manifest.load())
+        for artifact_id, artifact in self._unflushed.items():
+            entries[artifact_id] = _header_entry(artifact)
+        return list(entries.values())
 
     def _all_artifacts(self) -> List[Artifact]:
-        return [
-            artifact
-            for artifact in (
-                self._read_by_id(path.stem)
-                for path in self._artifact_dir.glob("*.json")
+        entries = self._manifest_entries()
+        return self._read_many(entry["artifact_id"] for entry in entries)
+
+    def _store_body(self, artifact: Artifact) -> Dict[str, Any]:
+        entry = _header_entry(artifact)
+        entry["blob"], entry["stored_size"] = self._blobs.put(
+            artifact.body.encode("utf-8")
+        )
+        return entry
+
+    def _migrate_flat_layout(self) -> None:
+        legacy_paths = [
+            path
+            for path in self._artifact_dir.glob("*.json")
+            if path.name != "manifest.json"
+        ]
+        if not legacy_paths:
+            return
+        data = self._manifest.load()
+        for legacy_path in legacy_paths:
+            artifact = Artifact.from_dict(decode(legacy_path.read_bytes()))
+            entry = self._store_body(artifact)
+            self._manifest.apply(data, "create", artifact.artifact_id, entry)
+            legacy_path.unlink()
+
+    def _reconcile_index(self) -> None:
+        entries = {entry["artifact_id"]: entry for entry in self._manifest_entries()}
+        indexed = self._search_index.fingerprints()
+        self._search_index.delete_documents(
+            [artifact_id for artifact_id in indexed if artifact_id not in entries]
+        )
+        fingerprints = {
+            artifact_id: _index_fingerprint(
+                entry.get("blob"), entry["media_type"], entry.get("metadata") or {}
             )
-            if artifact
+            for artifact_id, entry in entries.items()
+        }
+        changed = [
+            artifact_id
+            for artifact_id, fingerprint in fingerprints.items()
+            if fingerprint is None or indexed.get(artifact_id) != fingerprint
         ]
+        self._search_index.upsert_documents(
+            {
+                artifact.artifact_id: _search_document(artifact)
+                for artifact in self._read_many(changed)
+            },
+            fingerprints,
+        )
+        self._search_index.flush()
 
-    def _rebuild_index(self) -> None:
-        docs = []
-        for artifact in self._all_artifacts():
-            metadata = _normalize_metadata(artifact.metadata)
-            metadata["artifact_id"] = artifact.artifact_id
-            metadata["media_type"] = artifact.media_type
-            metadata["id"] = artifact.artifact_id
-            docs.append(Document(page_content=artifact.body, metadata=metadata))
-        self._search_index.set_documents(docs)
+
+class _ArtifactWrite:
+    def __init__(self, store: JsonFileArtifactStore, artifact: Artifact) -> None:
+        self._store = store
+        self._artifact = artifact
+        self._entry: Dict[str, Any] = {}
+
+    def render(self) -> Optional[bytes]:
+        self._entry = self._store._store_body(self._artifact)
+        return None
+
+    def written(self) -> None:
+        self._store._mark_written(self._artifact, self._entry)
+
+
+def _utf8_slice(data: bytes, length: int, *, skip_leading: bool) -> str:
+    start = 0
+    if skip_leading:
+        while start < len(data) and data[start] & 0xC0 == 0x80:
+            start += 1
+    end = min(length, len(data))
+    while end < len(data) and data[end] & 0xC0 == 0x80:
+        end += 1
+    return data[start:end].decode("utf-8", errors="ignore")
+
+
+def _iter_text(source: BinaryIO, chunk_size: int) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with source:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _header_entry(artifact: Artifact) -> Dict[str, Any]:
+    entry = artifact.to_dict()
+    del entry["body"]
+    entry["size"] = len(artifact.body.encode("utf-8"))
+    return entry
+
+
+def _artifact_header(entry: Dict[str, Any]) -> Artifact:
+    return Artifact(
+        artifact_id=entry["artifact_id"],
+        media_type=entry["media_type"],
+        body="",
+        metadata=clone_json(entry.get("metadata") or {}),
+        created_at=entry.get("created_at") or utc_now(),
+    )
+
+
+def _detached(artifact: Artifact) -> Artifact:
+    return Artifact(
+        artifact_id=artifact.artifact_id,
+        media_type=artifact.media_type,
+        body=artifact.body,
+        metadata=clone_json(artifact.metadata),
+        created_at=artifact.created_at,
+    )
+
+
+def _search_document(artifact: Artifact) -> Document:
+    metadata = _normalize_metadata(artifact.metadata)
+    metadata["artifact_id"] = artifact.artifact_id
+    metadata["media_type"] = artifact.media_type
+    metadata["id"] = artifact.artifact_id
+    return Document(page_content=artifact.body, metadata=metadata)
+
+
+def _index_fingerprint(
+    digest: Optional[str], media_type: str, metadata: Dict[str, Any]
+) -> Optional[str]:
+    if not digest:
+        return None
+    source = json.dumps(
+        [digest, media_type, _normalize_metadata(metadata)],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
 
 
 def _normalize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
@@ -285,7 +865,7 @@ def _normalize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
 
 def _matches_query(artifact: Artifact, query: Dict[str, Any]) -> bool:
     for key, value in query.items():
-        if key in {"text", "query", "k", "limit"}:
+        if key in {"text", "query", "k", "limit", "wait_for_index"}:
             continue
         if key == "metadata" and isinstance(value, dict):
             for meta_key, meta_value in value.items():
@@ -297,39 +877,63 @@ def _matches_query(artifact: Artifact, query: Dict[str, Any]) -> bool:
     return True
 
 
-def _init_artifact_search(data_dir: Path) -> HybridSearchIndex:
-    load_dotenv()
-    base_url = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
-    embed_model = os.environ.get("OLLAMA_EMBED_MODEL", "nomic-embed-text")
-    embeddings = OllamaEmbeddings(model=embed_model, base_url=base_url)
+def _init_artifact_search(
+    data_dir: Path,
+    embeddings: Optional[Embeddings] = None,
+    serializer: Optional[Serializer] = None,
+) -> HybridSearchIndex:
+    if embeddings is None:
+        load_dotenv()
+        base_url = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+        embed_model = os.environ.get("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+        embeddings = OllamaEmbeddings(model=embed_model, base_url=base_url)
+    embeddings = MemoizedEmbeddings(embeddings, cache_dir=data_dir / "embedding_cache")
     persist_dir = data_dir / "search_artifacts"
-    return HybridSearchIndex(persist_dir, "artifacts", embeddings)
+    return HybridSearchIndex(
+        persist_dir, "artifacts", embeddings, serializer=serializer
+    )
 
 
 class JsonFileTurnStore:
-    def __init__(self, data_dir: Path) -> None:
-        self._path = data_dir / "turns.json"
+    def __init__(
+        self,
+        data_dir: Path,
+        journal: bool = False,
+        compact_bytes: int = 4 * 1024 * 1024,
+        durability: str = "flush-only",
+        writer: Optional[GroupCommitWriter] = None,
+        process_lock: bool = False,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
         self._lock = threading.Lock()
-        data_dir.mkdir(parents=True, exist_ok=True)
-        if not self._path.exists():
-            self._path.write_text("{}", encoding="utf-8")
-
-    def _read_all(self) -> Dict[str, Dict[str, Any]]:
-        raw = self._path.read_text(encoding="utf-8")
-        if not raw.strip():
-            return {}
-        return json.loads(raw)
-
-    def _write_all(self, data: Dict[str, Dict[str, Any]]) -> None:
-        self._path.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
+        self._process_lock = ProcessLock(
+            data_dir / "turns.lock" if process_lock else None
+        )
+        self._records = _open_records(
+            data_dir / "turns.json",
+            self._lock,
+            journal=journal,
+            compact_bytes=compact_bytes,
+            writer=writer or GroupCommitWriter(durability),
+            shared=process_lock,
+            serializer=serializer,
         )
 
+    def close(self) -> None:
+        self._records.close()
+        self._process_lock.close()
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        with self._lock, self._process_lock.hold(exclusive):
+            self._records.refresh()
+            yield
+
     def append_user(
         self, conversation_id: str, user_message: str, related_task_id: Optional[str]
     ) -> Turn:
-        with self._lock:
-            data = self._read_all()
+        with self._locked(exclusive=True):
+            data = self._records.load()
             turn_id = str(uuid4())
             turn = Turn(
                 turn_id=turn_id,
@@ -337,9 +941,9 @@ class JsonFileTurnStore:
                 user_message=user_message,
                 related_task_id=related_task_id,
             )
-            data[turn_id] = turn.to_dict()
-            self._write_all(data)
-            return turn
+            self._records.apply(data, "create", turn_id, turn.to_dict())
+        self._records.sync()
+        return turn
 
     def set_assistant(
         self,
@@ -348,27 +952,62 @@ class JsonFileTurnStore:
         artifacts: List[str],
         metadata: Dict[str, Any],
     ) -> Optional[Turn]:
-        with self._lock:
-            data = self._read_all()
-            current = data.get(turn_id)
-            if not current:
+        with self._locked(exclusive=True):
+            data = self._records.load()
+            if turn_id not in data:
                 return None
-            updated = dict(current)
-            updated["assistant_message"] = assistant_message
-            updated["artifacts"] = list(artifacts)
-            updated["metadata"] = dict(metadata)
-            updated["updated_at"] = utc_now()
-            data[turn_id] = updated
-            self._write_all(data)
-            return Turn.from_dict(updated)
+            change = {
+                "assistant_message": assistant_message,
+                "artifacts": list(artifacts),
+                "metadata": dict(metadata),
+                "updated_at": utc_now(),
+            }
+            updated = self._records.apply(data, "set", turn_id, change)
+        self._records.sync()
+        return Turn.from_dict(updated)
 
     def list_recent(self, conversation_id: str, limit: int) -> List[Turn]:
-        with self._lock:
-            data = self._read_all()
-        turns = [
-            Turn.from_dict(value)
-            for value in data.values()
-            if value.get("conversation_id") == conversation_id
-        ]
+        with self._locked(exclusive=False):
+            data = self._records.load()
+            turns = [
+                Turn.from_dict(value)
+                for value in data.values()
+                if value.get("conversation_id") == conversation_id
+            ]
         turns.sort(key=lambda item: item.created_at, reverse=True)
         return list(reversed(turns[:limit]))
+
+
+def _open_records(
+    path: Path,
+    lock: threading.Lock,
+    *,
+    journal: bool,
+    compact_bytes: int,
+    writer: GroupCommitWriter,
+    shared: bool = False,
+    serializer: Optional[Serializer] = None,
+) -> RecordFile:
+    if journal:
+        return JournalFile(
+            path,
+            compact_bytes=compact_bytes,
+            durability=writer.durability,
+            shared=shared,
+            serializer=serializer,
+        )
+    if JournalFile.has_log(path):
+        journal_file = JournalFile(
+            path, compact_bytes=compact_bytes, serializer=serializer
+        )
+        journal_file.checkpoint()
+        journal_file.close()
+    if shared:
+        return SnapshotFile(
+            path,
+            None,
+            lock,
+            fsync=writer.durability == "fsync",
+            serializer=serializer,
+        )
+    return SnapshotFile(path, writer, lock, serializer=serializer)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from trikernel.utils.logging import get_logger
+from trikernel.utils.search import HybridSearchIndex
+
+logger = get_logger(__name__)
+
+IndexJob = Tuple[Document, Optional[str], int, float, int, float]
+
+
+class IndexQueue:
+    def __init__(
+        self,
+        index: HybridSearchIndex,
+        batch_size: int = 64,
+        batch_window: float = 0.01,
+        idle_timeout: float = 1.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 0.5,
+    ) -> None:
+        self._index = index
+        self._batch_size = max(1, batch_size)
+        self._batch_window = batch_window
+        self._idle_timeout = idle_timeout
+        self._max_attempts = max(1, max_attempts)
+        self._retry_backoff = retry_backoff
+        self._cond = threading.Condition()
+        self._pending: "OrderedDict[str, IndexJob]" = OrderedDict()
+        self._inflight_since: Optional[float] = None
+        self._submitted = 0
+        self._indexed = 0
+        self._thread: Optional[threading.Thread] = None
+        self._batches = 0
+        self._documents_indexed = 0
+        self._failures = 0
+        self._retries = 0
+        self._failed: Dict[str, int] = {}
+        _live_queues.add(self)
+
+    @property
+    def generation(self) -> int:
+        with self._cond:
+            return self._submitted
+
+    def submit(self, doc_id: str, doc: Document, fingerprint: Optional[str]) -> int:
+        with self._cond:
+            self._submitted += 1
+            now = time.monotonic()
+            previous = self._pending.pop(doc_id, None)
+            if previous is None:
+                self._pending[doc_id] = (doc, fingerprint, self._submitted, now, 0, now)
+            else:
+                self._pending[doc_id] = (
+                    doc,
+                    fingerprint,
+                    previous[2],
+                    previous[3],
+                    0,
+                    now,
+                )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="trikernel-indexer", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify_all()
+            return self._submitted
+
+    def wait(
+        self, generation: Optional[int] = None, timeout: Optional[float] = None
+    ) -> bool:
+        with self._cond:
+            target = self._submitted if generation is None else generation
+            if not self._cond.wait_for(lambda: self._indexed >= target, timeout):
+                return False
+            return all(failed > target for failed in self._failed.values())
+
+    def failed(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._failed)
+
+    def flush(self) -> None:
+        self.wait()
+        self._index.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            enqueued = [job[3] for job in self._pending.values()]
+            if self._inflight_since is not None:
+                enqueued.append(self._inflight_since)
+            oldest = min(enqueued, default=None)
+            lag = time.monotonic() - oldest if oldest is not None else 0.0
+            return {
+                "depth": len(self._pending),
+                "lag_seconds": lag,
+                "generation": self._submitted,
+                "indexed_generation": self._indexed,
+                "batches": self._batches,
+                "documents_indexed": self._documents_indexed,
+                "failures": self._failures,
+                "retries": self._retries,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait(self._idle_timeout)
+                if not self._pending:
+                    self._thread = None
+                    return
+                delay = min(job[5] for job in self._pending.values()) - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            if self._batch_window > 0:
+                time.sleep(self._batch_window)
+            with self._cond:
+                now = time.monotonic()
+                batch = OrderedDict()
+                for doc_id, job in list(self._pending.items()):
+                    if len(batch) >= self._batch_size:
+                        break
+                    if job[5] <= now:
+                        batch[doc_id] = self._pending.pop(doc_id)
+                if not batch:
+                    continue
+                self._inflight_since = min(job[3] for job in batch.values())
+                target = self._submitted
+            failed = OrderedDict() if self._index_batch(batch) else batch
+            if len(failed) > 1:
+                failed = OrderedDict(
+                    (doc_id, job)
+                    for doc_id, job in failed.items()
+                    if not self._index_batch(OrderedDict([(doc_id, job)]))
+                )
+            with self._cond:
+                self._inflight_since = None
+                for doc_id in batch:
+                    if doc_id not in failed:
+                        self._failed.pop(doc_id, None)
+                self._documents_indexed += len(batch) - len(failed)
+                self._retry(failed)
+                self._indexed = max(
+                    self._indexed,
+                    min(job[2] for job in self._pending.values()) - 1
+                    if self._pending
+                    else target,
+                )
+                self._batches += 1
+                self._cond.notify_all()
+
+    def _retry(self, batch: "OrderedDict[str, IndexJob]") -> None:
+        now = time.monotonic()
+        for doc_id, job in batch.items():
+            newer = self._pending.get(doc_id)
+            if newer is not None:
+                self._pending[doc_id] = newer[:2] + (job[2], job[3]) + newer[4:]
+                continue
+            attempts = job[4] + 1
+            if attempts >= self._max_attempts:
+                self._failed[doc_id] = job[2]
+                self._failures += 1
+                continue
+            ready_at = now + self._retry_backoff * 2 ** (attempts - 1)
+            self._pending[doc_id] = job[:4] + (attempts, ready_at)
+            self._retries += 1
+
+    def _index_batch(self, batch: "OrderedDict[str, IndexJob]") -> bool:
+        try:
+            self._index.upsert_documents(
+                {doc_id: job[0] for doc_id, job in batch.items()},
+                {doc_id: job[1] for doc_id, job in batch.items()},
+            )
+        except Exception:
+            logger.error(
+                "search indexing failed: %d documents", len(batch), exc_info=True
+            )
+            return False
+        return True
+
+
+_live_queues: "weakref.WeakSet[IndexQueue]" = weakref.WeakSet()
+
+
+def _flush_live_queues() -> None:
+    for queue in list(_live_queues):
+        try:
+            queue.flush()
+        except Exception:
+            logger.error("search index flush at exit failed", exc_info=True)
+
+
+atexit.register(_flush_live_queues)
@@ -2,13 +2,29 @@ from __future__ import annotations
 
 
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from trikernel.utils.logging import get_logger
+from trikernel.utils.serialization import Serializer, resolve_serializer
 
-from .file_store import JsonFileArtifactStore, JsonFileTaskStore, JsonFileTurnStore
-from .models import Artifact, Task, TaskType, Turn
+from .change_feed import ChangeFeed, TaskEvent
+from .durability import GroupCommitWriter
+from .file_store import JsonFileArtifactStore, JsonFileTaskStore
+from .models import Artifact, Notification, Task, TaskType, Turn
+from .notification_log import NotificationLog
 from .protocols import ArtifactStore, StateKernelAPI, TaskStore, TurnStore
+from .sqlite_store import SqliteTaskStore
+from .turn_log import TurnLogStore
 
 logger = get_logger(__name__)
 
@@ -19,28 +35,99 @@ class StateKernel(StateKernelAPI):
         task_store: Optional[TaskStore] = None,
         artifact_store: Optional[ArtifactStore] = None,
         turn_store: Optional[TurnStore] = None,
-        data_dir: Optional[Path] = None,
+        notification_log: Optional[NotificationLog] = None,
+        data_dir: Optional[Union[Path, str]] = None,
+        durability: str = "flush-only",
+        archive_after_seconds: Optional[float] = None,
+        process_lock: bool = False,
+        serializer: Union[Serializer, str, None] = None,
     ) -> None:
-        if data_dir is None:
-            data_dir = Path(".state")
-        self._task_store = task_store or JsonFileTaskStore(data_dir)
-        self._artifact_store = artifact_store or JsonFileArtifactStore(data_dir)
-        self._turn_store = turn_store or JsonFileTurnStore(data_dir)
+        backend, data_dir = _resolve_data_dir(data_dir)
+        writer = GroupCommitWriter(durability)
+        serializer = resolve_serializer(serializer)
+        self._task_store = task_store or _default_task_store(
+            backend, data_dir, writer, archive_after_seconds, process_lock, serializer
+        )
+        self._artifact_store = artifact_store or JsonFileArtifactStore(
+            data_dir,
+            writer=writer,
+            process_lock=process_lock,
+            serializer=serializer,
+        )
+        self._turn_store = turn_store or TurnLogStore(
+            data_dir,
+            durability=durability,
+            process_lock=process_lock,
+            serializer=serializer,
+        )
+        self._notifications = notification_log or NotificationLog(
+            data_dir,
+            durability=durability,
+            process_lock=process_lock,
+            serializer=serializer,
+        )
+        self._changes = ChangeFeed()
+        add_listener = getattr(self._task_store, "add_change_listener", None)
+        if add_listener is not None:
+            add_listener(self._changes.publish)
+
+    def close(self) -> None:
+        for store in (
+            self._task_store,
+            self._artifact_store,
+            self._turn_store,
+            self._notifications,
+        ):
+            close = getattr(store, "close", None)
+            if close is not None:
+                close()
 
     def task_create(self, task_type: TaskType, payload: Dict[str, Any]) -> str:
         logger.info(f"task_create: {task_type}, {payload}")
-        return self._task_store.create(task_type, payload).task_id
+        task = self._task_store.create(task_type, payload)
+        self._changes.publish("created", [task])
+        return task.task_id
+
+    def task_create_many(
+        self, tasks: Sequence[Tuple[TaskType, Dict[str, Any]]]
+    ) -> List[str]:
+        logger.info(f"task_create_many: {len(tasks)} tasks")
+        created = self._task_store.create_many(tasks)
+        self._changes.publish("created", created)
+        return [task.task_id for task in created]
 
     def task_get(self, task_id: str) -> Optional[Task]:
         return self._task_store.get(task_id)
 
+    def task_get_many(self, task_ids: Sequence[str]) -> List[Optional[Task]]:
+        return self._task_store.get_many(task_ids)
+
     def task_update(self, task_id: str, patch: Dict[str, Any]) -> Optional[Task]:
-        return self._task_store.update(task_id, patch)
+        task = self._task_store.update(task_id, patch)
+        self._changes.publish("updated", [task])
+        return task
+
+    def task_update_many(
+        self, updates: Sequence[Tuple[str, Dict[str, Any]]]
+    ) -> List[Optional[Task]]:
+        updated = self._task_store.update_many(updates)
+        self._changes.publish("updated", updated)
+        return updated
 
     def task_list(
-        self, task_type: Optional[str] = None, state: Optional[str] = None
-    ) -> List[Task]:
-        return self._task_store.list(task_type=task_type, state=state)
+        self,
+        task_type: Optional[str] = None,
+        state: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> Union[List[Task], List[Dict[str, Any]]]:
+        options: Dict[str, Any] = {}
+        if fields is not None:
+            options.update(fields=fields, preview_chars=preview_chars)
+        if include_archived:
+            options["include_archived"] = True
+        return self._task_store.list(task_type=task_type, state=state, **options)
 
     def task_claim(
         self,
@@ -49,13 +136,65 @@ class StateKernel(StateKernelAPI):
         ttl_seconds: int,
     ) -> Optional[str]:
         task = self._task_store.claim(filter_by, claimer_id, ttl_seconds)
+        self._changes.publish("claimed", [task])
         return task.task_id if task else None
 
     def task_complete(self, task_id: str) -> Optional[Task]:
-        return self._task_store.complete(task_id)
+        task = self._task_store.complete(task_id)
+        self._changes.publish("updated", [task])
+        return task
 
     def task_fail(self, task_id: str, error_info: Dict[str, Any]) -> Optional[Task]:
-        return self._task_store.fail(task_id, error_info)
+        task = self._task_store.fail(task_id, error_info)
+        self._changes.publish("updated", [task])
+        return task
+
+    def task_events(
+        self,
+        since_seq: Optional[int] = None,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, List[TaskEvent]]:
+        poll_changes = getattr(self._task_store, "poll_changes", None)
+        if poll_changes is not None:
+            poll_changes()
+        return self._changes.since(since_seq, filter_by)
+
+    def subscribe(
+        self,
+        filter_by: Optional[Dict[str, Any]] = None,
+        since_seq: Optional[int] = None,
+    ) -> AsyncIterator[TaskEvent]:
+        return self._changes.subscribe(filter_by, since_seq)
+
+    def notification_publish(
+        self,
+        message: str,
+        severity: str = "info",
+        related_task_id: Optional[str] = None,
+        artifact_refs: Optional[List[str]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        notification = {
+            "message": message,
+            "severity": severity,
+            "related_task_id": related_task_id,
+            "artifact_refs": artifact_refs or [],
+            "meta": meta,
+        }
+        return self._notifications.publish_many([notification])[0]
+
+    def notification_publish_many(
+        self, notifications: Sequence[Dict[str, Any]]
+    ) -> List[int]:
+        return self._notifications.publish_many(notifications)
+
+    def notification_fetch(
+        self, subscriber: str, since_cursor: Optional[int] = None, limit: int = 100
+    ) -> List[Notification]:
+        return self._notifications.fetch(subscriber, since_cursor, limit)
+
+    def notification_ack(self, subscriber: str, cursor: int) -> int:
+        return self._notifications.ack(subscriber, cursor)
 
     def artifact_write(
         self, media_type: str, body: str, metadata: Dict[str, Any]
@@ -65,6 +204,21 @@ class StateKernel(StateKernelAPI):
     def artifact_read(self, artifact_id: str) -> Optional[Artifact]:
         return self._artifact_store.read(artifact_id)
 
+    def artifact_read_many(
+        self, artifact_ids: Sequence[str]
+    ) -> List[Optional[Artifact]]:
+        return self._artifact_store.read_many(artifact_ids)
+
+    def artifact_read_range(
+        self, artifact_id: str, offset: int, length: int
+    ) -> Optional[str]:
+        return self._artifact_store.read_range(artifact_id, offset, length)
+
+    def artifact_open(
+        self, artifact_id: str, chunk_size: int = 64 * 1024
+    ) -> Optional[Iterator[str]]:
+        return self._artifact_store.open(artifact_id, chunk_size)
+
     def artifact_write_named(
         self, artifact_id: str, media_type: str, body: str, metadata: Dict[str, Any]
     ) -> str:
@@ -72,8 +226,16 @@ class StateKernel(StateKernelAPI):
             artifact_id, media_type, body, metadata
         ).artifact_id
 
-    def artifact_list(self) -> List[Artifact]:
-        return list(self._artifact_store.list())
+    def artifact_list(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+    ) -> Union[List[Artifact], List[Dict[str, Any]]]:
+        if fields is None:
+            return list(self._artifact_store.list())
+        return list(
+            self._artifact_store.list(fields=fields, preview_chars=preview_chars)
+        )
 
     def artifact_search(self, query: Dict[str, Any]) -> List[Artifact]:
         return list(self._artifact_store.search(query))
@@ -101,3 +263,35 @@ class StateKernel(StateKernelAPI):
 
     def turn_list_recent(self, conversation_id: str, limit: int) -> List[Turn]:
         return self._turn_store.list_recent(conversation_id, limit)
+
+
+def _resolve_data_dir(data_dir: Optional[Union[Path, str]]) -> Tuple[str, Path]:
+    if data_dir is None:
+        return "json", Path(".state")
+    if isinstance(data_dir, str) and data_dir.startswith("sqlite://"):
+        return "sqlite", Path(data_dir[len("sqlite://") :] or ".state")
+    return "json", Path(data_dir)
+
+
+def _default_task_store(
+    backend: str,
+    data_dir: Path,
+    writer: GroupCommitWriter,
+    archive_after_seconds: Optional[float],
+    process_lock: bool,
+    serializer: Serializer,
+) -> TaskStore:
+    if backend == "sqlite":
+        return SqliteTaskStore(
+            data_dir / "tasks.db",
+            durability=writer.durability,
+            archive_after_seconds=archive_after_seconds,
+            serializer=serializer,
+        )
+    return JsonFileTaskStore(
+        data_dir,
+        writer=writer,
+        archive_after_seconds=archive_after_seconds,
+        process_lock=process_lock,
+        serializer=serializer,
+    )
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Literal
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Literal, Sequence, Tuple
 
 from ..utils.time_utils import now_iso
 
@@ -11,12 +11,94 @@ def utc_now() -> str:
     return now_iso()
 
 
+def _or_now(value: Optional[str]) -> str:
+    return value if value is not None else now_iso()
+
+
+def clone_json(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: clone_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone_json(item) for item in value]
+    return value
+
+
 def parse_time(value: Optional[str]) -> Optional[datetime]:
     if value is None:
         return None
     return datetime.fromisoformat(value)
 
 
+def timestamp_of(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def merge_patch(target: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(target)
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_patch(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def field_path(name: str, allowed: Iterable[str]) -> Tuple[str, List[str]]:
+    head, *rest = name.split(".")
+    if head not in allowed:
+        raise ValueError(f"unknown field: {name}")
+    return head, rest
+
+
+def project_record(
+    record: Dict[str, Any],
+    fields: Sequence[str],
+    preview_chars: Optional[int] = None,
+    previewable: Iterable[str] = (),
+) -> Dict[str, Any]:
+    projected: Dict[str, Any] = {}
+    for name in fields:
+        head, *rest = name.split(".")
+        value: Any = record.get(head)
+        for key in rest:
+            value = value.get(key) if isinstance(value, dict) else None
+        if preview_chars is not None and head in previewable:
+            value = truncate_strings(value, preview_chars)
+        projected[name] = clone_json(value)
+    return projected
+
+
+def truncate_strings(value: Any, limit: int) -> Any:
+    if isinstance(value, str):
+        return value[:limit]
+    if isinstance(value, dict):
+        return {key: truncate_strings(item, limit) for key, item in value.items()}
+    if isinstance(value, list):
+        return [truncate_strings(item, limit) for item in value]
+    return value
+
+
+def complete_patch() -> Dict[str, Any]:
+    return {"state": "done", "claimed_by": None, "claim_expires_at": None}
+
+
+def fail_patch(error_info: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "state": "failed",
+        "payload": {"error": error_info},
+        "claimed_by": None,
+        "claim_expires_at": None,
+    }
+
+
 TaskType = Literal[
     "user_request",
     "work",
@@ -32,7 +114,7 @@ TaskType = Literal[
 ]
 
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     task_id: str
     task_type: TaskType
@@ -48,7 +130,7 @@ class Task:
         return {
             "task_id": self.task_id,
             "task_type": self.task_type,
-            "payload": self.payload,
+            "payload": clone_json(self.payload),
             "state": self.state,
             "artifact_refs": list(self.artifact_refs),
             "created_at": self.created_at,
@@ -62,17 +144,17 @@ class Task:
         return cls(
             task_id=data["task_id"],
             task_type=data["task_type"],
-            payload=data.get("payload", {}),
+            payload=clone_json(data.get("payload") or {}),
             state=data["state"],
-            artifact_refs=list(data.get("artifact_refs", [])),
-            created_at=data.get("created_at", utc_now()),
-            updated_at=data.get("updated_at", utc_now()),
+            artifact_refs=list(data.get("artifact_refs") or ()),
+            created_at=_or_now(data.get("created_at")),
+            updated_at=_or_now(data.get("updated_at")),
             claimed_by=data.get("claimed_by"),
             claim_expires_at=data.get("claim_expires_at"),
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Artifact:
     artifact_id: str
     media_type: str
@@ -85,7 +167,7 @@ class Artifact:
             "artifact_id": self.artifact_id,
             "media_type": self.media_type,
             "body": self.body,
-            "metadata": self.metadata,
+            "metadata": clone_json(self.metadata),
             "created_at": self.created_at,
         }
 
@@ -95,12 +177,12 @@ class Artifact:
             artifact_id=data["artifact_id"],
             media_type=data["media_type"],
             body=data.get("body", ""),
-            metadata=data.get("metadata", {}),
-            created_at=data.get("created_at", utc_now()),
+            metadata=clone_json(data.get("metadata") or {}),
+            created_at=_or_now(data.get("created_at")),
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Turn:
     turn_id: str
     conversation_id: str
@@ -119,7 +201,7 @@ class Turn:
             "user_message": self.user_message,
             "assistant_message": self.assistant_message,
             "artifacts": list(self.artifacts),
-            "metadata": self.metadata,
+            "metadata": clone_json(self.metadata),
             "related_task_id": self.related_task_id,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
@@ -132,9 +214,47 @@ class Turn:
             conversation_id=data["conversation_id"],
             user_message=data.get("user_message", ""),
             assistant_message=data.get("assistant_message"),
-            artifacts=list(data.get("artifacts", [])),
-            metadata=data.get("metadata", {}),
+            artifacts=list(data.get("artifacts") or ()),
+            metadata=clone_json(data.get("metadata") or {}),
             related_task_id=data.get("related_task_id"),
-            created_at=data.get("created_at", utc_now()),
-            updated_at=data.get("updated_at", utc_now()),
+            created_at=_or_now(data.get("created_at")),
+            updated_at=_or_now(data.get("updated_at")),
         )
+
+
+@dataclass(slots=True)
+class Notification:
+    cursor: int
+    message: str
+    severity: str = "info"
+    related_task_id: Optional[str] = None
+    artifact_refs: List[str] = field(default_factory=list)
+    meta: Optional[Dict[str, Any]] = None
+    created_at: str = field(default_factory=utc_now)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cursor": self.cursor,
+            "message": self.message,
+            "severity": self.severity,
+            "related_task_id": self.related_task_id,
+            "artifact_refs": list(self.artifact_refs),
+            "meta": clone_json(self.meta),
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Notification":
+        return cls(
+            cursor=data["cursor"],
+            message=data.get("message", ""),
+            severity=data.get("severity", "info"),
+            related_task_id=data.get("related_task_id"),
+            artifact_refs=list(data.get("artifact_refs") or ()),
+            meta=clone_json(data.get("meta")),
+            created_at=_or_now(data.get("created_at")),
+        )
+
+
+TASK_FIELDS = tuple(Task.__dataclass_fields__)
+ARTIFACT_FIELDS = tuple(Artifact.__dataclass_fields__) + ("size",)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from trikernel.utils.serialization import Serializer, decode, resolve_serializer
+
+from .durability import DURABILITY_MODES, atomic_write_text
+from .models import Notification, utc_now
+from .process_lock import ProcessLock
+
+_OFFSET = struct.Struct(">Q")
+
+
+class NotificationLog:
+    def __init__(
+        self,
+        data_dir: Path,
+        durability: str = "flush-only",
+        process_lock: bool = False,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        self._dir = data_dir / "notifications"
+        self._log_path = self._dir / "notifications.jsonl"
+        self._index_path = self._dir / "notifications.idx"
+        self._cursors_path = self._dir / "cursors.json"
+        self._fsync = durability == "fsync"
+        self._serializer = resolve_serializer(serializer, line_safe=True)
+        self._lock = threading.Lock()
+        self._process_lock = ProcessLock(
+            self._dir / "notifications.lock" if process_lock else None
+        )
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._cursors = self._load_cursors()
+
+    def publish_many(self, notifications: Sequence[Dict[str, Any]]) -> List[int]:
+        if not notifications:
+            return []
+        with self._locked(exclusive=True):
+            first = self._count() + 1
+            records = [
+                Notification.from_dict(
+                    {**item, "cursor": first + index, "created_at": utc_now()}
+                ).to_dict()
+                for index, item in enumerate(notifications)
+            ]
+            offsets = self._append_records(records)
+            self._append_offsets(offsets)
+        return [record["cursor"] for record in records]
+
+    def fetch(
+        self, subscriber: str, since_cursor: Optional[int] = None, limit: int = 100
+    ) -> List[Notification]:
+        if limit <= 0:
+            return []
+        with self._locked(exclusive=False):
+            start = since_cursor
+            if start is None:
+                start = self._cursor_of(subscriber)
+            start = max(0, start)
+            offsets = self._read_offsets(start, start + limit)
+            if not offsets:
+                return []
+            with open(self._log_path, "rb") as log:
+                notifications = []
+                for offset in offsets:
+                    log.seek(offset)
+                    record = decode(log.readline())
+                    notifications.append(Notification.from_dict(record))
+        return notifications
+
+    def ack(self, subscriber: str, cursor: int) -> int:
+        with self._locked(exclusive=True):
+            acked = max(self._cursor_of(subscriber), min(cursor, self._count()))
+            if acked != self._cursors.get(subscriber):
+                self._cursors[subscriber] = acked
+                atomic_write_text(
+                    self._cursors_path,
+                    json.dumps(self._cursors, ensure_ascii=False),
+                    fsync=self._fsync,
+                )
+        return acked
+
+    def cursor(self, subscriber: str) -> int:
+        with self._locked(exclusive=False):
+            return self._cursor_of(subscriber)
+
+    def close(self) -> None:
+        self._process_lock.close()
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        with self._lock, self._process_lock.hold(exclusive):
+            if self._process_lock.enabled:
+                self._cursors = self._load_cursors()
+            yield
+
+    def _cursor_of(self, subscriber: str) -> int:
+        return int(self._cursors.get(subscriber, 0))
+
+    def _load_cursors(self) -> Dict[str, int]:
+        try:
+            return json.loads(self._cursors_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    def _count(self) -> int:
+        try:
+            return self._index_path.stat().st_size // _OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def _append_records(self, records: List[Dict[str, Any]]) -> List[int]:
+        offsets = []
+        with open(self._log_path, "ab") as log:
+            offset = log.seek(0, os.SEEK_END)
+            for record in records:
+                line = self._serializer.dumps(record) + b"\n"
+                log.write(line)
+                offsets.append(offset)
+                offset += len(line)
+            log.flush()
+            if self._fsync:
+                os.fsync(log.fileno())
+        return offsets
+
+    def _append_offsets(self, offsets: List[int]) -> None:
+        mode = "r+b" if self._index_path.exists() else "wb"
+        with open(self._index_path, mode) as index:
+            index.seek(self._count() * _OFFSET.size)
+            index.write(b"".join(_OFFSET.pack(offset) for offset in offsets))
+            index.flush()
+            if self._fsync:
+                os.fsync(index.fileno())
+
+    def _read_offsets(self, start: int, end: int) -> List[int]:
+        if end <= start or not self._index_path.exists():
+            return []
+        with open(self._index_path, "rb") as index:
+            index.seek(start * _OFFSET.size)
+            raw = index.read((end - start) * _OFFSET.size)
+        usable = len(raw) - len(raw) % _OFFSET.size
+        return [value for (value,) in _OFFSET.iter_unpack(raw[:usable])]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl  # type: ignore
+except ImportError:
+    fcntl = None
+
+
+class ProcessLock:
+    def __init__(self, path: Optional[Path]) -> None:
+        if path is not None and fcntl is None:
+            raise RuntimeError("process_lock requires fcntl (POSIX only)")
+        self._path = path
+        self._fd: Optional[int] = None
+        self._depth = 0
+        self._exclusive = False
+        self._guard = threading.RLock()
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self._path is not None
+
+    @contextmanager
+    def hold(self, exclusive: bool) -> Iterator[None]:
+        if self._path is None:
+            yield
+            return
+        with self._guard:
+            if self._fd is None:
+                self._fd = os.open(str(self._path), os.O_RDWR | os.O_CREAT, 0o644)
+            outer = self._depth == 0
+            if outer:
+                fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._exclusive = exclusive
+            elif exclusive and not self._exclusive:
+                raise RuntimeError("cannot upgrade a shared process lock")
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if outer:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        with self._guard:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -1,22 +1,48 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List, Optional, Protocol
-
-from .models import Artifact, Task, TaskType, Turn
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .change_feed import TaskEvent
+from .models import Artifact, Notification, Task, TaskType, Turn
 
 
 class TaskStore(Protocol):
     def create(self, task_type: str, payload: Dict[str, Any]) -> Task: ...
 
+    def create_many(
+        self, tasks: Sequence[Tuple[TaskType, Dict[str, Any]]]
+    ) -> List[Task]: ...
+
     def get(self, task_id: str) -> Optional[Task]: ...
 
+    def get_many(self, task_ids: Sequence[str]) -> List[Optional[Task]]: ...
+
     def update(self, task_id: str, patch: Dict[str, Any]) -> Optional[Task]: ...
 
+    def update_many(
+        self, updates: Sequence[Tuple[str, Dict[str, Any]]]
+    ) -> List[Optional[Task]]: ...
+
     def list(
         self,
         task_type: Optional[str] = None,
         state: Optional[str] = None,
-    ) -> List[Task]: ...
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> Union[List[Task], List[Dict[str, Any]]]: ...
 
     def claim(
         self,
@@ -37,11 +63,25 @@ class ArtifactStore(Protocol):
 
     def read(self, artifact_id: str) -> Optional[Artifact]: ...
 
+    def read_many(self, artifact_ids: Sequence[str]) -> List[Optional[Artifact]]: ...
+
+    def read_range(
+        self, artifact_id: str, offset: int, length: int
+    ) -> Optional[str]: ...
+
+    def open(
+        self, artifact_id: str, chunk_size: int = 64 * 1024
+    ) -> Optional[Iterator[str]]: ...
+
     def write_named(
         self, artifact_id: str, media_type: str, body: str, metadata: Dict[str, Any]
     ) -> Artifact: ...
 
-    def list(self) -> List[Artifact]: ...
+    def list(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+    ) -> Union[List[Artifact], List[Dict[str, Any]]]: ...
 
     def search(self, query: Dict[str, Any]) -> Iterable[Artifact]: ...
 
@@ -65,15 +105,28 @@ class TurnStore(Protocol):
 class StateKernelAPI(Protocol):
     def task_create(self, task_type: TaskType, payload: Dict[str, Any]) -> str: ...
 
+    def task_create_many(
+        self, tasks: Sequence[Tuple[TaskType, Dict[str, Any]]]
+    ) -> List[str]: ...
+
     def task_get(self, task_id: str) -> Optional[Task]: ...
 
+    def task_get_many(self, task_ids: Sequence[str]) -> List[Optional[Task]]: ...
+
     def task_update(self, task_id: str, patch: Dict[str, Any]) -> Optional[Task]: ...
 
+    def task_update_many(
+        self, updates: Sequence[Tuple[str, Dict[str, Any]]]
+    ) -> List[Optional[Task]]: ...
+
     def task_list(
         self,
         task_type: Optional[str] = None,
         state: Optional[str] = None,
-    ) -> List[Task]: ...
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> Union[List[Task], List[Dict[str, Any]]]: ...
 
     def task_claim(
         self,
@@ -86,17 +139,64 @@ class StateKernelAPI(Protocol):
 
     def task_fail(self, task_id: str, error_info: Dict[str, Any]) -> Optional[Task]: ...
 
+    def task_events(
+        self,
+        since_seq: Optional[int] = None,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, List[TaskEvent]]: ...
+
+    def subscribe(
+        self,
+        filter_by: Optional[Dict[str, Any]] = None,
+        since_seq: Optional[int] = None,
+    ) -> AsyncIterator[TaskEvent]: ...
+
+    def notification_publish(
+        self,
+        message: str,
+        severity: str = "info",
+        related_task_id: Optional[str] = None,
+        artifact_refs: Optional[List[str]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> int: ...
+
+    def notification_publish_many(
+        self, notifications: Sequence[Dict[str, Any]]
+    ) -> List[int]: ...
+
+    def notification_fetch(
+        self, subscriber: str, since_cursor: Optional[int] = None, limit: int = 100
+    ) -> List[Notification]: ...
+
+    def notification_ack(self, subscriber: str, cursor: int) -> int: ...
+
     def artifact_write(
         self, media_type: str, body: str, metadata: Dict[str, Any]
     ) -> str: ...
 
     def artifact_read(self, artifact_id: str) -> Optional[Artifact]: ...
 
+    def artifact_read_many(
+        self, artifact_ids: Sequence[str]
+    ) -> List[Optional[Artifact]]: ...
+
+    def artifact_read_range(
+        self, artifact_id: str, offset: int, length: int
+    ) -> Optional[str]: ...
+
+    def artifact_open(
+        self, artifact_id: str, chunk_size: int = 64 * 1024
+    ) -> Optional[Iterator[str]]: ...
+
     def artifact_write_named(
         self, artifact_id: str, media_type: str, body: str, metadata: Dict[str, Any]
     ) -> str: ...
 
-    def artifact_list(self) -> List[Artifact]: ...
+    def artifact_list(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+    ) -> Union[List[Artifact], List[Dict[str, Any]]]: ...
 
     def artifact_search(self, query: Dict[str, Any]) -> List[Artifact]: ...
 
@@ -116,3 +216,127 @@ class StateKernelAPI(Protocol):
     ) -> Optional[Turn]: ...
 
     def turn_list_recent(self, conversation_id: str, limit: int) -> List[Turn]: ...
+
+
+class AsyncStateKernelAPI(Protocol):
+    async def task_create(
+        self, task_type: TaskType, payload: Dict[str, Any]
+    ) -> str: ...
+
+    async def task_create_many(
+        self, tasks: Sequence[Tuple[TaskType, Dict[str, Any]]]
+    ) -> List[str]: ...
+
+    async def task_get(self, task_id: str) -> Optional[Task]: ...
+
+    async def task_get_many(self, task_ids: Sequence[str]) -> List[Optional[Task]]: ...
+
+    async def task_update(
+        self, task_id: str, patch: Dict[str, Any]
+    ) -> Optional[Task]: ...
+
+    async def task_update_many(
+        self, updates: Sequence[Tuple[str, Dict[str, Any]]]
+    ) -> List[Optional[Task]]: ...
+
+    async def task_list(
+        self,
+        task_type: Optional[str] = None,
+        state: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> Union[List[Task], List[Dict[str, Any]]]: ...
+
+    async def task_claim(
+        self,
+        filter_by: Dict[str, Any],
+        claimer_id: str,
+        ttl_seconds: int,
+    ) -> Optional[str]: ...
+
+    async def task_complete(self, task_id: str) -> Optional[Task]: ...
+
+    async def task_fail(
+        self, task_id: str, error_info: Dict[str, Any]
+    ) -> Optional[Task]: ...
+
+    async def task_events(
+        self,
+        since_seq: Optional[int] = None,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, List[TaskEvent]]: ...
+
+    def subscribe(
+        self,
+        filter_by: Optional[Dict[str, Any]] = None,
+        since_seq: Optional[int] = None,
+    ) -> AsyncIterator[TaskEvent]: ...
+
+    async def notification_publish(
+        self,
+        message: str,
+        severity: str = "info",
+        related_task_id: Optional[str] = None,
+        artifact_refs: Optional[List[str]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> int: ...
+
+    async def notification_publish_many(
+        self, notifications: Sequence[Dict[str, Any]]
+    ) -> List[int]: ...
+
+    async def notification_fetch(
+        self, subscriber: str, since_cursor: Optional[int] = None, limit: int = 100
+    ) -> List[Notification]: ...
+
+    async def notification_ack(self, subscriber: str, cursor: int) -> int: ...
+
+    async def artifact_write(
+        self, media_type: str, body: str, metadata: Dict[str, Any]
+    ) -> str: ...
+
+    async def artifact_read(self, artifact_id: str) -> Optional[Artifact]: ...
+
+    async def artifact_read_many(
+        self, artifact_ids: Sequence[str]
+    ) -> List[Optional[Artifact]]: ...
+
+    async def artifact_read_range(
+        self, artifact_id: str, offset: int, length: int
+    ) -> Optional[str]: ...
+
+    async def artifact_open(
+        self, artifact_id: str, chunk_size: int = 64 * 1024
+    ) -> Optional[AsyncIterator[str]]: ...
+
+    async def artifact_write_named(
+        self, artifact_id: str, media_type: str, body: str, metadata: Dict[str, Any]
+    ) -> str: ...
+
+    async def artifact_list(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+    ) -> Union[List[Artifact], List[Dict[str, Any]]]: ...
+
+    async def artifact_search(self, query: Dict[str, Any]) -> List[Artifact]: ...
+
+    async def turn_append_user(
+        self,
+        conversation_id: str,
+        user_message: str,
+        related_task_id: Optional[str],
+    ) -> str: ...
+
+    async def turn_set_assistant(
+        self,
+        turn_id: str,
+        assistant_message: str,
+        artifacts: List[str],
+        metadata: Dict[str, Any],
+    ) -> Optional[Turn]: ...
+
+    async def turn_list_recent(
+        self, conversation_id: str, limit: int
+    ) -> List[Turn]: ...
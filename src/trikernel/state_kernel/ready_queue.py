@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import timestamp_of
+
+CLAIMABLE_STATES = ("queued", "running")
+
+Records = Dict[str, Dict[str, Any]]
+_ReadyEntry = Tuple[float, float, int, int, str]
+_LeaseEntry = Tuple[float, int, str]
+
+
+class ReadyQueue:
+    def __init__(self) -> None:
+        self._reset()
+
+    def rebuild(self, data: Records) -> None:
+        self._reset()
+        for task_id, raw in data.items():
+            self.update(task_id, raw)
+
+    def _reset(self) -> None:
+        self._ready: Dict[str, List[_ReadyEntry]] = {}
+        self._leases: List[_LeaseEntry] = []
+        self._versions: Dict[str, int] = {}
+        self._order: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[str, str], Dict[str, None]] = {}
+        self._bucket_of: Dict[str, Tuple[str, str]] = {}
+        self._counter = itertools.count()
+        self._entries = 0
+
+    def update(self, task_id: str, raw: Dict[str, Any]) -> None:
+        order = self._order.get(task_id)
+        if order is None:
+            order = self._order[task_id] = next(self._counter)
+        version = self._versions.get(task_id, 0) + 1
+        self._versions[task_id] = version
+        self._move_bucket(task_id, (raw.get("task_type", ""), raw.get("state", "")))
+        if raw.get("state") not in CLAIMABLE_STATES:
+            return
+        expires = timestamp_of(raw.get("claim_expires_at"))
+        if raw.get("claimed_by") and expires is not None:
+            heapq.heappush(self._leases, (expires, version, task_id))
+        else:
+            self._push_ready(task_id, raw, order, version)
+        self._entries += 1
+        if self._entries > 1024 and self._entries > 4 * len(self._versions):
+            self._compact()
+
+    def remove(self, task_id: str) -> None:
+        self._versions.pop(task_id, None)
+        self._order.pop(task_id, None)
+        bucket = self._bucket_of.pop(task_id, None)
+        if bucket is not None:
+            self._buckets[bucket].pop(task_id, None)
+
+    def ids(
+        self, task_type: Optional[str] = None, state: Optional[str] = None
+    ) -> List[str]:
+        matched: List[str] = []
+        for (bucket_type, bucket_state), task_ids in self._buckets.items():
+            if task_type is not None and bucket_type != task_type:
+                continue
+            if state is not None and bucket_state != state:
+                continue
+            matched.extend(task_ids)
+        matched.sort(key=self._order.__getitem__)
+        return matched
+
+    def next_claimable(
+        self, data: Records, filter_by: Dict[str, Any], now: float
+    ) -> Optional[str]:
+        self._release_expired_leases(data, now)
+        task_id = filter_by.get("task_id")
+        if task_id is not None:
+            raw = data.get(task_id)
+            if raw and _claimable(raw, now) and _matches(raw, filter_by):
+                return task_id
+            return None
+        task_type = filter_by.get("task_type")
+        if task_type is not None:
+            heaps = [self._ready.get(task_type, [])]
+        else:
+            heaps = list(self._ready.values())
+        extra_filter = {
+            key: value for key, value in filter_by.items() if key != "task_type"
+        }
+        if not extra_filter:
+            tops = [entry for entry in (self._top(heap) for heap in heaps) if entry]
+            return min(tops)[-1] if tops else None
+        for entry in sorted(itertools.chain.from_iterable(heaps)):
+            candidate = entry[-1]
+            if not self._is_current(entry[3], candidate):
+                continue
+            raw = data.get(candidate)
+            if raw and _claimable(raw, now) and _matches(raw, filter_by):
+                return candidate
+        return None
+
+    def _top(self, heap: List[_ReadyEntry]) -> Optional[_ReadyEntry]:
+        while heap and not self._is_current(heap[0][3], heap[0][-1]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _release_expired_leases(self, data: Records, now: float) -> None:
+        while self._leases and self._leases[0][0] <= now:
+            _, version, task_id = heapq.heappop(self._leases)
+            if not self._is_current(version, task_id):
+                continue
+            raw = data.get(task_id)
+            if raw:
+                self._push_ready(task_id, raw, self._order[task_id], version)
+
+    def _push_ready(
+        self, task_id: str, raw: Dict[str, Any], order: int, version: int
+    ) -> None:
+        run_at = timestamp_of((raw.get("payload") or {}).get("run_at"))
+        created_at = timestamp_of(raw.get("created_at"))
+        entry = (
+            float("-inf") if run_at is None else run_at,
+            float("-inf") if created_at is None else created_at,
+            order,
+            version,
+            task_id,
+        )
+        heapq.heappush(self._ready.setdefault(raw.get("task_type", ""), []), entry)
+
+    def _is_current(self, version: int, task_id: str) -> bool:
+        return self._versions.get(task_id) == version
+
+    def _move_bucket(self, task_id: str, key: Tuple[str, str]) -> None:
+        previous = self._bucket_of.get(task_id)
+        if previous == key:
+            return
+        if previous is not None:
+            self._buckets[previous].pop(task_id, None)
+        self._buckets.setdefault(key, {})[task_id] = None
+        self._bucket_of[task_id] = key
+
+    def _compact(self) -> None:
+        for task_type, heap in self._ready.items():
+            live = [entry for entry in heap if self._is_current(entry[3], entry[-1])]
+            heapq.heapify(live)
+            self._ready[task_type] = live
+        self._leases = [
+            entry for entry in self._leases if self._is_current(entry[1], entry[2])
+        ]
+        heapq.heapify(self._leases)
+        self._entries = sum(len(heap) for heap in self._ready.values()) + len(
+            self._leases
+        )
+
+
+def _claimable(raw: Dict[str, Any], now: float) -> bool:
+    if raw.get("state") not in CLAIMABLE_STATES:
+        return False
+    expires = timestamp_of(raw.get("claim_expires_at"))
+    return not (raw.get("claimed_by") and expires is not None and expires > now)
+
+
+def _matches(raw: Dict[str, Any], filter_by: Dict[str, Any]) -> bool:
+    for key, value in filter_by.items():
+        if raw.get(key) != value:
+            return False
+    return True
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+
+from trikernel.utils.logging import get_logger
+from trikernel.utils.serialization import Serializer, decode, resolve_serializer
+
+from .durability import DURABILITY_MODES, GroupCommitWriter, atomic_write_bytes
+from .models import merge_patch
+
+logger = get_logger(__name__)
+
+Records = Dict[str, Dict[str, Any]]
+Change = Tuple[str, str, Dict[str, Any]]
+
+
+class RecordFile(Protocol):
+    hits: int
+    reloads: int
+
+    def load(self) -> Records: ...
+
+    def apply(
+        self, data: Records, op: str, key: str, change: Dict[str, Any]
+    ) -> Dict[str, Any]: ...
+
+    def apply_many(
+        self, data: Records, changes: Sequence[Change]
+    ) -> List[Dict[str, Any]]: ...
+
+    def refresh(self) -> Optional[List[str]]: ...
+
+    def sync(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+def apply_change(
+    data: Records, op: str, key: str, change: Dict[str, Any]
+) -> Dict[str, Any]:
+    if op == "delete":
+        return data.pop(key, {})
+    if op == "create":
+        value = dict(change)
+    elif op == "set":
+        value = dict(data[key])
+        value.update(change)
+    else:
+        value = merge_patch(data[key], change)
+    data[key] = value
+    return value
+
+
+class SnapshotFile:
+    def __init__(
+        self,
+        path: Path,
+        writer: Optional[GroupCommitWriter],
+        lock: threading.Lock,
+        fsync: bool = False,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
+        self._path = path
+        self._writer = writer
+        self._fsync = fsync
+        self._serializer = resolve_serializer(serializer)
+        self._lock = lock
+        self._data: Optional[Records] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._applied = 0
+        self._rendered = 0
+        self._generation = 0
+        self.hits = 0
+        self.reloads = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            atomic_write_bytes(path, self._serializer.dumps({}))
+
+    def load(self) -> Records:
+        if self._data is not None and (
+            self._applied != self._rendered
+            or _file_signature(self._path) == self._signature
+        ):
+            self.hits += 1
+            return self._data
+        signature = _file_signature(self._path)
+        raw = self._path.read_bytes()
+        self._data = decode(raw) if raw.strip() else {}
+        self._signature = signature
+        self.reloads += 1
+        return self._data
+
+    def apply(
+        self, data: Records, op: str, key: str, change: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return self.apply_many(data, [(op, key, change)])[0]
+
+    def apply_many(
+        self, data: Records, changes: Sequence[Change]
+    ) -> List[Dict[str, Any]]:
+        values = [apply_change(data, op, key, change) for op, key, change in changes]
+        if not values:
+            return values
+        self._data = data
+        self._applied += 1
+        if self._writer is None:
+            atomic_write_bytes(
+                self._path, self._serializer.dumps(data), fsync=self._fsync
+            )
+            self._rendered = self._applied
+            self._signature = _file_signature(self._path)
+        else:
+            self._generation = self._writer.submit(self._path, self)
+        return values
+
+    def refresh(self) -> Optional[List[str]]:
+        if self._writer is not None or self._data is None:
+            return []
+        if _file_signature(self._path) == self._signature:
+            return []
+        self.load()
+        return None
+
+    def sync(self) -> None:
+        if self._writer is not None:
+            self._writer.wait(self._generation)
+
+    def render(self) -> bytes:
+        with self._lock:
+            self._rendered = self._applied
+            return self._serializer.dumps(self._data or {})
+
+    def written(self) -> None:
+        with self._lock:
+            self._signature = _file_signature(self._path)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+
+
+class JournalFile:
+    def __init__(
+        self,
+        path: Path,
+        compact_bytes: int = 4 * 1024 * 1024,
+        durability: str = "flush-only",
+        shared: bool = False,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        self._path = path
+        self._durability = durability
+        self._shared = shared
+        self._serializer = resolve_serializer(serializer)
+        self._line_serializer = resolve_serializer(serializer, line_safe=True)
+        self._log_path = path.with_name(f"{path.stem}.journal.jsonl")
+        self._compacting_path = path.with_name(f"{path.stem}.journal.compacting.jsonl")
+        self._compact_bytes = compact_bytes
+        self._compactor: Optional[threading.Thread] = None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.reloads = 0
+        self._reload()
+
+    @staticmethod
+    def has_log(path: Path) -> bool:
+        return any(
+            path.with_name(f"{path.stem}{suffix}").exists()
+            for suffix in (".journal.jsonl", ".journal.compacting.jsonl")
+        )
+
+    def load(self) -> Records:
+        self.hits += 1
+        return self._data
+
+    def refresh(self) -> Optional[List[str]]:
+        if not self._shared:
+            return []
+        log_signature = _file_signature(self._log_path)
+        if (
+            log_signature is None
+            or log_signature[2] != self._log_ino
+            or log_signature[1] < self._log_size
+            or _file_signature(self._path) != self._snapshot_signature
+        ):
+            self._log.close()
+            self._reload()
+            return None
+        if log_signature[1] == self._log_size:
+            return []
+        changed: List[str] = []
+        with open(self._log_path, "rb") as handle:
+            handle.seek(self._log_size)
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break
+                self._log_size += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    changed.append(_apply_line(self._data, line))
+                except json.JSONDecodeError:
+                    logger.error("skipping torn journal record: %s", self._log_path)
+        return changed
+
+    def apply(
+        self, data: Records, op: str, key: str, change: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return self.apply_many(data, [(op, key, change)])[0]
+
+    def apply_many(
+        self, data: Records, changes: Sequence[Change]
+    ) -> List[Dict[str, Any]]:
+        if self._shared and os.fstat(self._log.fileno()).st_size > self._log_size:
+            self._log.truncate(self._log_size)
+        values = []
+        for op, key, change in changes:
+            values.append(apply_change(self._data, op, key, change))
+            record = {"op": op, "key": key, "change": change}
+            self._log.write(self._line_serializer.dumps(record) + b"\n")
+        if not values:
+            return values
+        if self._shared or self._durability != "async":
+            self._log.flush()
+        if self._durability == "fsync":
+            os.fsync(self._log.fileno())
+        self._log_size = self._log.tell()
+        if self._log_size >= self._compact_bytes:
+            self._start_compaction()
+        return values
+
+    def sync(self) -> None:
+        return None
+
+    def compact(self) -> None:
+        self._start_compaction()
+        if self._compactor:
+            self._compactor.join()
+
+    def checkpoint(self) -> None:
+        if self._compactor:
+            self._compactor.join()
+        self._write_snapshot(dict(self._data))
+        self._compacting_path.unlink(missing_ok=True)
+        self._log.close()
+        self._log = open(self._log_path, "wb")
+        self._log_size = 0
+        self._snapshot_signature = _file_signature(self._path)
+
+    def close(self) -> None:
+        if self._compactor:
+            self._compactor.join()
+        self._log.close()
+
+    def _reload(self) -> None:
+        self._snapshot_signature = _file_signature(self._path)
+        self._data = self._replay()
+        self.reloads += 1
+        self._log = open(self._log_path, "ab")
+        self._log_size = complete_length(self._log_path)
+        if not self._shared:
+            self._log.truncate(self._log_size)
+        self._log_ino = os.fstat(self._log.fileno()).st_ino
+
+    def _start_compaction(self) -> None:
+        if self._shared:
+            self.checkpoint()
+            return
+        if self._compactor and self._compactor.is_alive():
+            return
+        if self._compacting_path.exists():
+            self.checkpoint()
+            return
+        snapshot = dict(self._data)
+        self._log.close()
+        os.replace(self._log_path, self._compacting_path)
+        self._log = open(self._log_path, "ab")
+        self._log_size = 0
+        self._compactor = threading.Thread(
+            target=self._compact_snapshot, args=(snapshot,), daemon=True
+        )
+        self._compactor.start()
+
+    def _compact_snapshot(self, snapshot: Records) -> None:
+        try:
+            self._write_snapshot(snapshot)
+            self._compacting_path.unlink(missing_ok=True)
+        except Exception:
+            logger.error("journal compaction failed: %s", self._path, exc_info=True)
+
+    def _write_snapshot(self, snapshot: Records) -> None:
+        atomic_write_bytes(
+            self._path,
+            self._serializer.dumps(snapshot),
+            fsync=self._durability == "fsync",
+        )
+
+    def _replay(self) -> Records:
+        return read_records(self._path)
+
+
+def read_records(path: Path) -> Records:
+    data: Records = {}
+    if path.exists():
+        raw = path.read_bytes()
+        if raw.strip():
+            data = decode(raw)
+    for suffix in (".journal.compacting.jsonl", ".journal.jsonl"):
+        log_path = path.with_name(f"{path.stem}{suffix}")
+        if log_path.exists():
+            _replay_log(log_path, data)
+    return data
+
+
+def _replay_log(path: Path, data: Records) -> None:
+    with open(path, "rb") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            try:
+                _apply_line(data, line)
+            except json.JSONDecodeError:
+                logger.error("skipping torn journal record: %s", path)
+
+
+def complete_length(path: Path) -> int:
+    try:
+        handle = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+    with handle:
+        position = handle.seek(0, os.SEEK_END)
+        while position > 0:
+            start = max(0, position - 4096)
+            handle.seek(start)
+            newline = handle.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+    return 0
+
+
+def _apply_line(data: Records, line: bytes) -> str:
+    record = decode(line)
+    key = record["key"]
+    if record["op"] == "create" or key in data:
+        apply_change(data, record["op"], key, record["change"])
+    return key
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
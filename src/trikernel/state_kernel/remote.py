@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from trikernel.utils.logging import get_logger
+from trikernel.utils.serialization import Serializer, decode, resolve_serializer
+
+from .change_feed import TaskEvent
+from .models import Artifact, Notification, Task, TaskType, Turn
+from .protocols import StateKernelAPI
+
+logger = get_logger(__name__)
+
+Call = Tuple[str, Sequence[Any], Dict[str, Any]]
+
+_MODELS = {
+    "Task": Task,
+    "Artifact": Artifact,
+    "Turn": Turn,
+    "TaskEvent": TaskEvent,
+    "Notification": Notification,
+}
+_LOCAL_METHODS = ("artifact_open", "subscribe")
+_METHODS = frozenset(
+    name
+    for name in vars(StateKernelAPI)
+    if not name.startswith("_") and name not in _LOCAL_METHODS
+)
+_ERRORS = {"ValueError": ValueError, "KeyError": KeyError, "TypeError": TypeError}
+_POLL_MS = 100
+
+
+class RemoteStateError(RuntimeError):
+    def __init__(self, error_type: str, message: str) -> None:
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+
+
+class StateKernelServer:
+    def __init__(
+        self,
+        endpoint: str,
+        state_api: Optional[StateKernelAPI] = None,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
+        zmq = _require_zmq()
+        self._serializer = resolve_serializer(serializer)
+        if state_api is None:
+            from .kernel import StateKernel
+
+            state_api = StateKernel()
+        self.state_api = state_api
+        self._socket = zmq.Context.instance().socket(zmq.ROUTER)
+        self._socket.setsockopt(zmq.LINGER, 0)
+        self._socket.bind(endpoint)
+        self.endpoint = self._socket.getsockopt_string(zmq.LAST_ENDPOINT)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="state-kernel-server", daemon=True
+        )
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        zmq = _require_zmq()
+        poller = zmq.Poller()
+        poller.register(self._socket, zmq.POLLIN)
+        try:
+            while not self._stop.is_set():
+                if not poller.poll(_POLL_MS):
+                    continue
+                while True:
+                    try:
+                        frames = self._socket.recv_multipart(flags=zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    reply = self.handle(frames[-1])
+                    self._socket.send_multipart(frames[:-1] + [reply])
+        finally:
+            self._socket.close()
+
+    def handle(self, raw: bytes) -> bytes:
+        request_id = None
+        try:
+            request = decode(raw)
+            request_id = request.get("id")
+            method = request.get("method")
+            if method not in _METHODS:
+                raise ValueError(f"unknown method: {method}")
+            result = getattr(self.state_api, method)(
+                *request.get("args", []), **request.get("kwargs", {})
+            )
+            reply: Dict[str, Any] = {"id": request_id, "result": _encode(result)}
+        except Exception as exc:
+            logger.error("state request failed", exc_info=True)
+            reply = {
+                "id": request_id,
+                "error": {"type": type(exc).__name__, "message": str(exc)},
+            }
+        return self._serializer.dumps(reply)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class RemoteStateKernel(StateKernelAPI):
+    def __init__(
+        self,
+        endpoint: str,
+        timeout_seconds: float = 30.0,
+        poll_interval: float = 0.1,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
+        zmq = _require_zmq()
+        self._serializer = resolve_serializer(serializer)
+        self._socket = zmq.Context.instance().socket(zmq.DEALER)
+        self._socket.setsockopt(zmq.LINGER, 0)
+        self._socket.connect(endpoint)
+        self._poller = zmq.Poller()
+        self._poller.register(self._socket, zmq.POLLIN)
+        self._timeout_ms = int(timeout_seconds * 1000)
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        return self.call_many([(method, args, kwargs)])[0]
+
+    def call_many(self, calls: Sequence[Call]) -> List[Any]:
+        with self._lock:
+            pending: Dict[int, int] = {}
+            for index, (method, args, kwargs) in enumerate(calls):
+                self._next_id += 1
+                pending[self._next_id] = index
+                request = {
+                    "id": self._next_id,
+                    "method": method,
+                    "args": list(args),
+                    "kwargs": dict(kwargs),
+                }
+                self._socket.send_multipart([b"", self._serializer.dumps(request)])
+            replies: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+            while pending:
+                if not self._poller.poll(self._timeout_ms):
+                    raise TimeoutError("state kernel server did not reply")
+                reply = decode(self._socket.recv_multipart()[-1])
+                index = pending.pop(reply.get("id"), None)
+                if index is not None:
+                    replies[index] = reply
+        return [_decode_reply(reply) for reply in replies]
+
+    def close(self) -> None:
+        with self._lock:
+            self._socket.close()
+
+    def task_create(self, task_type: TaskType, payload: Dict[str, Any]) -> str:
+        return self.call("task_create", task_type, payload)
+
+    def task_create_many(
+        self, tasks: Sequence[Tuple[TaskType, Dict[str, Any]]]
+    ) -> List[str]:
+        return self.call("task_create_many", list(tasks))
+
+    def task_get(self, task_id: str) -> Optional[Task]:
+        return self.call("task_get", task_id)
+
+    def task_get_many(self, task_ids: Sequence[str]) -> List[Optional[Task]]:
+        return self.call("task_get_many", list(task_ids))
+
+    def task_update(self, task_id: str, patch: Dict[str, Any]) -> Optional[Task]:
+        return self.call("task_update", task_id, patch)
+
+    def task_update_many(
+        self, updates: Sequence[Tuple[str, Dict[str, Any]]]
+    ) -> List[Optional[Task]]:
+        return self.call("task_update_many", list(updates))
+
+    def task_list(
+        self,
+        task_type: Optional[str] = None,
+        state: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> Union[List[Task], List[Dict[str, Any]]]:
+        return self.call(
+            "task_list",
+            task_type,
+            state,
+            fields=list(fields) if fields is not None else None,
+            preview_chars=preview_chars,
+            include_archived=include_archived,
+        )
+
+    def task_claim(
+        self,
+        filter_by: Dict[str, Any],
+        claimer_id: str,
+        ttl_seconds: int,
+    ) -> Optional[str]:
+        return self.call("task_claim", filter_by, claimer_id, ttl_seconds)
+
+    def task_complete(self, task_id: str) -> Optional[Task]:
+        return self.call("task_complete", task_id)
+
+    def task_fail(self, task_id: str, error_info: Dict[str, Any]) -> Optional[Task]:
+        return self.call("task_fail", task_id, error_info)
+
+    def task_events(
+        self,
+        since_seq: Optional[int] = None,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, List[TaskEvent]]:
+        seq, events = self.call("task_events", since_seq, filter_by)
+        return seq, events
+
+    async def subscribe(
+        self,
+        filter_by: Optional[Dict[str, Any]] = None,
+        since_seq: Optional[int] = None,
+    ) -> AsyncIterator[TaskEvent]:
+        seq = since_seq
+        if seq is None:
+            seq, _ = self.task_events()
+        while True:
+            seq, events = self.task_events(seq, filter_by)
+            if not events:
+                await asyncio.sleep(self._poll_interval)
+                continue
+            for event in events:
+                yield event
+
+    def notification_publish(
+        self,
+        message: str,
+        severity: str = "info",
+        related_task_id: Optional[str] = None,
+        artifact_refs: Optional[List[str]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        return self.call(
+            "notification_publish",
+            message,
+            severity,
+            related_task_id,
+            artifact_refs,
+            meta,
+        )
+
+    def notification_publish_many(
+        self, notifications: Sequence[Dict[str, Any]]
+    ) -> List[int]:
+        return self.call("notification_publish_many", list(notifications))
+
+    def notification_fetch(
+        self, subscriber: str, since_cursor: Optional[int] = None, limit: int = 100
+    ) -> List[Notification]:
+        return self.call("notification_fetch", subscriber, since_cursor, limit)
+
+    def notification_ack(self, subscriber: str, cursor: int) -> int:
+        return self.call("notification_ack", subscriber, cursor)
+
+    def artifact_write(
+        self, media_type: str, body: str, metadata: Dict[str, Any]
+    ) -> str:
+        return self.call("artifact_write", media_type, body, metadata)
+
+    def artifact_read(self, artifact_id: str) -> Optional[Artifact]:
+        return self.call("artifact_read", artifact_id)
+
+    def artifact_read_many(
+        self, artifact_ids: Sequence[str]
+    ) -> List[Optional[Artifact]]:
+        return self.call("artifact_read_many", list(artifact_ids))
+
+    def artifact_read_range(
+        self, artifact_id: str, offset: int, length: int
+    ) -> Optional[str]:
+        return self.call("artifact_read_range", artifact_id, offset, length)
+
+    def artifact_open(
+        self, artifact_id: str, chunk_size: int = 64 * 1024
+    ) -> Optional[Iterator[str]]:
+        first = self.artifact_read_range(artifact_id, 0, chunk_size)
+        if first is None:
+            return None
+        return self._iter_ranges(artifact_id, first, chunk_size)
+
+    def artifact_write_named(
+        self, artifact_id: str, media_type: str, body: str, metadata: Dict[str, Any]
+    ) -> str:
+        return self.call(
+            "artifact_write_named", artifact_id, media_type, body, metadata
+        )
+
+    def artifact_list(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+    ) -> Union[List[Artifact], List[Dict[str, Any]]]:
+        return self.call(
+            "artifact_list",
+            fields=list(fields) if fields is not None else None,
+            preview_chars=preview_chars,
+        )
+
+    def artifact_search(self, query: Dict[str, Any]) -> List[Artifact]:
+        return self.call("artifact_search", query)
+
+    def turn_append_user(
+        self,
+        conversation_id: str,
+        user_message: str,
+        related_task_id: Optional[str],
+    ) -> str:
+        return self.call(
+            "turn_append_user", conversation_id, user_message, related_task_id
+        )
+
+    def turn_set_assistant(
+        self,
+        turn_id: str,
+        assistant_message: str,
+        artifacts: List[str],
+        metadata: Dict[str, Any],
+    ) -> Optional[Turn]:
+        return self.call(
+            "turn_set_assistant", turn_id, assistant_message, artifacts, metadata
+        )
+
+    def turn_list_recent(self, conversation_id: str, limit: int) -> List[Turn]:
+        return self.call("turn_list_recent", conversation_id, limit)
+
+    def _iter_ranges(
+        self, artifact_id: str, text: str, chunk_size: int
+    ) -> Iterator[str]:
+        offset = 0
+        while text:
+            yield text
+            size = len(text.encode("utf-8"))
+            if size < chunk_size:
+                return
+            offset += size
+            text = self.artifact_read_range(artifact_id, offset, chunk_size) or ""
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (Task, Artifact, Turn, TaskEvent, Notification)):
+        return {"__model__": type(value).__name__, "data": value.to_dict()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if isinstance(value, dict) and value.keys() == {"__model__", "data"}:
+        return _MODELS[value["__model__"]].from_dict(value["data"])
+    return value
+
+
+def _decode_reply(reply: Optional[Dict[str, Any]]) -> Any:
+    if reply is None:
+        raise RemoteStateError("ProtocolError", "missing reply")
+    error = reply.get("error")
+    if error:
+        error_type = error.get("type", "RuntimeError")
+        message = error.get("message", "")
+        if error_type in _ERRORS:
+            raise _ERRORS[error_type](message)
+        raise RemoteStateError(error_type, message)
+    return _decode(reply.get("result"))
+
+
+def _require_zmq():
+    try:
+        import zmq  # type: ignore
+    except ImportError as exc:
+        raise RuntimeError("pyzmq is required for the state kernel server") from exc
+    return zmq
@@ -0,0 +1,441 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from uuid import uuid4
+
+from .models import (
+    TASK_FIELDS,
+    Task,
+    TaskType,
+    complete_patch,
+    fail_patch,
+    field_path,
+    merge_patch,
+    parse_time,
+    project_record,
+    timestamp_of,
+    truncate_strings,
+    utc_now,
+)
+from .change_feed import ChangeListener
+from .task_archive import archivable, partition_of
+from ..utils.serialization import Serializer, decode, get_serializer, resolve_serializer
+
+_COLUMN_FILTERS = {"task_id", "task_type", "state", "claimed_by"}
+_JSON_FIELDS = {"payload", "artifact_refs"}
+_MAX_PARAMS = 500
+_ARCHIVE_CHECK_SECONDS = 60.0
+_JSON = get_serializer()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL UNIQUE,
+    task_type TEXT NOT NULL,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    artifact_refs TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    claimed_by TEXT,
+    claim_expires_at TEXT,
+    run_at REAL,
+    claim_expires_ts REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_type_state ON tasks (task_type, state);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (state);
+CREATE INDEX IF NOT EXISTS idx_tasks_run_at ON tasks (run_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim_expires ON tasks (claim_expires_ts);
+CREATE TABLE IF NOT EXISTS tasks_archive (
+    task_id TEXT PRIMARY KEY,
+    task_type TEXT NOT NULL,
+    state TEXT NOT NULL,
+    partition TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    record BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archive_type_state ON tasks_archive (task_type, state);
+CREATE INDEX IF NOT EXISTS idx_archive_partition ON tasks_archive (partition);
+"""
+
+_TASK_COLUMNS = (
+    "task_id, task_type, state, payload, artifact_refs, created_at, updated_at, "
+    "claimed_by, claim_expires_at"
+)
+
+
+_SYNCHRONOUS = {"fsync": "FULL", "flush-only": "NORMAL", "async": "OFF"}
+
+
+class SqliteTaskStore:
+    def __init__(
+        self,
+        path: Path,
+        durability: str = "flush-only",
+        archive_after_seconds: Optional[float] = None,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
+        if durability not in _SYNCHRONOUS:
+            raise ValueError(f"durability must be one of {tuple(_SYNCHRONOUS)}")
+        self._path = path
+        self._serializer = resolve_serializer(serializer)
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={_SYNCHRONOUS[durability]}")
+        self._conn.executescript(_SCHEMA)
+        self._archive_after = archive_after_seconds
+        self._next_archive_check = 0.0
+        self._listeners: List[ChangeListener] = []
+        self._data_version = self._read_data_version()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def add_change_listener(self, listener: ChangeListener) -> None:
+        self._listeners.append(listener)
+
+    def poll_changes(self) -> None:
+        with self._lock:
+            version = self._read_data_version()
+            changed = version != self._data_version
+            self._data_version = version
+        if changed:
+            self._notify("reset", [])
+
+    def create(self, task_type: TaskType, payload: Dict[str, Any]) -> Task:
+        return self.create_many([(task_type, payload)])[0]
+
+    def create_many(
+        self, tasks: Sequence[Tuple[TaskType, Dict[str, Any]]]
+    ) -> List[Task]:
+        created = [
+            Task(
+                task_id=str(uuid4()),
+                task_type=task_type,
+                payload=payload,
+                state="queued",
+            )
+            for task_type, payload in tasks
+        ]
+        with self._lock, self._transaction():
+            self._conn.executemany(
+                f"INSERT INTO tasks ({_TASK_COLUMNS}, run_at, claim_expires_ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [_task_params(task) for task in created],
+            )
+        self._maybe_archive()
+        return created
+
+    def get(self, task_id: str) -> Optional[Task]:
+        return self.get_many([task_id])[0]
+
+    def get_many(self, task_ids: Sequence[str]) -> List[Optional[Task]]:
+        with self._lock:
+            found = self._select_many(task_ids)
+            missing = [task_id for task_id in task_ids if task_id not in found]
+            if missing:
+                found.update(self._select_archived(missing))
+        return [found.get(task_id) for task_id in task_ids]
+
+    def update(self, task_id: str, patch: Dict[str, Any]) -> Optional[Task]:
+        return self.update_many([(task_id, patch)])[0]
+
+    def update_many(
+        self, updates: Sequence[Tuple[str, Dict[str, Any]]]
+    ) -> List[Optional[Task]]:
+        results: List[Optional[Task]] = []
+        with self._lock, self._transaction():
+            found = self._select_many([task_id for task_id, _ in updates])
+            for task_id, patch in updates:
+                current = found.get(task_id)
+                if current is None:
+                    results.append(None)
+                    continue
+                updated = merge_patch(current.to_dict(), patch)
+                updated["updated_at"] = utc_now()
+                task = found[task_id] = Task.from_dict(updated)
+                self._write_task(task)
+                results.append(task)
+        self._maybe_archive()
+        return results
+
+    def list(
+        self,
+        task_type: Optional[str] = None,
+        state: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        preview_chars: Optional[int] = None,
+        include_archived: bool = False,
+    ) -> Union[List[Task], List[Dict[str, Any]]]:
+        clauses, params = _where({"task_type": task_type, "state": state})
+        archived: List[Dict[str, Any]] = []
+        if include_archived:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT record FROM tasks_archive{clauses} ORDER BY seq", params
+                ).fetchall()
+            archived = [_decode_archived(row[0]) for row in rows]
+        if fields is None:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {_TASK_COLUMNS} FROM tasks{clauses} ORDER BY seq", params
+                ).fetchall()
+            return [Task.from_dict(record) for record in archived] + [
+                _row_to_task(row) for row in rows
+            ]
+        columns, column_params = _projection(fields)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM tasks{clauses} ORDER BY seq",
+                column_params + params,
+            ).fetchall()
+        projected = [
+            project_record(record, fields, preview_chars, ("payload",))
+            for record in archived
+        ]
+        for row in rows:
+            record = {}
+            for name, value in zip(fields, row):
+                if name.split(".")[0] in _JSON_FIELDS and value is not None:
+                    value = decode(value)
+                if preview_chars is not None and name.startswith("payload"):
+                    value = truncate_strings(value, preview_chars)
+                record[name] = value
+            projected.append(record)
+        return projected
+
+    def claim(
+        self,
+        filter_by: Dict[str, Any],
+        claimer_id: str,
+        ttl_seconds: int,
+    ) -> Optional[Task]:
+        column_filter = {
+            key: value
+            for key, value in filter_by.items()
+            if key in _COLUMN_FILTERS and value is not None
+        }
+        extra_filter = {
+            key: value for key, value in filter_by.items() if key not in column_filter
+        }
+        clauses, params = _where(column_filter)
+        clauses += " AND " if clauses else " WHERE "
+        clauses += (
+            "state IN ('queued', 'running') AND "
+            "(claimed_by IS NULL OR claim_expires_ts IS NULL OR claim_expires_ts <= ?)"
+        )
+        now = parse_time(utc_now())
+        now_ts = now.timestamp() if now else None
+        query = f"SELECT {_TASK_COLUMNS} FROM tasks{clauses} ORDER BY run_at, seq"
+        if not extra_filter:
+            query += " LIMIT 1"
+        with self._lock, self._transaction():
+            rows = self._conn.execute(query, (*params, now_ts)).fetchall()
+            for row in rows:
+                task = _row_to_task(row)
+                if not _matches(task, extra_filter):
+                    continue
+                task.claimed_by = claimer_id
+                task.claim_expires_at = (
+                    (now + timedelta(seconds=ttl_seconds)).isoformat() if now else None
+                )
+                task.state = "running"
+                task.updated_at = utc_now()
+                self._write_task(task)
+                return task
+        return None
+
+    def complete(self, task_id: str) -> Optional[Task]:
+        return self.update(task_id, complete_patch())
+
+    def fail(self, task_id: str, error_info: Dict[str, Any]) -> Optional[Task]:
+        return self.update(task_id, fail_patch(error_info))
+
+    def archive(self, older_than_seconds: Optional[float] = None) -> int:
+        older_than = older_than_seconds
+        if older_than is None:
+            older_than = self._archive_after
+        if older_than is None:
+            return 0
+        cutoff = time.time() - older_than
+        with self._lock, self._transaction():
+            rows = self._conn.execute(
+                f"SELECT seq, {_TASK_COLUMNS} FROM tasks "
+                "WHERE state IN ('done', 'failed') ORDER BY seq"
+            ).fetchall()
+            archived = []
+            for row in rows:
+                record = _row_to_task(row[1:]).to_dict()
+                if archivable(record, cutoff):
+                    archived.append((row[0], record))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks_archive "
+                "(task_id, task_type, state, partition, seq, record) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        record["task_id"],
+                        record["task_type"],
+                        record["state"],
+                        partition_of(record),
+                        seq,
+                        zlib.compress(self._serializer.dumps(record)),
+                    )
+                    for seq, record in archived
+                ],
+            )
+            self._conn.executemany(
+                "DELETE FROM tasks WHERE task_id = ?",
+                [(record["task_id"],) for _, record in archived],
+            )
+        if archived:
+            self._notify(
+                "archived", [Task.from_dict(record) for _, record in archived]
+            )
+        return len(archived)
+
+    def _maybe_archive(self) -> None:
+        if self._archive_after is None:
+            return
+        now = time.monotonic()
+        if now < self._next_archive_check:
+            return
+        self._next_archive_check = now + _ARCHIVE_CHECK_SECONDS
+        self.archive()
+
+    def _read_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _notify(self, kind: str, tasks: List[Optional[Task]]) -> None:
+        for listener in self._listeners:
+            listener(kind, tasks)
+
+    def _select_archived(self, task_ids: Sequence[str]) -> Dict[str, Task]:
+        found: Dict[str, Task] = {}
+        for start in range(0, len(task_ids), _MAX_PARAMS):
+            chunk = list(task_ids[start : start + _MAX_PARAMS])
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self._conn.execute(
+                f"SELECT record FROM tasks_archive WHERE task_id IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            for row in rows:
+                task = Task.from_dict(_decode_archived(row[0]))
+                found[task.task_id] = task
+        return found
+
+    def _select_many(self, task_ids: Sequence[str]) -> Dict[str, Task]:
+        found: Dict[str, Task] = {}
+        unique = list(dict.fromkeys(task_ids))
+        for start in range(0, len(unique), _MAX_PARAMS):
+            chunk = unique[start : start + _MAX_PARAMS]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self._conn.execute(
+                f"SELECT {_TASK_COLUMNS} FROM tasks WHERE task_id IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            for row in rows:
+                found[row[0]] = _row_to_task(row)
+        return found
+
+    def _write_task(self, task: Task) -> None:
+        params = _task_params(task)
+        self._conn.execute(
+            "UPDATE tasks SET task_type = ?, state = ?, payload = ?, "
+            "artifact_refs = ?, created_at = ?, updated_at = ?, claimed_by = ?, "
+            "claim_expires_at = ?, run_at = ?, claim_expires_ts = ? WHERE task_id = ?",
+            (*params[1:], params[0]),
+        )
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def __enter__(self) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self._conn.execute("COMMIT")
+        else:
+            self._conn.execute("ROLLBACK")
+
+
+def _task_params(task: Task) -> Tuple[Any, ...]:
+    return (
+        task.task_id,
+        task.task_type,
+        task.state,
+        _JSON.dumps(task.payload).decode("utf-8"),
+        _JSON.dumps(list(task.artifact_refs)).decode("utf-8"),
+        task.created_at,
+        task.updated_at,
+        task.claimed_by,
+        task.claim_expires_at,
+        timestamp_of((task.payload or {}).get("run_at")),
+        timestamp_of(task.claim_expires_at),
+    )
+
+
+def _row_to_task(row: Tuple[Any, ...]) -> Task:
+    return Task(
+        task_id=row[0],
+        task_type=row[1],
+        state=row[2],
+        payload=decode(row[3]),
+        artifact_refs=decode(row[4]),
+        created_at=row[5],
+        updated_at=row[6],
+        claimed_by=row[7],
+        claim_expires_at=row[8],
+    )
+
+
+def _projection(fields: Sequence[str]) -> Tuple[str, Tuple[Any, ...]]:
+    columns: List[str] = []
+    params: List[Any] = []
+    for name in fields:
+        head, rest = field_path(name, TASK_FIELDS)
+        if not rest:
+            columns.append(head)
+            continue
+        if head not in _JSON_FIELDS or any('"' in key for key in rest):
+            raise ValueError(f"unsupported field: {name}")
+        columns.append(f"json_quote(json_extract({head}, ?))")
+        params.append("$" + "".join(f'."{key}"' for key in rest))
+    return ", ".join(columns), tuple(params)
+
+
+def _decode_archived(blob: bytes) -> Dict[str, Any]:
+    return decode(zlib.decompress(blob))
+
+
+def _where(filters: Dict[str, Any]) -> Tuple[str, Tuple[Any, ...]]:
+    keys = [key for key, value in filters.items() if value is not None]
+    if not keys:
+        return "", ()
+    clause = " WHERE " + " AND ".join(f"{key} = ?" for key in keys)
+    return clause, tuple(filters[key] for key in keys)
+
+
+def _matches(task: Task, filter_by: Dict[str, Any]) -> bool:
+    for key, value in filter_by.items():
+        if getattr(task, key, None) != value:
+            return False
+    return True
+
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from trikernel.utils.logging import get_logger
+from trikernel.utils.serialization import Serializer, decode, resolve_serializer
+
+from .models import timestamp_of
+
+logger = get_logger(__name__)
+
+ARCHIVED_STATES = ("done", "failed")
+
+
+class TaskArchive:
+    def __init__(
+        self, root: Path, fsync: bool = False, serializer: Optional[Serializer] = None
+    ) -> None:
+        self._root = root
+        self._index_path = root / "index.jsonl"
+        self._fsync = fsync
+        self._serializer = resolve_serializer(serializer, line_safe=True)
+        self._lock = threading.Lock()
+        self._index: Dict[str, str] = {}
+        self._index_offset = 0
+
+    def add_many(self, records: Sequence[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            partitions.setdefault(partition_of(record), []).append(record)
+        with self._lock:
+            self._root.mkdir(parents=True, exist_ok=True)
+            for partition, items in partitions.items():
+                lines = b"".join(self._serializer.dumps(item) + b"\n" for item in items)
+                self._append(self._segment_path(partition), _gzip_member(lines))
+            entries = b"".join(
+                self._serializer.dumps(
+                    {"task_id": record["task_id"], "partition": partition_of(record)}
+                )
+                + b"\n"
+                for record in records
+            )
+            self._append(self._index_path, entries)
+
+    def get_many(self, task_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            index = self._load_index()
+            wanted: Dict[str, List[str]] = {}
+            for task_id in task_ids:
+                partition = index.get(task_id)
+                if partition is not None:
+                    wanted.setdefault(partition, []).append(task_id)
+            found: Dict[str, Dict[str, Any]] = {}
+            for partition, ids in wanted.items():
+                targets = set(ids)
+                for record in self._read_segment(self._segment_path(partition)):
+                    if record["task_id"] in targets:
+                        found[record["task_id"]] = record
+            return found
+
+    def scan(
+        self, task_type: Optional[str] = None, state: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            if not self._root.exists():
+                return []
+            records: Dict[str, Dict[str, Any]] = {}
+            for path in sorted(self._root.glob("*.jsonl.gz")):
+                for record in self._read_segment(path):
+                    if task_type is not None and record.get("task_type") != task_type:
+                        continue
+                    if state is not None and record.get("state") != state:
+                        continue
+                    records[record["task_id"]] = record
+            return list(records.values())
+
+    def _append(self, path: Path, data: bytes) -> None:
+        with open(path, "ab") as handle:
+            handle.write(data)
+            handle.flush()
+            if self._fsync:
+                os.fsync(handle.fileno())
+
+    def _load_index(self) -> Dict[str, str]:
+        if not self._index_path.exists():
+            return self._index
+        with open(self._index_path, "rb") as handle:
+            handle.seek(self._index_offset)
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break
+                self._index_offset += len(line)
+                try:
+                    entry = decode(line)
+                except json.JSONDecodeError:
+                    continue
+                self._index[entry["task_id"]] = entry["partition"]
+        return self._index
+
+    def _read_segment(self, path: Path) -> List[Dict[str, Any]]:
+        if not path.exists():
+            return []
+        records = []
+        try:
+            with gzip.open(path, "rb") as handle:
+                for line in handle:
+                    records.append(decode(line))
+        except (EOFError, OSError, zlib.error, json.JSONDecodeError):
+            logger.error("skipping torn archive segment tail: %s", path)
+        return records
+
+    def _segment_path(self, partition: str) -> Path:
+        return self._root / f"tasks-{partition}.jsonl.gz"
+
+
+def partition_of(record: Dict[str, Any]) -> str:
+    ts = timestamp_of(record.get("updated_at")) or timestamp_of(
+        record.get("created_at")
+    )
+    if ts is None:
+        return "unknown"
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def archivable(record: Dict[str, Any], cutoff: float) -> bool:
+    if record.get("state") not in ARCHIVED_STATES:
+        return False
+    updated = timestamp_of(record.get("updated_at"))
+    return updated is not None and updated < cutoff
+
+
+def _gzip_member(data: bytes) -> bytes:
+    return gzip.compress(data, mtime=0)
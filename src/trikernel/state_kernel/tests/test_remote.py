@@ -0,0 +1,78 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from trikernel.state_kernel.file_store import JsonFileArtifactStore
+from trikernel.state_kernel.kernel import StateKernel
+from trikernel.state_kernel.models import Task
+from trikernel.state_kernel.remote import RemoteStateKernel, StateKernelServer
+
+
+@pytest.fixture
+def remote(tmp_path):
+    artifact_store = JsonFileArtifactStore(
+        tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+    )
+    state = StateKernel(data_dir=tmp_path, artifact_store=artifact_store)
+    server = StateKernelServer("tcp://127.0.0.1:*", state)
+    server.start()
+    client = RemoteStateKernel(server.endpoint, timeout_seconds=5)
+    yield client
+    client.close()
+    server.stop(timeout=5)
+
+
+def test_remote_state_kernel_round_trips_models(remote):
+    task_id = remote.task_create("work", {"message": "hello"})
+    task = remote.task_get(task_id)
+    assert isinstance(task, Task)
+    assert task.payload == {"message": "hello"}
+    assert remote.task_claim({"task_type": "work"}, "worker", 30) == task_id
+    assert remote.task_complete(task_id).state == "done"
+    assert remote.task_list(fields=["task_id", "state"]) == [
+        {"task_id": task_id, "state": "done"}
+    ]
+    assert remote.task_get("missing") is None
+
+    artifact_id = remote.artifact_write("text/plain", "あいう" * 10, {"k": "v"})
+    assert remote.artifact_read(artifact_id).metadata == {"k": "v"}
+    assert "".join(remote.artifact_open(artifact_id, chunk_size=8)) == "あいう" * 10
+    assert remote.artifact_open("missing") is None
+
+    turn_id = remote.turn_append_user("conv", "hi", None)
+    remote.turn_set_assistant(turn_id, "hello", [artifact_id], {})
+    assert [turn.assistant_message for turn in remote.turn_list_recent("conv", 5)] == [
+        "hello"
+    ]
+
+
+def test_remote_state_kernel_pipelines_calls_and_raises_errors(remote):
+    created = remote.call_many(
+        [("task_create", ("work", {"n": n}), {}) for n in range(10)]
+    )
+    assert len(set(created)) == 10
+    tasks = remote.task_get_many(created)
+    assert [task.payload["n"] for task in tasks] == list(range(10))
+
+    with pytest.raises(ValueError):
+        remote.task_list(fields=["nope"])
+    with pytest.raises(ValueError):
+        remote.call("_task_store")
+    assert remote.task_get(created[0]).task_id == created[0]
+
+
+def test_remote_state_kernel_reads_change_feed(remote):
+    start, _ = remote.task_events()
+    task_id = remote.task_create("work", {})
+    seq, events = remote.task_events(start, {"task_type": "work"})
+    assert [(event.kind, event.task.task_id) for event in events] == [
+        ("created", task_id)
+    ]
+    assert remote.task_events(seq) == (seq, [])
+
+
+def test_remote_state_kernel_reads_notifications(remote):
+    cursor = remote.notification_publish("done", related_task_id="t1")
+    notifications = remote.notification_fetch("ui")
+    assert [(item.cursor, item.message) for item in notifications] == [(cursor, "done")]
+    assert remote.notification_ack("ui", cursor) == cursor
+    assert remote.notification_fetch("ui") == []
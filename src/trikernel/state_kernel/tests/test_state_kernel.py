@@ -1,4 +1,37 @@
+import asyncio
+import gc
+import json
+import shutil
+import threading
+import time
+import weakref
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from trikernel.state_kernel.async_kernel import (
+    AsyncStateKernel,
+    ensure_async_state_api,
+)
+from trikernel.state_kernel import blob_store
+from trikernel.state_kernel.blob_store import FRAME_SIZE, BlobStore
+from trikernel.state_kernel.durability import GroupCommitWriter
+from trikernel.state_kernel.file_store import (
+    JsonFileArtifactStore,
+    JsonFileTaskStore,
+    JsonFileTurnStore,
+)
+from trikernel.state_kernel.index_queue import IndexQueue
 from trikernel.state_kernel.kernel import StateKernel
+from trikernel.state_kernel.notification_log import NotificationLog
+from trikernel.state_kernel.sqlite_store import SqliteTaskStore
+from trikernel.state_kernel.turn_log import TurnLogStore
+from trikernel.utils import search, serialization
+from trikernel.utils.bm25 import BM25Index
+from trikernel.utils.embedding_cache import MemoizedEmbeddings
+from trikernel.utils.search import HybridSearchIndex
+from trikernel.utils.serialization import decode, get_serializer, resolve_serializer
 
 
 def test_task_lifecycle(tmp_path):
@@ -16,3 +49,1017 @@ def test_task_lifecycle(tmp_path):
     state.task_complete(task_id)
     task = state.task_get(task_id)
     assert task.state == "done"
+
+
+def test_sqlite_task_store_lifecycle(tmp_path):
+    state = StateKernel(data_dir=f"sqlite://{tmp_path}")
+    first = state.task_create("notification", {"message": "a"})
+    second = state.task_create("notification", {"message": "b"})
+    state.task_create("work", {"message": "w"})
+    assert (tmp_path / "tasks.db").exists()
+
+    assert state.task_claim({"task_type": "notification"}, "ui", 5) == first
+    assert state.task_claim({"task_type": "notification"}, "ui", 5) == second
+    assert state.task_claim({"task_type": "notification"}, "ui", 5) is None
+
+    state.task_complete(first)
+    state.task_fail(second, {"message": "boom"})
+    assert [task.task_id for task in state.task_list("notification", "done")] == [
+        first
+    ]
+    failed = state.task_get(second)
+    assert failed is not None
+    assert failed.payload == {"message": "b", "error": {"message": "boom"}}
+    assert len(state.task_list(task_type="work", state="queued")) == 1
+
+
+def test_sqlite_task_store_reclaims_expired_lease(tmp_path):
+    store = SqliteTaskStore(tmp_path / "tasks.db")
+    task = store.create("work", {"message": "w"})
+    assert store.claim({"task_id": task.task_id}, "worker-1", 30) is not None
+    assert store.claim({"task_id": task.task_id}, "worker-2", 30) is None
+    store.update(task.task_id, {"claim_expires_at": "2000-01-01T00:00:00+00:00"})
+    reclaimed = store.claim({"task_id": task.task_id}, "worker-2", 30)
+    assert reclaimed is not None
+    assert reclaimed.claimed_by == "worker-2"
+
+
+def test_journaled_task_store_replays_and_compacts(tmp_path):
+    store = JsonFileTaskStore(tmp_path, journal=True, compact_bytes=1024 * 1024)
+    task = store.create("work", {"message": "w", "meta": {"a": 1}})
+    store.update(task.task_id, {"payload": {"meta": {"b": 2}}})
+    store.claim({"task_id": task.task_id}, "worker", 30)
+    store.complete(task.task_id)
+    store.close()
+
+    reopened = JsonFileTaskStore(tmp_path, journal=True)
+    replayed = reopened.get(task.task_id)
+    assert replayed is not None
+    assert replayed.state == "done"
+    assert replayed.payload["meta"] == {"a": 1, "b": 2}
+
+    reopened._records.compact()
+    snapshot = json.loads((tmp_path / "tasks.json").read_text(encoding="utf-8"))
+    assert snapshot[task.task_id]["state"] == "done"
+    assert (tmp_path / "tasks.journal.jsonl").stat().st_size == 0
+    reopened.close()
+
+    plain = JsonFileTaskStore(tmp_path)
+    assert plain.get(task.task_id).state == "done"
+
+
+def test_journaled_turn_store_replays(tmp_path):
+    store = JsonFileTurnStore(tmp_path, journal=True, compact_bytes=256)
+    turn_ids = [store.append_user("c1", f"m{i}", None).turn_id for i in range(5)]
+    store.set_assistant(turn_ids[-1], "answer", [], {"task_state": "done"})
+    store.close()
+
+    reopened = JsonFileTurnStore(tmp_path, journal=True)
+    recent = reopened.list_recent("c1", 2)
+    assert [turn.user_message for turn in recent] == ["m3", "m4"]
+    assert recent[-1].assistant_message == "answer"
+
+
+def test_task_store_serves_reads_from_cache_until_file_changes(tmp_path):
+    store = JsonFileTaskStore(tmp_path)
+    task = store.create("work", {"message": "w"})
+    before = store.cache_stats()
+    for _ in range(3):
+        assert store.get(task.task_id) is not None
+    after = store.cache_stats()
+    assert after["hits"] - before["hits"] == 3
+    assert after["reloads"] == before["reloads"]
+
+    other = JsonFileTaskStore(tmp_path)
+    other.update(task.task_id, {"state": "done"})
+    assert store.get(task.task_id).state == "done"
+    assert store.cache_stats()["reloads"] == after["reloads"] + 1
+
+
+def test_group_commit_coalesces_bursty_creates(tmp_path):
+    writer = GroupCommitWriter("fsync", commit_window=0.01)
+    store = JsonFileTaskStore(tmp_path, writer=writer)
+
+    def create_many() -> None:
+        for _ in range(5):
+            store.create("work", {"message": "w"})
+
+    threads = [threading.Thread(target=create_many) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = writer.stats()
+    assert stats["submissions"] == 100
+    assert stats["flushes"] < stats["submissions"]
+    data = json.loads((tmp_path / "tasks.json").read_text(encoding="utf-8"))
+    assert len(data) == 100
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_async_durability_serves_unflushed_writes(tmp_path):
+    store = JsonFileTaskStore(tmp_path, durability="async")
+    task = store.create("work", {"message": "w"})
+    assert store.get(task.task_id) is not None
+    store.close()
+    data = json.loads((tmp_path / "tasks.json").read_text(encoding="utf-8"))
+    assert task.task_id in data
+
+
+def test_claim_orders_by_run_at_and_reclaims_expired_leases(tmp_path):
+    store = JsonFileTaskStore(tmp_path)
+    later = store.create(
+        "work", {"message": "later", "run_at": "2030-01-02T00:00:00+00:00"}
+    )
+    sooner = store.create(
+        "work", {"message": "sooner", "run_at": "2030-01-01T00:00:00+00:00"}
+    )
+    store.create("notification", {"message": "n"})
+
+    assert store.claim({"task_type": "work"}, "w1", 30).task_id == sooner.task_id
+    assert store.claim({"task_type": "work"}, "w1", 30).task_id == later.task_id
+    assert store.claim({"task_type": "work"}, "w1", 30) is None
+
+    store.update(sooner.task_id, {"claim_expires_at": "2000-01-01T00:00:00+00:00"})
+    assert store.claim({"task_type": "work"}, "w2", 30).task_id == sooner.task_id
+    assert [task.task_id for task in store.list("work", "running")] == [
+        later.task_id,
+        sooner.task_id,
+    ]
+    assert [task.payload["message"] for task in store.list(state="queued")] == ["n"]
+
+
+def test_turn_log_reads_recent_turns_from_tail(tmp_path):
+    legacy = JsonFileTurnStore(tmp_path)
+    legacy.append_user("c1", "old", None)
+    legacy.close()
+
+    store = TurnLogStore(tmp_path)
+    turn_ids = [store.append_user("c1", f"m{i}", None).turn_id for i in range(4)]
+    store.append_user("c2", "other", None)
+    updated = store.set_assistant(turn_ids[1], "answer", ["a1"], {"k": "v"})
+    assert updated is not None
+    assert updated.assistant_message == "answer"
+
+    reopened = TurnLogStore(tmp_path)
+    assert [turn.user_message for turn in reopened.list_recent("c1", 10)] == [
+        "old",
+        "m0",
+        "m1",
+        "m2",
+        "m3",
+    ]
+    recent = reopened.list_recent("c1", 3)
+    assert [turn.user_message for turn in recent] == ["m1", "m2", "m3"]
+    assert recent[0].assistant_message == "answer"
+    assert recent[0].artifacts == ["a1"]
+    assert reopened.set_assistant(turn_ids[3], "late", [], {}) is not None
+    assert reopened.list_recent("c1", 1)[0].assistant_message == "late"
+    assert reopened.set_assistant("missing", "x", [], {}) is None
+
+
+def test_turn_log_recovers_from_a_torn_directory_tail(tmp_path):
+    store = TurnLogStore(tmp_path)
+    first = store.append_user("c1", "first", None)
+    store.close()
+    directory = tmp_path / "turns" / "turn_ids.jsonl"
+    with open(directory, "ab") as handle:
+        handle.write(b"not json\n")
+        handle.write(b'{"turn_id": "torn", "conv')
+
+    reopened = TurnLogStore(tmp_path)
+    second = reopened.append_user("c1", "second", None)
+    reopened.close()
+
+    restarted = TurnLogStore(tmp_path)
+    assert restarted.set_assistant(first.turn_id, "a", [], {}) is not None
+    assert restarted.set_assistant(second.turn_id, "b", [], {}) is not None
+    assert [turn.assistant_message for turn in restarted.list_recent("c1", 5)] == [
+        "a",
+        "b",
+    ]
+
+
+def test_turn_log_migration_survives_a_crash(tmp_path, monkeypatch):
+    legacy = JsonFileTurnStore(tmp_path)
+    for n in range(3):
+        legacy.append_user("c1", f"old{n}", None)
+    legacy.close()
+
+    original_append = TurnLogStore._append_turn
+    appended = []
+
+    def crashing_append(self, record):
+        if len(appended) == 1:
+            raise OSError("simulated crash")
+        appended.append(record["turn_id"])
+        original_append(self, record)
+
+    monkeypatch.setattr(TurnLogStore, "_append_turn", crashing_append)
+    with pytest.raises(OSError):
+        TurnLogStore(tmp_path)
+    monkeypatch.setattr(TurnLogStore, "_append_turn", original_append)
+
+    store = TurnLogStore(tmp_path)
+    assert [turn.user_message for turn in store.list_recent("c1", 10)] == [
+        "old0",
+        "old1",
+        "old2",
+    ]
+    assert not (tmp_path / "turns" / "migrating").exists()
+
+
+def test_artifact_reads_are_served_from_lru_cache(tmp_path):
+    store = JsonFileArtifactStore(
+        tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+    )
+    store.write_named("user_profile", "application/json", '{"name": "a"}', {})
+    assert store.read("user_profile").body == '{"name": "a"}'
+    assert store.read("user_profile").body == '{"name": "a"}'
+    stats = store.cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+    store.write_named("user_profile", "application/json", '{"name": "b"}', {})
+    assert store.read("user_profile").body == '{"name": "b"}'
+    assert store.cache_stats()["misses"] == 2
+
+
+def test_artifact_manifest_filters_without_reading_bodies(tmp_path):
+    legacy_dir = tmp_path / "artifacts"
+    legacy_dir.mkdir()
+    legacy = {
+        "artifact_id": "legacy",
+        "media_type": "text/plain",
+        "body": "old body",
+        "metadata": {"kind": "note"},
+        "created_at": "2024-01-01T00:00:00+00:00",
+    }
+    (legacy_dir / "legacy.json").write_text(json.dumps(legacy), encoding="utf-8")
+    embeddings = DeterministicFakeEmbedding(size=8)
+    store = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    assert not (legacy_dir / "legacy.json").exists()
+    assert store.read("legacy").body == "old body"
+
+    store.write("text/plain", "日本語の本文", {"kind": "report"})
+    store.close()
+    assert list(legacy_dir.glob("*/*/*.artifact")) == []
+
+    reopened = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    found = reopened.search({"metadata": {"kind": "report"}})
+    assert [artifact.body for artifact in found] == ["日本語の本文"]
+
+
+def test_overwritten_named_artifacts_release_unreferenced_blobs(tmp_path):
+    store = JsonFileArtifactStore(
+        tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+    )
+    blobs = tmp_path / "artifacts" / "blobs"
+    large = "".join(f"line {n}\n" for n in range(FRAME_SIZE // 4))
+    store.write_named("profile", "text/plain", large, {})
+    store.write("text/plain", "shared body", {})
+    assert len(list(blobs.glob("*/*.idx"))) == 1
+
+    store.write_named("profile", "text/plain", "shared body", {})
+    assert len(list(blobs.glob("*/*"))) == 1
+    store.write_named("profile", "text/plain", "final body", {})
+    store.close()
+
+    assert len(list(blobs.glob("*/*"))) == 2
+    assert store.storage_stats()["blobs"] == 2
+    reopened = JsonFileArtifactStore(
+        tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+    )
+    bodies = sorted(artifact.body for artifact in reopened.list())
+    assert bodies == ["final body", "shared body"]
+
+
+def test_identical_artifact_bodies_share_one_blob(tmp_path):
+    store = JsonFileArtifactStore(
+        tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+    )
+    page = "<html>" + "same page " * 200 + "</html>"
+    first = store.write("text/html", page, {"url": "https://example.com"})
+    second = store.write("text/html", page, {"url": "https://example.com"})
+    store.close()
+
+    assert store.read(second.artifact_id).body == page
+    assert len(list((tmp_path / "artifacts" / "blobs").glob("*/*"))) == 1
+    stats = store.storage_stats()
+    assert stats["artifacts"] == 2
+    assert stats["blobs"] == 1
+    assert stats["dedup_ratio"] == 2.0
+    assert stats["bytes_saved"] > len(page.encode("utf-8"))
+    assert first.artifact_id != second.artifact_id
+
+
+def test_list_projections_skip_full_records(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    artifacts = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    artifacts.write("text/plain", "x" * 500, {"kind": "page"})
+    listed = artifacts.list(fields=["metadata", "body", "size"], preview_chars=10)
+    assert listed == [{"metadata": {"kind": "page"}, "body": "x" * 10, "size": 500}]
+    artifacts.close()
+    reopened = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    assert reopened.list(fields=["body"], preview_chars=3) == [{"body": "xxx"}]
+
+    for store in (
+        JsonFileTaskStore(tmp_path / "json"),
+        SqliteTaskStore(tmp_path / "tasks.db"),
+    ):
+        task = store.create("work", {"message": "m" * 50, "meta": {"a": 1}})
+        projected = store.list(
+            task_type="work",
+            fields=["task_id", "payload.message", "payload.meta"],
+            preview_chars=5,
+        )
+        assert projected == [
+            {
+                "task_id": task.task_id,
+                "payload.message": "mmmmm",
+                "payload.meta": {"a": 1},
+            }
+        ]
+        with pytest.raises(ValueError):
+            store.list(fields=["secret"])
+
+
+def test_artifact_range_reads_page_through_body(tmp_path):
+    store = JsonFileArtifactStore(
+        tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+    )
+    body = "ページ本文" * 5000
+    artifact = store.write("text/plain", body, {})
+    store.close()
+    reopened = JsonFileArtifactStore(
+        tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+    )
+
+    pages = []
+    offset = 0
+    while True:
+        text = reopened.read_range(artifact.artifact_id, offset, 1000)
+        if not text:
+            break
+        pages.append(text)
+        offset += len(text.encode("utf-8"))
+    assert "".join(pages) == body
+    assert reopened.read_range(artifact.artifact_id, 1, 5) == "ー"
+    assert "".join(reopened.open(artifact.artifact_id, chunk_size=7)) == body
+    assert reopened.read_range("missing", 0, 10) is None
+
+
+@pytest.mark.parametrize("codec", ["gz", "zst"])
+def test_blob_range_reads_decompress_only_touched_frames(tmp_path, monkeypatch, codec):
+    if codec == "zst":
+        pytest.importorskip("zstandard")
+    data = b"".join(f"line {n:07d}\n".encode() for n in range(100_000))
+    digest, _ = BlobStore(tmp_path, codec=codec).put(data)
+    decoded = []
+    original_decompress = blob_store._decompress
+
+    def recording_decompress(codec, raw):
+        result = original_decompress(codec, raw)
+        decoded.append(len(result))
+        return result
+
+    monkeypatch.setattr(blob_store, "_decompress", recording_decompress)
+    store = BlobStore(tmp_path, codec=codec)
+    pages = [
+        store.read_range(digest, offset, 100_000)
+        for offset in range(0, len(data), 100_000)
+    ]
+    assert b"".join(pages) == data
+    boundary = store.read_range(digest, FRAME_SIZE - 5, 10)
+    assert boundary == data[FRAME_SIZE - 5 : FRAME_SIZE + 5]
+    assert store.read_range(digest, len(data), 10) == b""
+    assert max(decoded) <= 2 * FRAME_SIZE
+    assert store.get(digest) == data
+    with store.open(digest) as source:
+        assert source.read() == data
+
+
+def test_returned_models_do_not_alias_store_state(tmp_path):
+    state = StateKernel(
+        data_dir=tmp_path,
+        artifact_store=JsonFileArtifactStore(
+            tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+        ),
+    )
+    payload = {"message": "original"}
+    task_id = state.task_create("work", payload)
+    payload["message"] = "caller edit"
+    state.task_update(task_id, {"artifact_refs": ["a1"]})
+    task = state.task_get(task_id)
+    task.payload["message"] = "mutated"
+    task.artifact_refs.append("a2")
+    state.task_list(state="queued")[0].payload["extra"] = True
+    task = state.task_get(task_id)
+    assert task.payload == {"message": "original"}
+    assert task.artifact_refs == ["a1"]
+
+    metadata = {"kind": "note"}
+    artifact_id = state.artifact_write("text/plain", "body", metadata)
+    metadata["kind"] = "caller edit"
+    for _ in range(2):
+        state.artifact_read(artifact_id).metadata["kind"] = "mutated"
+    assert state.artifact_read(artifact_id).metadata == {"kind": "note"}
+
+    turn_id = state.turn_append_user("c1", "hi", None)
+    state.turn_set_assistant(turn_id, "hello", [], {"k": "v"})
+    state.turn_list_recent("c1", 1)[0].metadata["k"] = "mutated"
+    assert state.turn_list_recent("c1", 1)[0].metadata == {"k": "v"}
+
+
+def test_nested_payloads_do_not_alias_store_state(tmp_path):
+    state = StateKernel(
+        data_dir=tmp_path,
+        artifact_store=JsonFileArtifactStore(
+            tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+        ),
+    )
+    payload = {"meta": {"k": 1}, "items": [{"n": 1}]}
+    task_id = state.task_create("work", payload)
+    payload["meta"]["k"] = 999
+    payload["items"][0]["n"] = 999
+    state.task_get(task_id).payload["meta"]["k"] = 998
+    state.task_list(state="queued")[0].payload["items"].append({"n": 2})
+    projected = state.task_list(state="queued", fields=["payload.meta"])[0]
+    projected["payload.meta"]["k"] = 997
+    assert state.task_get(task_id).payload == {"meta": {"k": 1}, "items": [{"n": 1}]}
+
+    patch = {"payload": {"meta": {"k": 2}}}
+    state.task_update(task_id, patch)
+    patch["payload"]["meta"]["k"] = 999
+    assert state.task_get(task_id).payload["meta"] == {"k": 2}
+
+    metadata = {"source": {"url": "a"}}
+    artifact_id = state.artifact_write("text/plain", "body", metadata)
+    metadata["source"]["url"] = "caller edit"
+    state.artifact_read(artifact_id).metadata["source"]["url"] = "mutated"
+    assert state.artifact_read(artifact_id).metadata == {"source": {"url": "a"}}
+
+
+def test_batch_task_operations_persist_once(tmp_path):
+    writer = GroupCommitWriter(commit_window=0)
+    for store in (
+        JsonFileTaskStore(tmp_path / "json", writer=writer),
+        SqliteTaskStore(tmp_path / "tasks.db"),
+    ):
+        before = writer.stats()["submissions"]
+        created = store.create_many([("work", {"n": n}) for n in range(20)])
+        task_ids = [task.task_id for task in created]
+        fetched = store.get_many(task_ids + ["missing"])
+        assert [task.payload["n"] for task in fetched[:-1]] == list(range(20))
+        assert fetched[-1] is None
+
+        updated = store.update_many(
+            [(task_id, {"state": "done"}) for task_id in task_ids[:5]]
+            + [("missing", {"state": "done"})]
+        )
+        assert [task.state for task in updated[:5]] == ["done"] * 5
+        assert updated[-1] is None
+        assert len(store.list(state="done")) == 5
+        if isinstance(store, JsonFileTaskStore):
+            assert writer.stats()["submissions"] - before == 2
+
+
+def test_finished_tasks_move_to_archive(tmp_path):
+    for store in (
+        JsonFileTaskStore(tmp_path / "json"),
+        SqliteTaskStore(tmp_path / "tasks.db"),
+    ):
+        done_id = store.create("notification", {"message": "old"}).task_id
+        store.complete(done_id)
+        queued_id = store.create("work", {"message": "pending"}).task_id
+
+        assert store.archive(older_than_seconds=0) == 1
+        assert [task.task_id for task in store.list()] == [queued_id]
+        assert store.get(done_id).state == "done"
+        archived = store.list(state="done", include_archived=True)
+        assert [task.task_id for task in archived] == [done_id]
+        projected = store.list(
+            task_type="notification", fields=["payload.message"], include_archived=True
+        )
+        assert projected == [{"payload.message": "old"}]
+        assert store.archive(older_than_seconds=0) == 0
+        if isinstance(store, JsonFileTaskStore):
+            hot_path = tmp_path / "json" / "tasks.json"
+            assert list(json.loads(hot_path.read_text(encoding="utf-8"))) == [
+                queued_id
+            ]
+
+    segments = (tmp_path / "json" / "archive" / "tasks").glob("tasks-*.jsonl.gz")
+    assert len(list(segments)) == 1
+
+    state = StateKernel(data_dir=tmp_path / "default")
+    assert state._task_store._archive_after is None
+    assert state._task_store.archive() == 0
+
+
+@pytest.mark.parametrize("process_lock", [False, True])
+def test_journal_drops_torn_tail_before_appending(tmp_path, process_lock):
+    store = JsonFileTaskStore(tmp_path, journal=True, process_lock=process_lock)
+    first_id = store.create("work", {"message": "a"}).task_id
+    store.close()
+    with open(tmp_path / "tasks.journal.jsonl", "ab") as handle:
+        handle.write(b'{"op": "create", "key": "torn", "chan')
+
+    reopened = JsonFileTaskStore(tmp_path, journal=True, process_lock=process_lock)
+    second_id = reopened.create("work", {"message": "b"}).task_id
+    reopened.close()
+
+    restarted = JsonFileTaskStore(tmp_path, journal=True, process_lock=process_lock)
+    assert [task.task_id for task in restarted.list()] == [first_id, second_id]
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_process_lock_shares_json_stores_between_instances(tmp_path, journal):
+    first = JsonFileTaskStore(tmp_path, journal=journal, process_lock=True)
+    second = JsonFileTaskStore(tmp_path, journal=journal, process_lock=True)
+
+    task_id = first.create("work", {"message": "shared"}).task_id
+    assert second.get(task_id).payload == {"message": "shared"}
+
+    results = []
+    barrier = threading.Barrier(2)
+
+    def claim(store):
+        barrier.wait()
+        results.append(store.claim({"task_type": "work"}, "worker", 30))
+
+    threads = [threading.Thread(target=claim, args=(s,)) for s in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(result is None for result in results) == [False, True]
+    assert first.get(task_id).claimed_by == "worker"
+
+    second.complete(task_id)
+    assert first.get(task_id).state == "done"
+
+    embeddings = DeterministicFakeEmbedding(size=8)
+    writer_side = JsonFileArtifactStore(
+        tmp_path, embeddings=embeddings, process_lock=True
+    )
+    reader_side = JsonFileArtifactStore(
+        tmp_path, embeddings=embeddings, process_lock=True
+    )
+    artifact = writer_side.write("text/plain", "v1", {})
+    assert reader_side.read(artifact.artifact_id).body == "v1"
+    writer_side.write_named(artifact.artifact_id, "text/plain", "v2", {})
+    assert reader_side.read(artifact.artifact_id).body == "v2"
+
+
+def test_change_feed_reports_task_events_in_order(tmp_path):
+    state = StateKernel(data_dir=tmp_path)
+    start, _ = state.task_events()
+    work_id = state.task_create("work", {})
+    note_id = state.task_create("notification", {"message": "hi"})
+    state.task_claim({"task_id": work_id}, "worker", 30)
+    state.task_complete(work_id)
+
+    seq, events = state.task_events(start)
+    assert [event.seq for event in events] == list(range(start + 1, seq + 1))
+    assert [(event.kind, event.task.task_id) for event in events] == [
+        ("created", work_id),
+        ("created", note_id),
+        ("claimed", work_id),
+        ("updated", work_id),
+    ]
+    assert state.task_events(seq) == (seq, [])
+    _, filtered = state.task_events(start, {"task_type": "work", "state": "done"})
+    assert [event.task.state for event in filtered] == ["done"]
+    _, reset = state.task_events(seq + 100)
+    assert [event.kind for event in reset] == ["reset"]
+
+    async def first_event():
+        events = state.subscribe({"task_type": "work"})
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0)
+        threading.Thread(target=state.task_create, args=("work", {})).start()
+        event = await asyncio.wait_for(pending, timeout=5)
+        await events.aclose()
+        return event
+
+    assert asyncio.run(first_event()).kind == "created"
+
+
+def test_change_feed_sees_writes_from_other_processes(tmp_path):
+    first = StateKernel(data_dir=tmp_path, process_lock=True)
+    second = StateKernel(data_dir=tmp_path, process_lock=True)
+    start, _ = first.task_events()
+
+    task_id = second.task_create("work", {"message": "remote"})
+    seq, events = first.task_events(start, {"task_type": "work"})
+    assert [event.kind for event in events] == ["reset"]
+    assert first.task_events(seq) == (seq, [])
+
+    second.task_complete(task_id)
+    assert second._task_store.archive(older_than_seconds=0) == 1
+    _, events = second.task_events(start)
+    assert [(event.kind, event.task.task_id) for event in events[-2:]] == [
+        ("updated", task_id),
+        ("archived", task_id),
+    ]
+
+    sqlite_first = StateKernel(data_dir=f"sqlite://{tmp_path / 'db'}")
+    sqlite_second = StateKernel(data_dir=f"sqlite://{tmp_path / 'db'}")
+    start, _ = sqlite_first.task_events()
+    sqlite_second.task_create("work", {})
+    _, events = sqlite_first.task_events(start)
+    assert [event.kind for event in events] == ["reset"]
+
+
+def test_journal_store_reports_changed_tasks_from_other_processes(tmp_path):
+    first = JsonFileTaskStore(tmp_path, journal=True, process_lock=True)
+    second = JsonFileTaskStore(tmp_path, journal=True, process_lock=True)
+    seen = []
+    first.add_change_listener(
+        lambda kind, tasks: seen.extend((kind, task.task_id) for task in tasks)
+    )
+    first.poll_changes()
+
+    task_id = second.create("work", {}).task_id
+    first.poll_changes()
+    first.poll_changes()
+
+    assert seen == [("updated", task_id)]
+
+
+def test_notification_log_fetches_from_subscriber_cursor(tmp_path):
+    log = NotificationLog(tmp_path)
+    cursors = log.publish_many(
+        [{"message": f"m{n}", "meta": {"n": n}} for n in range(5)]
+    )
+    assert cursors == [1, 2, 3, 4, 5]
+
+    page = log.fetch("ui", limit=2)
+    assert [(item.cursor, item.message) for item in page] == [(1, "m0"), (2, "m1")]
+    assert log.ack("ui", page[-1].cursor) == 2
+    assert [item.message for item in log.fetch("ui")] == ["m2", "m3", "m4"]
+    assert [item.meta for item in log.fetch("ui", since_cursor=4)] == [{"n": 4}]
+    assert log.ack("ui", 1) == 2
+    assert log.ack("ui", 99) == 5
+
+    reopened = NotificationLog(tmp_path)
+    assert reopened.fetch("ui") == []
+    assert reopened.cursor("other") == 0
+    assert len(reopened.fetch("other")) == 5
+    assert reopened.publish_many([{"message": "m5"}]) == [6]
+    assert [item.message for item in reopened.fetch("ui")] == ["m5"]
+
+
+def test_serializers_round_trip_and_are_detected_on_read():
+    value = {"task_id": "t1", "payload": {"text": "日本語", "n": [1, 2.5, None]}}
+    for name in ("json", "orjson", "msgpack", "auto"):
+        serializer = get_serializer(name)
+        assert serializer.loads(serializer.dumps(value)) == value
+        assert decode(serializer.dumps(value)) == value
+    assert b"\n" in get_serializer("json", pretty=True).dumps(value)
+    assert not get_serializer("json", pretty=True).line_safe
+    assert not get_serializer("msgpack").line_safe
+    with pytest.raises(ValueError):
+        get_serializer("yaml")
+
+
+def test_missing_fast_serializers_name_the_extra(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    monkeypatch.setattr(serialization, "ormsgpack", None)
+    monkeypatch.setattr(serialization, "msgpack", None)
+    assert resolve_serializer(None).name == "json"
+    for name in ("orjson", "msgpack"):
+        with pytest.raises(RuntimeError, match=r"trikernel\[fast\]"):
+            resolve_serializer(name)
+    with pytest.raises(RuntimeError, match=r"trikernel\[fast\]"):
+        decode(b"\x81\xa1a\x01")
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_task_store_migrates_between_serializers(tmp_path, journal):
+    store = JsonFileTaskStore(
+        tmp_path, journal=journal, serializer=get_serializer("json")
+    )
+    first_id = store.create("work", {"message": "json"}).task_id
+    store.close()
+
+    migrated = JsonFileTaskStore(
+        tmp_path, journal=journal, serializer=get_serializer("msgpack")
+    )
+    assert migrated.get(first_id).payload == {"message": "json"}
+    second_id = migrated.create("work", {"message": "msgpack"}).task_id
+    if journal:
+        migrated._records.compact()
+    migrated.close()
+    assert (tmp_path / "tasks.json").read_bytes()[:1] >= b"\x80"
+
+    reopened = JsonFileTaskStore(tmp_path, journal=journal)
+    assert [task.task_id for task in reopened.list()] == [first_id, second_id]
+
+
+def test_async_state_kernel_runs_calls_on_its_io_thread(tmp_path):
+    state = StateKernel(
+        data_dir=tmp_path,
+        artifact_store=JsonFileArtifactStore(
+            tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+        ),
+    )
+    threads = []
+    original_get = state.task_get
+
+    def recording_get(task_id):
+        threads.append(threading.current_thread().name)
+        return original_get(task_id)
+
+    state.task_get = recording_get
+    async_state = ensure_async_state_api(state)
+    assert isinstance(async_state, AsyncStateKernel)
+    assert ensure_async_state_api(async_state) is async_state
+
+    async def scenario():
+        task_id = await async_state.task_create("work", {"message": "hi"})
+        task = await async_state.task_get(task_id)
+        artifact_id = await async_state.artifact_write("text/plain", "abcdef", {})
+        chunks = await async_state.artifact_open(artifact_id, chunk_size=4)
+        return task, [chunk async for chunk in chunks]
+
+    task, chunks = asyncio.run(scenario())
+    async_state.close()
+
+    assert task is not None and task.payload["message"] == "hi"
+    assert "".join(chunks) == "abcdef"
+    assert threads and threads[0].startswith("state-kernel-io")
+
+
+def test_async_state_kernel_is_shared_per_state_api(tmp_path):
+    state = StateKernel(data_dir=tmp_path)
+    first = ensure_async_state_api(state)
+    second = ensure_async_state_api(state)
+    assert first is second
+
+    first.close()
+    assert asyncio.run(second.task_create("work", {}))
+    second.close()
+    assert first._executor._shutdown
+    replacement = ensure_async_state_api(state)
+    assert replacement is not first
+    replacement.close()
+
+    abandoned = ensure_async_state_api(state)
+    executor = abandoned._executor
+    del abandoned
+    gc.collect()
+    assert executor._shutdown
+    assert ensure_async_state_api(state)._executor is not executor
+
+    state_ref = weakref.ref(state)
+    del state, first, second, replacement
+    gc.collect()
+    assert state_ref() is None
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return super().embed_documents(texts)
+
+
+def test_search_index_upserts_embed_only_the_changed_document(tmp_path):
+    embeddings = CountingEmbedding(size=8)
+    embeddings.calls = []
+    index = HybridSearchIndex(tmp_path, "docs", embeddings, persist_interval=60)
+    for doc_id in ("a", "b", "c"):
+        doc = Document(page_content=f"body {doc_id}", metadata={"id": doc_id})
+        index.upsert_document(doc, doc_id)
+    replacement = Document(page_content="replaced body", metadata={"id": "b"})
+    index.upsert_document(replacement, "b", force=True)
+
+    assert embeddings.calls == [1, 1, 1, 1]
+    assert index.has_id("b")
+    assert index._faiss.index.ntotal == 3
+    assert "replaced body" in [doc.page_content for doc in index.search("replaced")]
+
+    index.flush()
+    embeddings.calls = []
+    reopened = HybridSearchIndex(tmp_path, "docs", embeddings)
+    assert embeddings.calls == []
+    assert sorted(doc.page_content for doc in reopened.search("", k=5)) == [
+        "body a",
+        "body c",
+        "replaced body",
+    ]
+
+
+def test_pending_search_index_writes_are_flushed_on_close_and_exit(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    index = HybridSearchIndex(tmp_path / "exit", "docs", embeddings)
+    index.upsert_document(Document(page_content="first", metadata={}), "a")
+    index.upsert_document(Document(page_content="second", metadata={}), "b")
+    search._flush_unflushed()
+    reopened = HybridSearchIndex(tmp_path / "exit", "docs", embeddings)
+    assert sorted(doc.page_content for doc in reopened.search("", k=5)) == [
+        "first",
+        "second",
+    ]
+
+    state = StateKernel(
+        data_dir=tmp_path,
+        artifact_store=JsonFileArtifactStore(tmp_path, embeddings=embeddings),
+    )
+    state.artifact_write("text/plain", "first body", {})
+    state.artifact_write("text/plain", "second body", {})
+    state.close()
+    persisted = HybridSearchIndex(
+        tmp_path / "search_artifacts", "artifacts", embeddings
+    )
+    assert len(persisted.search("", k=5)) == 2
+
+
+def test_embedding_cache_survives_restarts(tmp_path):
+    embeddings = CountingEmbedding(size=8)
+    embeddings.calls = []
+    store = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    store.write("text/plain", "first body", {})
+    store.write("text/plain", "second body", {})
+    store.close()
+    assert sum(embeddings.calls) == 2
+
+    embeddings.calls = []
+    reopened = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    reopened.write("text/plain", "third body", {})
+    reopened.close()
+
+    assert embeddings.calls == [1]
+    cached = MemoizedEmbeddings(
+        CountingEmbedding(size=8), cache_dir=tmp_path / "embedding_cache"
+    )
+    vectors = cached.embed_documents(["first body", "third body"])
+    assert cached.stats()["disk_hits"] == 2
+    assert vectors[0] == pytest.approx(embeddings.embed_documents(["first body"])[0])
+
+
+def test_bm25_index_updates_incrementally_and_round_trips():
+    index = BM25Index()
+    index.upsert("a", "deploy the search service")
+    index.upsert("b", "search search search logs")
+    index.upsert("c", "unrelated notes")
+
+    assert [doc_id for doc_id, _ in index.search("search", k=5)] == ["b", "a"]
+
+    index.upsert("b", "rotate logs")
+    index.remove("a")
+    assert index.search("search") == []
+    assert [doc_id for doc_id, _ in index.search("logs")] == ["b"]
+
+    index.upsert("d", "search notes")
+    restored = BM25Index.from_dict(json.loads(json.dumps(index.to_dict())))
+    assert sorted(restored.ids()) == ["b", "c", "d"]
+    assert restored.search("notes search") == index.search("notes search")
+
+
+def test_stale_bm25_file_with_matching_ids_is_rebuilt(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    index = HybridSearchIndex(tmp_path, "docs", embeddings, persist_interval=60)
+    for doc_id in ("a", "b"):
+        doc = Document(page_content=f"body {doc_id}", metadata={"id": doc_id})
+        index.upsert_document(doc, doc_id)
+    index.flush()
+    stale = (tmp_path / "docs_bm25.json").read_bytes()
+    replacement = Document(page_content="rotated keys", metadata={"id": "b"})
+    index.upsert_document(replacement, "b", force=True)
+    index.flush()
+    (tmp_path / "docs_bm25.json").write_bytes(stale)
+
+    reopened = HybridSearchIndex(tmp_path, "docs", embeddings)
+    assert [doc_id for doc_id, _ in reopened._bm25.search("rotated")] == ["b"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "docs_bm25.json",
+        "docs_docs.json",
+        "docs_faiss",
+    ]
+
+
+def test_artifact_index_is_reconciled_against_manifest_at_startup(tmp_path):
+    embeddings = CountingEmbedding(size=8)
+    store = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    kept = store.write("text/plain", "kept body", {"kind": "note"})
+    changed = store.write("text/plain", "changed body", {"kind": "note"})
+    store.close()
+
+    index = HybridSearchIndex(tmp_path / "search_artifacts", "artifacts", embeddings)
+    index.delete_documents([changed.artifact_id])
+    index.upsert_document(
+        Document(page_content="ghost", metadata={"id": "ghost"}), "ghost"
+    )
+    index.flush()
+    shutil.rmtree(tmp_path / "embedding_cache")
+
+    embeddings.calls = []
+    reopened = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+
+    assert embeddings.calls == [1]
+    fingerprints = reopened._search_index.fingerprints()
+    assert sorted(fingerprints) == sorted([kept.artifact_id, changed.artifact_id])
+    assert all(fingerprints.values())
+    found = reopened.search({"text": "changed", "k": 2})
+    assert changed.artifact_id in [artifact.artifact_id for artifact in found]
+
+
+def test_corrupt_search_files_are_rebuilt_from_the_manifest(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    store = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    artifact = store.write("text/plain", "durable body", {})
+    store.close()
+
+    index_dir = tmp_path / "search_artifacts"
+    assert not list(index_dir.glob(".*.tmp"))
+    assert not list(index_dir.glob("*_faiss.*"))
+    (index_dir / "artifacts_docs.json").write_bytes(b'[{"page_content": "tr')
+    (index_dir / "artifacts_faiss" / "index.faiss").write_bytes(b"garbage")
+
+    reopened = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    found = reopened.search({"text": "durable", "k": 1})
+    assert [item.artifact_id for item in found] == [artifact.artifact_id]
+    reopened.close()
+
+
+_embedding_gate = threading.Event()
+
+
+class GatedEmbedding(CountingEmbedding):
+    def embed_documents(self, texts):
+        _embedding_gate.wait(5)
+        return super().embed_documents(texts)
+
+
+def test_artifact_writes_are_indexed_in_background_batches(tmp_path):
+    _embedding_gate.clear()
+    embeddings = GatedEmbedding(size=8)
+    embeddings.calls = []
+    store = JsonFileArtifactStore(tmp_path, embeddings=embeddings)
+    first = store.write("text/plain", "alpha report", {})
+    for _ in range(50):
+        if store.index_stats()["depth"] == 0:
+            break
+        time.sleep(0.01)
+    second = store.write("text/plain", "beta report", {})
+    third = store.write("text/plain", "gamma report", {})
+    generation = store.index_generation
+
+    stats = store.index_stats()
+    assert stats["depth"] == 2
+    assert stats["lag_seconds"] > 0
+    assert store.search({"text": "beta", "wait_for_index": False}) == []
+
+    _embedding_gate.set()
+    found = store.search({"text": "beta", "k": 3, "wait_for_index": generation})
+    assert second.artifact_id in [artifact.artifact_id for artifact in found]
+    assert embeddings.calls == [1, 2]
+    assert store.index_stats()["depth"] == 0
+    assert {first.artifact_id, third.artifact_id} <= set(
+        store._search_index.fingerprints()
+    )
+    store.close()
+
+
+class FlakyIndex:
+    def __init__(self):
+        self.indexed = []
+        self.attempts = {}
+        self.broken = {"bad"}
+
+    def upsert_documents(self, docs, fingerprints):
+        for doc_id in docs:
+            self.attempts[doc_id] = self.attempts.get(doc_id, 0) + 1
+        if self.broken & set(docs) or ("flaky" in docs and self.attempts["flaky"] == 1):
+            raise RuntimeError("embedding backend unavailable")
+        self.indexed.extend(docs)
+
+    def flush(self):
+        pass
+
+
+def test_index_queue_retries_and_reports_failed_documents():
+    index = FlakyIndex()
+    queue = IndexQueue(index, batch_window=0, retry_backoff=0.01)
+    good = queue.submit("good", Document(page_content="good"), None)
+    queue.submit("flaky", Document(page_content="flaky"), None)
+    bad = queue.submit("bad", Document(page_content="bad"), None)
+
+    assert queue.wait(good, timeout=5)
+    assert not queue.wait(timeout=5)
+    assert sorted(index.indexed) == ["flaky", "good"]
+    assert queue.failed() == {"bad": bad}
+    stats = queue.stats()
+    assert stats["documents_indexed"] == 2
+    assert stats["failures"] == 1
+    assert stats["retries"] == 2
+
+    index.broken.clear()
+    queue.submit("bad", Document(page_content="bad"), None)
+    assert queue.wait(timeout=5)
+    assert queue.failed() == {}
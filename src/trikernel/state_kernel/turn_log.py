@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+from uuid import uuid4
+
+from trikernel.utils.logging import get_logger
+from trikernel.utils.serialization import Serializer, decode, resolve_serializer
+
+from .durability import DURABILITY_MODES
+from .models import Turn, utc_now
+from .process_lock import ProcessLock
+from .record_files import JournalFile, read_records
+
+logger = get_logger(__name__)
+
+_OFFSET = struct.Struct(">Q")
+
+
+class TurnLogStore:
+    def __init__(
+        self,
+        data_dir: Path,
+        durability: str = "flush-only",
+        process_lock: bool = False,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        self._dir = data_dir / "turns"
+        self._segment_dir = self._dir / "conversations"
+        self._directory_path = self._dir / "turn_ids.jsonl"
+        self._fsync = durability == "fsync"
+        self._serializer = resolve_serializer(serializer, line_safe=True)
+        self._lock = threading.Lock()
+        self._process_lock = ProcessLock(
+            self._dir / "turns.lock" if process_lock else None
+        )
+        self._turns: Dict[str, Tuple[str, int]] = {}
+        self._directory_offset = 0
+        self._segment_dir.mkdir(parents=True, exist_ok=True)
+        with self._locked(exclusive=True):
+            if not self._directory_path.exists():
+                self._migrate(data_dir / "turns.json")
+            self._trim_directory()
+
+    def append_user(
+        self, conversation_id: str, user_message: str, related_task_id: Optional[str]
+    ) -> Turn:
+        turn = Turn(
+            turn_id=str(uuid4()),
+            conversation_id=conversation_id,
+            user_message=user_message,
+            related_task_id=related_task_id,
+        )
+        with self._locked(exclusive=True):
+            self._append_turn(turn.to_dict())
+        return turn
+
+    def set_assistant(
+        self,
+        turn_id: str,
+        assistant_message: str,
+        artifacts: List[str],
+        metadata: Dict[str, Any],
+    ) -> Optional[Turn]:
+        with self._locked(exclusive=True):
+            location = self._turns.get(turn_id)
+            if location is None:
+                self._refresh_directory()
+                location = self._turns.get(turn_id)
+            if location is None:
+                return None
+            conversation_id, ordinal = location
+            offsets = self._read_offsets(conversation_id, ordinal, ordinal + 1)
+            if not offsets:
+                return None
+            record = self._read_record(conversation_id, offsets[0])
+            record.update(
+                {
+                    "assistant_message": assistant_message,
+                    "artifacts": list(artifacts),
+                    "metadata": dict(metadata),
+                    "updated_at": utc_now(),
+                }
+            )
+            offset = self._append_segment(conversation_id, record)
+            self._write_offset(conversation_id, ordinal, offset)
+            return Turn.from_dict(record)
+
+    def list_recent(self, conversation_id: str, limit: int) -> List[Turn]:
+        if limit <= 0:
+            return []
+        with self._locked(exclusive=False):
+            count = self._turn_count(conversation_id)
+            offsets = self._read_offsets(conversation_id, max(0, count - limit), count)
+            if not offsets:
+                return []
+            with open(self._segment_path(conversation_id), "rb") as segment:
+                turns = []
+                for offset in offsets:
+                    segment.seek(offset)
+                    turns.append(Turn.from_dict(decode(segment.readline())))
+        return turns
+
+    def close(self) -> None:
+        self._process_lock.close()
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        with self._lock, self._process_lock.hold(exclusive):
+            yield
+
+    def _append_turn(self, record: Dict[str, Any]) -> None:
+        self._trim_directory()
+        conversation_id = record["conversation_id"]
+        ordinal = self._turn_count(conversation_id)
+        offset = self._append_segment(conversation_id, record)
+        self._write_offset(conversation_id, ordinal, offset)
+        entry = {
+            "turn_id": record["turn_id"],
+            "conversation_id": conversation_id,
+            "ordinal": ordinal,
+        }
+        self._append_line(self._directory_path, self._serializer.dumps(entry))
+        self._turns[record["turn_id"]] = (conversation_id, ordinal)
+
+    def _append_segment(self, conversation_id: str, record: Dict[str, Any]) -> int:
+        return self._append_line(
+            self._segment_path(conversation_id), self._serializer.dumps(record)
+        )
+
+    def _append_line(self, path: Path, line: bytes) -> int:
+        with open(path, "ab") as handle:
+            offset = handle.seek(0, os.SEEK_END)
+            handle.write(line + b"\n")
+            handle.flush()
+            if self._fsync:
+                os.fsync(handle.fileno())
+        return offset
+
+    def _write_offset(self, conversation_id: str, ordinal: int, offset: int) -> None:
+        path = self._index_path(conversation_id)
+        with open(path, "r+b" if path.exists() else "wb") as handle:
+            handle.seek(ordinal * _OFFSET.size)
+            handle.write(_OFFSET.pack(offset))
+            handle.flush()
+            if self._fsync:
+                os.fsync(handle.fileno())
+
+    def _read_offsets(self, conversation_id: str, start: int, end: int) -> List[int]:
+        path = self._index_path(conversation_id)
+        if end <= start or not path.exists():
+            return []
+        with open(path, "rb") as handle:
+            handle.seek(start * _OFFSET.size)
+            raw = handle.read((end - start) * _OFFSET.size)
+        usable = len(raw) - len(raw) % _OFFSET.size
+        return [value for (value,) in _OFFSET.iter_unpack(raw[:usable])]
+
+    def _read_record(self, conversation_id: str, offset: int) -> Dict[str, Any]:
+        with open(self._segment_path(conversation_id), "rb") as segment:
+            segment.seek(offset)
+            return decode(segment.readline())
+
+    def _turn_count(self, conversation_id: str) -> int:
+        try:
+            return self._index_path(conversation_id).stat().st_size // _OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def _refresh_directory(self) -> None:
+        if not self._directory_path.exists():
+            return
+        with open(self._directory_path, "rb") as handle:
+            handle.seek(self._directory_offset)
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break
+                self._directory_offset += len(line)
+                try:
+                    entry = decode(line)
+                    self._turns[entry["turn_id"]] = (
+                        entry["conversation_id"],
+                        entry["ordinal"],
+                    )
+                except (ValueError, KeyError, TypeError):
+                    logger.error(
+                        "skipping torn turn directory record: %s",
+                        self._directory_path,
+                    )
+
+    def _trim_directory(self) -> None:
+        self._refresh_directory()
+        try:
+            size = self._directory_path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size > self._directory_offset:
+            os.truncate(self._directory_path, self._directory_offset)
+
+    def _migrate(self, legacy_path: Path) -> None:
+        if not legacy_path.exists() and not JournalFile.has_log(legacy_path):
+            return
+        records = sorted(
+            read_records(legacy_path).values(),
+            key=lambda item: item.get("created_at", ""),
+        )
+        staging_dir = self._dir / "migrating"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staged = TurnLogStore(
+            staging_dir,
+            durability="fsync" if self._fsync else "flush-only",
+            serializer=self._serializer,
+        )
+        for record in records:
+            staged._append_turn(record)
+        staged._directory_path.touch()
+        shutil.rmtree(self._segment_dir)
+        os.replace(staged._segment_dir, self._segment_dir)
+        os.replace(staged._directory_path, self._directory_path)
+        shutil.rmtree(staging_dir)
+
+    def _segment_path(self, conversation_id: str) -> Path:
+        return self._segment_dir / f"{_file_stem(conversation_id)}.jsonl"
+
+    def _index_path(self, conversation_id: str) -> Path:
+        return self._segment_dir / f"{_file_stem(conversation_id)}.idx"
+
+
+def _file_stem(conversation_id: str) -> str:
+    return quote(conversation_id, safe="-_.") or "_"
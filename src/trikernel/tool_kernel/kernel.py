@@ -15,6 +15,7 @@ from .models import ToolContext, ToolDefinition
 from .protocols import ToolAPI
 from .structured_tool import TrikernelStructuredTool, adapt_langchain_tool
 from .validation import validate_input
+from ..utils.embedding_cache import MemoizedEmbeddings
 from ..utils.search import HybridSearchIndex
 
 
@@ -59,6 +60,12 @@ class ToolKernel(ToolAPI):
         )
         self._index_tool(tool_definition, force=False)
 
+    def flush(self) -> None:
+        self._search_index.flush()
+
+    def close(self) -> None:
+        self.flush()
+
     def tool_describe(self, tool_name: str) -> ToolDefinition:
         return self._tools[tool_name].definition
 
@@ -133,7 +140,10 @@ def _init_tool_search(data_dir: Path) -> HybridSearchIndex:
     load_dotenv()
     base_url = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
     embed_model = os.environ.get("OLLAMA_EMBED_MODEL", "nomic-embed-text")
-    embeddings = OllamaEmbeddings(model=embed_model, base_url=base_url)
+    embeddings = MemoizedEmbeddings(
+        OllamaEmbeddings(model=embed_model, base_url=base_url),
+        cache_dir=data_dir / "embedding_cache",
+    )
     persist_dir = data_dir / "search_tools"
     return HybridSearchIndex(persist_dir, "tools", embeddings)
 
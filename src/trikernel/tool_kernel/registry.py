@@ -30,3 +30,4 @@ def register_default_tools(kernel: ToolKernel) -> None:
     tools += build_tools_from_dsl(file_dsl, file_tool_map)
     for tool in tools:
         kernel.tool_register(tool.definition, tool.handler)
+    kernel.flush()
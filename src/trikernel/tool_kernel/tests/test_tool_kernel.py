@@ -1,4 +1,6 @@
+from langchain_core.embeddings import DeterministicFakeEmbedding
 from langchain_core.utils.function_calling import convert_to_openai_tool
+from trikernel.state_kernel.file_store import JsonFileArtifactStore
 from trikernel.state_kernel.kernel import StateKernel
 from trikernel.tool_kernel.kernel import ToolKernel
 from trikernel.tool_kernel.models import ToolContext, ToolDefinition
@@ -53,6 +55,34 @@ def test_state_tools_task_create(tmp_path):
     assert state.task_get(task_id) is not None
 
 
+def test_artifact_read_range_advances_past_a_split_character(tmp_path):
+    state = StateKernel(
+        data_dir=tmp_path,
+        artifact_store=JsonFileArtifactStore(
+            tmp_path, embeddings=DeterministicFakeEmbedding(size=8)
+        ),
+    )
+    body = "aあいう" * 3
+    artifact_id = state.artifact_write("text/plain", body, {})
+    read_range = state_tool_functions()["artifact.read_range"]
+    context = ToolContext(runner_id="test", task_id=None, state_api=state, now="now")
+
+    page = read_range(artifact_id, offset=2, length=6, context=context)
+    assert page["text"] == "いう"
+    assert page["next_offset"] == 10
+    assert page["eof"] is False
+
+    pages, offset = [], 0
+    while True:
+        page = read_range(artifact_id, offset=offset, length=4, context=context)
+        pages.append(page["text"])
+        offset = page["next_offset"]
+        if page["eof"]:
+            break
+    assert "".join(pages) == body
+    assert offset == len(body.encode("utf-8"))
+
+
 def test_task_create_missing_required_raises(tmp_path):
     state = StateKernel(data_dir=tmp_path)
     kernel = ToolKernel()
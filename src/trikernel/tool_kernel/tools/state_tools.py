@@ -65,11 +65,20 @@ def task_get(task_id: str, *, context: ToolContext) -> Optional[Dict[str, Any]]:
 def task_list(
     task_type: Optional[str] = None,
     state: Optional[str] = "queued",
+    fields: Optional[List[str]] = None,
+    include_archived: bool = False,
     *,
     context: ToolContext,
 ) -> List[Dict[str, Any]]:
     state_api = _require_state_api(context)
-    return [task.to_dict() for task in state_api.task_list(task_type, state)]
+    options: Dict[str, Any] = {}
+    if include_archived:
+        options["include_archived"] = True
+    if fields:
+        return state_api.task_list(task_type, state, fields=fields, **options)
+    return [
+        task.to_dict() for task in state_api.task_list(task_type, state, **options)
+    ]
 
 
 def task_claim(
@@ -114,6 +123,38 @@ def artifact_read(
     return artifact.to_dict() if artifact else None
 
 
+def artifact_read_range(
+    artifact_id: str,
+    offset: int = 0,
+    length: int = 4000,
+    *,
+    context: ToolContext,
+) -> Dict[str, Any]:
+    state_api = _require_state_api(context)
+    text = state_api.artifact_read_range(artifact_id, offset, length)
+    if text is None:
+        return {"error": "artifact_not_found"}
+    consumed = len(text.encode("utf-8"))
+    if text and offset > 0:
+        consumed += _skipped_bytes(state_api, artifact_id, offset)
+    return {
+        "artifact_id": artifact_id,
+        "offset": offset,
+        "next_offset": offset + consumed,
+        "eof": consumed < length,
+        "text": text,
+    }
+
+
+def _skipped_bytes(state_api: Any, artifact_id: str, offset: int) -> int:
+    # read_range drops the continuation bytes of a character split by the
+    # offset; a range of n bytes is empty until it reaches the next start.
+    for skipped in range(3):
+        if state_api.artifact_read_range(artifact_id, offset, skipped + 1):
+            return skipped
+    return 3
+
+
 def artifact_extract(
     artifact_id: str,
     instructions: str,
@@ -145,18 +186,9 @@ def artifact_search(
 
 def artifact_list(*, context: ToolContext) -> List[Dict[str, Any]]:
     state_api = _require_state_api(context)
-    artifacts = state_api.artifact_list()
-    result = []
-    for artifact in artifacts:
-        result.append(
-            {
-                "artifact_id": artifact.artifact_id,
-                "metadata": dict(artifact.metadata),
-                "created_at": artifact.created_at,
-                "body": artifact.body[:100],
-            }
-        )
-    return result
+    return state_api.artifact_list(
+        fields=["artifact_id", "metadata", "created_at", "body"], preview_chars=100
+    )
 
 
 def turn_list_recent(
@@ -181,6 +213,7 @@ def state_tool_functions() -> Dict[str, Any]:
         "task.fail": task_fail,
         "artifact.write": artifact_write,
         "artifact.read": artifact_read,
+        "artifact.read_range": artifact_read_range,
         "artifact.extract": artifact_extract,
         "artifact.search": artifact_search,
         "artifact.list": artifact_list,
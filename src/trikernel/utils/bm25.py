@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def default_tokenize(text: str) -> List[str]:
+    return text.split()
+
+
+class BM25Index:
+    def __init__(
+        self,
+        k1: float = 1.5,
+        b: float = 0.75,
+        tokenize: Callable[[str], List[str]] = default_tokenize,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self._tokenize = tokenize
+        self._slots: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._total_length = 0.0
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._rows
+
+    def ids(self) -> List[str]:
+        return list(self._rows)
+
+    def upsert(self, doc_id: str, text: str) -> None:
+        self.remove(doc_id)
+        counts = Counter(self._tokenize(text))
+        row = self._free.pop() if self._free else self._grow()
+        self._slots[row] = doc_id
+        self._rows[doc_id] = row
+        length = float(sum(counts.values()))
+        self._lengths[row] = length
+        self._total_length += length
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[row] = tf
+        self._doc_terms[row] = list(counts)
+
+    def remove(self, doc_id: str) -> bool:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+        for term in self._doc_terms.pop(row, []):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(row, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= float(self._lengths[row])
+        self._lengths[row] = 0.0
+        self._slots[row] = None
+        self._free.append(row)
+        return True
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        if not self._rows or k <= 0:
+            return []
+        terms = [term for term in set(self._tokenize(query)) if term in self._postings]
+        if not terms:
+            return []
+        count = len(self._rows)
+        average_length = self._total_length / count or 1.0
+        matched_rows: List[np.ndarray] = []
+        matched_scores: List[np.ndarray] = []
+        for term in terms:
+            postings = self._postings[term]
+            df = len(postings)
+            rows = np.fromiter(postings.keys(), dtype=np.int64, count=df)
+            tfs = np.fromiter(postings.values(), dtype=np.float64, count=df)
+            idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (
+                1.0 - self.b + self.b * self._lengths[rows] / average_length
+            )
+            matched_rows.append(rows)
+            matched_scores.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+        rows, inverse = np.unique(np.concatenate(matched_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+        order = np.arange(rows.size)
+        if rows.size > k:
+            order = np.argpartition(-scores, k - 1)[:k]
+        order = order[np.argsort(-scores[order], kind="stable")]
+        return [(self._slots[rows[i]], float(scores[i])) for i in order]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "slots": list(self._slots),
+            "lengths": self._lengths[: len(self._slots)].tolist(),
+            "postings": {
+                term: [[row, tf] for row, tf in postings.items()]
+                for term, postings in self._postings.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(
+        cls,
+        data: Dict[str, Any],
+        tokenize: Callable[[str], List[str]] = default_tokenize,
+    ) -> "BM25Index":
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75), tokenize=tokenize)
+        index._slots = list(data.get("slots") or [])
+        index._lengths = np.asarray(data.get("lengths") or [], dtype=np.float32)
+        for row, doc_id in enumerate(index._slots):
+            if doc_id is None:
+                index._free.append(row)
+            else:
+                index._rows[doc_id] = row
+                index._doc_terms[row] = []
+        index._total_length = float(index._lengths.sum())
+        for term, postings in (data.get("postings") or {}).items():
+            index._postings[term] = {int(row): int(tf) for row, tf in postings}
+            for row in index._postings[term]:
+                index._doc_terms[row].append(term)
+        return index
+
+    @classmethod
+    def from_texts(
+        cls,
+        items: Iterable[Tuple[str, str]],
+        tokenize: Callable[[str], List[str]] = default_tokenize,
+    ) -> "BM25Index":
+        index = cls(tokenize=tokenize)
+        for doc_id, text in items:
+            index.upsert(doc_id, text)
+        return index
+
+    def _grow(self) -> int:
+        row = len(self._slots)
+        self._slots.append(None)
+        if row >= self._lengths.size:
+            grown = np.zeros(max(16, self._lengths.size * 2), dtype=np.float32)
+            grown[: self._lengths.size] = self._lengths
+            self._lengths = grown
+        return row
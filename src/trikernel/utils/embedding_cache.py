@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+from urllib.parse import quote
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl  # type: ignore
+except ImportError:
+    fcntl = None
+
+
+class EmbeddingStore:
+    def __init__(self, cache_dir: Path, model: str) -> None:
+        self._dir = cache_dir / quote(model, safe="")
+        self._keys_path = self._dir / "keys.txt"
+        self._vectors_path = self._dir / "vectors.f32"
+        self._meta_path = self._dir / "meta.json"
+        self._lock_path = self._dir / "cache.lock"
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._keys_offset = 0
+        self._dim: Optional[int] = None
+        self._matrix: Optional[np.memmap] = None
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        with self._locked():
+            if any(key not in self._rows for key in keys):
+                self._refresh()
+            found = {key: self._rows[key] for key in keys if key in self._rows}
+            if not found:
+                return {}
+            matrix = self._open_matrix()
+            return {key: matrix[row].tolist() for key, row in found.items()}
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        if not vectors:
+            return
+        with self._locked():
+            self._refresh()
+            new = {
+                key: vector for key, vector in vectors.items() if key not in self._rows
+            }
+            if not new:
+                return
+            if self._dim is None:
+                self._dim = len(next(iter(new.values())))
+                self._meta_path.write_text(json.dumps({"dim": self._dim}))
+            new = {
+                key: vector for key, vector in new.items() if len(vector) == self._dim
+            }
+            if not new:
+                return
+            data = np.asarray(list(new.values()), dtype=np.float32)
+            mode = "r+b" if self._vectors_path.exists() else "wb"
+            with open(self._vectors_path, mode) as handle:
+                handle.seek(len(self._rows) * self._dim * 4)
+                handle.write(data.tobytes())
+                handle.truncate()
+            with open(self._keys_path, "ab") as handle:
+                handle.write("".join(f"{key}\n" for key in new).encode("ascii"))
+            self._refresh()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(str(self._lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def _refresh(self) -> None:
+        if self._dim is None and self._meta_path.exists():
+            self._dim = int(json.loads(self._meta_path.read_text())["dim"])
+        if not self._keys_path.exists():
+            return
+        with open(self._keys_path, "rb") as handle:
+            handle.seek(self._keys_offset)
+            raw = handle.read()
+        complete = raw[: raw.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            self._rows.setdefault(line.decode("ascii"), len(self._rows))
+        self._keys_offset += len(complete)
+
+    def _open_matrix(self) -> np.memmap:
+        rows = len(self._rows)
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim)
+            )
+        return self._matrix
+
+
+class MemoizedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        inner: Embeddings,
+        max_entries: int = 50_000,
+        cache_dir: Optional[Path] = None,
+        model: Optional[str] = None,
+    ) -> None:
+        self._inner = inner
+        self._max_entries = max_entries
+        self._vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._store = (
+            EmbeddingStore(cache_dir, model or embedding_model_name(inner))
+            if cache_dir is not None
+            else None
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [_content_key(text) for text in texts]
+        vectors: Dict[str, List[float]] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._vectors.get(key)
+                if vector is not None:
+                    self._vectors.move_to_end(key)
+                    vectors[key] = vector
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        stored: Dict[str, List[float]] = {}
+        if missing and self._store is not None:
+            stored = self._store.get_many(list(missing))
+            for key in stored:
+                del missing[key]
+        embedded: Dict[str, List[float]] = {}
+        if missing:
+            embedded = dict(
+                zip(missing.keys(), self._inner.embed_documents(list(missing.values())))
+            )
+            if self._store is not None:
+                self._store.put_many(embedded)
+        vectors.update(stored)
+        vectors.update(embedded)
+        with self._lock:
+            for key, vector in {**stored, **embedded}.items():
+                self._remember(key, vector)
+            self.misses += len(missing)
+            self.disk_hits += len(stored)
+            self.hits += len(texts) - len(missing) - len(stored)
+        return [list(vectors[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._inner.embed_query(text)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._vectors),
+            }
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._vectors[key] = vector
+        self._vectors.move_to_end(key)
+        while len(self._vectors) > self._max_entries:
+            self._vectors.popitem(last=False)
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    model = getattr(embeddings, "model", None) or getattr(
+        embeddings, "model_name", None
+    )
+    return str(model or type(embeddings).__name__)
+
+
+def _content_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
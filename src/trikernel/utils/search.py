@@ -1,46 +1,140 @@
 from __future__ import annotations
 
-import json
+import atexit
+import os
+import shutil
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from uuid import uuid4
 
-from langchain_classic.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
+from ..state_kernel.durability import atomic_write_bytes
+from .bm25 import BM25Index
+from .logging import get_logger
+from .serialization import Serializer, decode, resolve_serializer
+
+logger = get_logger(__name__)
+
+_RRF_C = 60
+_REVISION_FILE = "revision"
+_unflushed: "weakref.WeakSet[HybridSearchIndex]" = weakref.WeakSet()
+
 
 class HybridSearchIndex:
-    def __init__(self, persist_dir: Path, name: str, embeddings: Embeddings) -> None:
+    def __init__(
+        self,
+        persist_dir: Path,
+        name: str,
+        embeddings: Embeddings,
+        serializer: Optional[Serializer] = None,
+        persist_interval: float = 1.0,
+    ) -> None:
         self._persist_dir = persist_dir
+        self._serializer = resolve_serializer(serializer)
         self._persist_dir.mkdir(parents=True, exist_ok=True)
         self._name = name
         self._embeddings = embeddings
-        self._docs: List[Document] = []
+        self._docs: Dict[str, Document] = {}
+        self._fingerprints: Dict[str, Optional[str]] = {}
         self._faiss: Optional[FAISS] = None
-        self._bm25: Optional[BM25Retriever] = None
+        self._bm25 = BM25Index()
+        self._persist_interval = persist_interval
+        self._persisted_at = time.monotonic()
+        self._dirty = False
+        self._lock = threading.RLock()
         self._load()
 
     def set_documents(self, docs: Iterable[Document]) -> None:
-        self._docs = list(docs)
-        self._rebuild_indexes()
-        self._persist_docs()
+        with self._lock:
+            self._docs = {_doc_id(doc, index): doc for index, doc in enumerate(docs)}
+            self._fingerprints = {}
+            self._rebuild_indexes()
+            self._dirty = True
+            self.flush()
 
     def upsert_document(
-        self, doc: Document, doc_id: str, *, force: bool = False
+        self,
+        doc: Document,
+        doc_id: str,
+        *,
+        force: bool = False,
+        fingerprint: Optional[str] = None,
     ) -> None:
         if not force and self.has_id(doc_id):
             return
-        self._docs = [
-            existing for existing in self._docs if existing.metadata.get("id") != doc_id
-        ]
-        self._docs.append(doc)
-        self._rebuild_indexes()
-        self._persist_docs()
+        self.upsert_documents({doc_id: doc}, {doc_id: fingerprint})
+
+    def upsert_documents(
+        self,
+        docs: Dict[str, Document],
+        fingerprints: Optional[Dict[str, Optional[str]]] = None,
+    ) -> None:
+        if not docs:
+            return
+        ids = list(docs)
+        texts = [doc.page_content for doc in docs.values()]
+        metadatas = [doc.metadata for doc in docs.values()]
+        pairs = list(zip(texts, self._embeddings.embed_documents(texts)))
+        with self._lock:
+            replaced = [doc_id for doc_id in ids if doc_id in self._docs]
+            for doc_id, doc in docs.items():
+                self._docs.pop(doc_id, None)
+                self._docs[doc_id] = doc
+                self._fingerprints[doc_id] = (fingerprints or {}).get(doc_id)
+                self._bm25.upsert(doc_id, doc.page_content)
+            if self._faiss is None:
+                self._faiss = FAISS.from_embeddings(
+                    pairs, self._embeddings, metadatas=metadatas, ids=ids
+                )
+            else:
+                if replaced:
+                    self._faiss.delete(replaced)
+                self._faiss.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+            self._mark_dirty()
+
+    def delete_documents(self, doc_ids: Sequence[str]) -> None:
+        with self._lock:
+            removed = [doc_id for doc_id in doc_ids if doc_id in self._docs]
+            if not removed:
+                return
+            for doc_id in removed:
+                del self._docs[doc_id]
+                self._fingerprints.pop(doc_id, None)
+                self._bm25.remove(doc_id)
+            if self._faiss is not None:
+                self._faiss.delete(removed)
+                if not self._docs:
+                    self._faiss = None
+            self._mark_dirty()
 
     def has_id(self, doc_id: str) -> bool:
-        return any(doc.metadata.get("id") == doc_id for doc in self._docs)
+        with self._lock:
+            return doc_id in self._docs
+
+    def fingerprints(self) -> Dict[str, Optional[str]]:
+        with self._lock:
+            return {doc_id: self._fingerprints.get(doc_id) for doc_id in self._docs}
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            revision = uuid4().hex
+            self._persist_faiss(revision)
+            atomic_write_bytes(
+                self._bm25_path(),
+                self._serializer.dumps({**self._bm25.to_dict(), "revision": revision}),
+            )
+            self._persist_docs(revision)
+            self._dirty = False
+            self._persisted_at = time.monotonic()
+            _unflushed.discard(self)
 
     def search(
         self,
@@ -50,66 +144,149 @@ class HybridSearchIndex:
         metadata_filter: Optional[Dict[str, Any]] = None,
     ) -> List[Document]:
         if not query:
-            return self._filter_docs(self._docs, metadata_filter)[:k]
-        retrievers = []
-        bm25 = self._ensure_bm25()
-        if bm25:
-            bm25.k = k
-            retrievers.append(bm25)
-        if self._faiss:
-            retrievers.append(self._faiss.as_retriever(search_kwargs={"k": k}))
-        if not retrievers:
-            return []
-        weights = [0.5] * len(retrievers)
-        ensemble = EnsembleRetriever(retrievers=retrievers, weights=weights)
-        docs = ensemble.invoke(query)
+            with self._lock:
+                return self._filter_docs(self._docs.values(), metadata_filter)[:k]
+        vector = self._embeddings.embed_query(query) if self._faiss else None
+        with self._lock:
+            rankings = [[doc_id for doc_id, _ in self._bm25.search(query, k)]]
+            if self._faiss and vector is not None:
+                matches = self._faiss.similarity_search_by_vector(vector, k=k)
+                rankings.append([str(doc.id) for doc in matches])
+            docs = [
+                self._docs[doc_id]
+                for doc_id in _reciprocal_rank_fusion(rankings)
+                if doc_id in self._docs
+            ]
         return self._filter_docs(docs, metadata_filter)[:k]
 
-    def _ensure_bm25(self) -> Optional[BM25Retriever]:
-        if not self._docs:
-            return None
-        self._bm25 = BM25Retriever.from_documents(self._docs)
-        return self._bm25
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if time.monotonic() - self._persisted_at >= self._persist_interval:
+            self.flush()
+        else:
+            _unflushed.add(self)
 
     def _rebuild_indexes(self) -> None:
+        self._rebuild_faiss()
+        self._rebuild_bm25()
+
+    def _rebuild_faiss(self) -> None:
         if not self._docs:
             self._faiss = None
-            self._bm25 = None
             return
-        self._faiss = FAISS.from_documents(self._docs, self._embeddings)
-        self._bm25 = BM25Retriever.from_documents(self._docs)
-        self._persist_faiss()
+        self._faiss = FAISS.from_documents(
+            list(self._docs.values()), self._embeddings, ids=list(self._docs)
+        )
+
+    def _rebuild_bm25(self) -> None:
+        self._bm25 = BM25Index.from_texts(
+            (doc_id, doc.page_content) for doc_id, doc in self._docs.items()
+        )
 
-    def _persist_faiss(self) -> None:
+    def _persist_faiss(self, revision: str) -> None:
+        target = self._faiss_dir()
         if not self._faiss:
+            shutil.rmtree(target, ignore_errors=True)
             return
-        self._faiss.save_local(str(self._faiss_dir()))
+        staging = target.with_name(f"{target.name}.tmp")
+        retired = target.with_name(f"{target.name}.old")
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.rmtree(retired, ignore_errors=True)
+        self._faiss.save_local(str(staging))
+        (staging / _REVISION_FILE).write_text(revision)
+        if target.exists():
+            os.replace(target, retired)
+        os.replace(staging, target)
+        shutil.rmtree(retired, ignore_errors=True)
 
-    def _persist_docs(self) -> None:
-        payload = [
-            {"page_content": doc.page_content, "metadata": doc.metadata}
-            for doc in self._docs
+    def _persist_docs(self, revision: str) -> None:
+        documents = [
+            {
+                "page_content": doc.page_content,
+                "metadata": doc.metadata,
+                "fingerprint": self._fingerprints.get(doc_id),
+            }
+            for doc_id, doc in self._docs.items()
         ]
-        self._docs_path().write_text(
-            json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        payload = {"revision": revision, "documents": documents}
+        atomic_write_bytes(self._docs_path(), self._serializer.dumps(payload))
 
     def _load(self) -> None:
-        if self._docs_path().exists():
-            raw = json.loads(self._docs_path().read_text(encoding="utf-8"))
-            self._docs = [
-                Document(
-                    page_content=item["page_content"],
-                    metadata=item.get("metadata") or {},
-                )
-                for item in raw
-            ]
+        revision: Optional[str] = None
+        try:
+            revision = self._load_docs()
+        except Exception:
+            logger.error(
+                "unreadable search documents, rebuilding: %s",
+                self._docs_path(),
+                exc_info=True,
+            )
+            self._docs = {}
+            self._fingerprints = {}
+            self._dirty = True
+        retired = self._faiss_dir().with_name(f"{self._faiss_dir().name}.old")
+        if not self._faiss_dir().exists() and retired.exists():
+            os.replace(retired, self._faiss_dir())
+        faiss_revision: Optional[str] = None
         if self._faiss_dir().exists():
-            self._faiss = FAISS.load_local(
-                str(self._faiss_dir()),
-                self._embeddings,
-                allow_dangerous_deserialization=True,
+            try:
+                self._faiss = FAISS.load_local(
+                    str(self._faiss_dir()),
+                    self._embeddings,
+                    allow_dangerous_deserialization=True,
+                )
+                revision_path = self._faiss_dir() / _REVISION_FILE
+                if revision_path.exists():
+                    faiss_revision = revision_path.read_text().strip()
+            except Exception:
+                logger.error(
+                    "unreadable vector index, rebuilding: %s",
+                    self._faiss_dir(),
+                    exc_info=True,
+                )
+        bm25_revision: Optional[str] = None
+        if self._bm25_path().exists():
+            try:
+                data = decode(self._bm25_path().read_bytes())
+                self._bm25 = BM25Index.from_dict(data)
+                bm25_revision = data.get("revision")
+            except Exception:
+                logger.error(
+                    "unreadable keyword index, rebuilding: %s",
+                    self._bm25_path(),
+                    exc_info=True,
+                )
+                self._bm25 = BM25Index()
+        faiss_ids = (
+            set(self._faiss.index_to_docstore_id.values()) if self._faiss else set()
+        )
+        if faiss_ids != self._docs.keys() or (
+            self._faiss is not None and faiss_revision != revision
+        ):
+            self._rebuild_faiss()
+            self._dirty = True
+        if set(self._bm25.ids()) != self._docs.keys() or bm25_revision != revision:
+            self._rebuild_bm25()
+            self._dirty = True
+        self.flush()
+
+    def _load_docs(self) -> Optional[str]:
+        if not self._docs_path().exists():
+            return None
+        raw = decode(self._docs_path().read_bytes())
+        revision = None
+        if isinstance(raw, dict):
+            revision = raw.get("revision")
+            raw = raw["documents"]
+        for index, item in enumerate(raw):
+            doc = Document(
+                page_content=item["page_content"],
+                metadata=item.get("metadata") or {},
             )
+            doc_id = _doc_id(doc, index)
+            self._docs[doc_id] = doc
+            self._fingerprints[doc_id] = item.get("fingerprint")
+        return revision
 
     def _filter_docs(
         self, docs: Iterable[Document], metadata_filter: Optional[Dict[str, Any]]
@@ -133,3 +310,27 @@ class HybridSearchIndex:
 
     def _faiss_dir(self) -> Path:
         return self._persist_dir / f"{self._name}_faiss"
+
+    def _bm25_path(self) -> Path:
+        return self._persist_dir / f"{self._name}_bm25.json"
+
+
+def _doc_id(doc: Document, index: int) -> str:
+    return str(doc.metadata.get("id") or f"doc-{index}")
+
+
+def _reciprocal_rank_fusion(rankings: List[List[str]]) -> List[str]:
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (_RRF_C + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+@atexit.register
+def _flush_unflushed() -> None:
+    for index in list(_unflushed):
+        try:
+            index.flush()
+        except Exception:
+            logger.exception("failed to flush search index at exit")
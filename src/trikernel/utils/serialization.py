@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Optional, Protocol, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+try:
+    import ormsgpack  # type: ignore
+except ImportError:
+    ormsgpack = None
+
+try:
+    import msgpack  # type: ignore
+except ImportError:
+    msgpack = None
+
+SERIALIZERS = ("auto", "json", "orjson", "msgpack")
+_FAST_EXTRA = "pip install 'trikernel[fast]'"
+
+
+class Serializer(Protocol):
+    name: str
+    line_safe: bool
+
+    def dumps(self, value: Any) -> bytes: ...
+
+    def loads(self, data: Union[bytes, str]) -> Any: ...
+
+
+class JsonSerializer:
+    name = "json"
+
+    def __init__(self, pretty: bool = False) -> None:
+        self._indent = 2 if pretty else None
+        self.line_safe = not pretty
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, indent=self._indent).encode(
+            "utf-8"
+        )
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return decode(data)
+
+
+class OrjsonSerializer:
+    name = "orjson"
+
+    def __init__(self, pretty: bool = False) -> None:
+        if orjson is None:
+            raise RuntimeError(f"orjson is not installed; run {_FAST_EXTRA}")
+        self._option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            self._option |= orjson.OPT_INDENT_2
+        self.line_safe = not pretty
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, option=self._option)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return decode(data)
+
+
+class MsgpackSerializer:
+    name = "msgpack"
+    line_safe = False
+
+    def __init__(self) -> None:
+        if ormsgpack is None and msgpack is None:
+            raise RuntimeError(
+                f"ormsgpack or msgpack is required for msgpack; run {_FAST_EXTRA}"
+            )
+
+    def dumps(self, value: Any) -> bytes:
+        if ormsgpack is not None:
+            return ormsgpack.packb(value, option=ormsgpack.OPT_NON_STR_KEYS)
+        return msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return decode(data)
+
+
+def get_serializer(name: Optional[str] = None, *, pretty: bool = False) -> Serializer:
+    name = name or "auto"
+    if name not in SERIALIZERS:
+        raise ValueError(f"serializer must be one of {SERIALIZERS}")
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name == "orjson":
+        return OrjsonSerializer(pretty=pretty)
+    if name == "msgpack":
+        return MsgpackSerializer()
+    return JsonSerializer(pretty=pretty)
+
+
+def resolve_serializer(
+    serializer: Union[Serializer, str, None], *, line_safe: bool = False
+) -> Serializer:
+    resolved = (
+        serializer
+        if serializer is not None and not isinstance(serializer, str)
+        else get_serializer(serializer)
+    )
+    if line_safe and not resolved.line_safe:
+        return get_serializer()
+    return resolved
+
+
+def decode(data: Union[bytes, str]) -> Any:
+    if isinstance(data, bytes) and data[:1] >= b"\x80":
+        if ormsgpack is not None:
+            return ormsgpack.unpackb(data)
+        if msgpack is not None:
+            return msgpack.unpackb(data, raw=False)
+        raise RuntimeError(
+            f"ormsgpack or msgpack is required to read msgpack data; run {_FAST_EXTRA}"
+        )
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)